@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import BusCollection, BusData
+from .models import BusCollection, BusData, Trip, TripDay, TripStationLoad, Vehicle
+from .snapshots import packed_bus_count
 
 
 class BusDataInline(admin.TabularInline):
     model = BusData
     extra = 0
-    readonly_fields = ('plate_no', 'remain_seat_cnt', 'station_seq')
+    readonly_fields = ('vehicle', 'remain_seat_cnt', 'station_seq')
 
 
 @admin.register(BusCollection)
@@ -19,13 +20,45 @@ class BusCollectionAdmin(admin.ModelAdmin):
     inlines = [BusDataInline]
     
     def bus_count(self, obj):
+        if obj.same_as_id is not None:
+            obj = obj.same_as
+        if obj.packed_buses is not None:
+            return packed_bus_count(obj.packed_buses)
         return obj.buses.count()
     bus_count.short_description = '버스 수'
 
 
+@admin.register(Vehicle)
+class VehicleAdmin(admin.ModelAdmin):
+    list_display = ('plate_no',)
+    search_fields = ('plate_no',)
+
+
 @admin.register(BusData)
 class BusDataAdmin(admin.ModelAdmin):
-    list_display = ('collection', 'plate_no', 'remain_seat_cnt', 'station_seq')
+    list_display = ('collection', 'vehicle', 'remain_seat_cnt', 'station_seq')
+    list_select_related = ('collection', 'vehicle')
     list_filter = ('collection__collection_date', 'remain_seat_cnt')
-    search_fields = ('plate_no', 'collection__route_id')
-    ordering = ('-collection__query_time', 'plate_no')
+    search_fields = ('vehicle__plate_no', 'collection__route_id')
+    ordering = ('-collection__query_time', 'vehicle__plate_no')
+
+
+class TripStationLoadInline(admin.TabularInline):
+    model = TripStationLoad
+    extra = 0
+    readonly_fields = ('station_idx', 'passengers')
+
+
+@admin.register(TripDay)
+class TripDayAdmin(admin.ModelAdmin):
+    list_display = ('route_id', 'service_date', 'trip_count', 'collection_count', 'built_at')
+    list_filter = ('route_id',)
+    date_hierarchy = 'service_date'
+
+
+@admin.register(Trip)
+class TripAdmin(admin.ModelAdmin):
+    list_display = ('route_id', 'service_date', 'trip_order', 'trip_key', 'start_time', 'zero_count')
+    list_filter = ('route_id', 'service_date')
+    search_fields = ('trip_key',)
+    inlines = [TripStationLoadInline]
@@ -0,0 +1,174 @@
+"""
+업로드된 분석 DB의 프로세스 단위 읽기 전용 연결 풀
+
+분석 API가 요청마다 연결을 새로 열고 닫으면 SQLite 페이지 캐시도 매번 버려지므로, 업로드 파일
+경로별로 사용이 끝난 연결을 보관했다가 다시 쓴다. 업로드 파일은 분석 중 바뀌지 않으므로(immutable)
+연결을 오래 유지해도 안전하고, 파일이 교체되면(inode/크기/수정 시각 변경) 보관된 연결을 버린다.
+운영 DB URI는 수집으로 계속 바뀌므로 풀에 넣지 않고 매번 열고 닫는다.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .trips import connect_analysis_db, get_upload_uri
+
+
+def _file_identity(db_path):
+    stat = os.stat(db_path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class AnalysisConnectionPool:
+    """
+    업로드 파일 경로별 유휴 연결 보관 (DB당 max_connections개, 최근 사용한 max_databases개 DB)
+
+    idle_timeout초 동안 사용하지 않은 연결은 다음 풀 사용 시 또는 close_idle()에서 닫는다.
+    """
+
+    def __init__(self, max_connections=4, max_databases=8, idle_timeout=300,
+                 cache_size_kb=64 * 1024, mmap_size=256 * 1024 * 1024):
+        self.max_connections = max_connections
+        self.max_databases = max_databases
+        self.idle_timeout = idle_timeout
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+
+        self._idle = OrderedDict()  # {경로: (파일 식별자, [(반납 시각, 연결), ...])}
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.reused = 0
+
+    @contextmanager
+    def connection(self, db_path):
+        """
+        분석 대상 DB 연결 (업로드 파일은 풀에서 빌리고 반납, 운영 DB URI는 열고 닫음)
+        """
+        if db_path.startswith('file:') or self.max_connections < 1:
+            conn = connect_analysis_db(db_path)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        conn = self._acquire(db_path)
+        try:
+            yield conn
+        except BaseException:
+            # 오류가 난 연결은 상태를 알 수 없으므로 반납하지 않음
+            conn.close()
+            raise
+        self._release(db_path, conn)
+
+    def close_idle(self):
+        """
+        idle_timeout이 지난 유휴 연결 닫기
+        """
+        with self._lock:
+            self._evict_idle(time.time())
+
+    def close_all(self):
+        with self._lock:
+            for _, connections in self._idle.values():
+                for _, conn in connections:
+                    conn.close()
+            self._idle.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'databases': len(self._idle),
+                'idle_connections': sum(len(connections) for _, connections in self._idle.values()),
+                'opened': self.opened,
+                'reused': self.reused
+            }
+
+    def _open(self, db_path):
+        # 요청 스레드마다 다른 연결을 빌려 가므로 같은 스레드 검사는 끔 (한 번에 한 스레드만 사용)
+        conn = sqlite3.connect(get_upload_uri(db_path), uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def _acquire(self, db_path):
+        identity = _file_identity(db_path)
+        with self._lock:
+            self._evict_idle(time.time())
+            entry = self._idle.get(db_path)
+            if entry is not None and entry[0] != identity:
+                self._discard(db_path)
+            elif entry is not None and entry[1]:
+                # 가장 최근에 반납된 연결(캐시가 가장 따뜻한 연결)부터 사용
+                _, conn = entry[1].pop()
+                self.reused += 1
+                return conn
+
+        conn = self._open(db_path)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def _release(self, db_path, conn):
+        try:
+            identity = _file_identity(db_path)
+        except OSError:
+            # 파일이 삭제됨 (저장소 정리 등)
+            conn.close()
+            return
+
+        with self._lock:
+            entry = self._idle.get(db_path)
+            if entry is not None and entry[0] != identity:
+                self._discard(db_path)
+                entry = None
+            if entry is None:
+                entry = (identity, [])
+                self._idle[db_path] = entry
+            self._idle.move_to_end(db_path)
+
+            if len(entry[1]) >= self.max_connections:
+                conn.close()
+            else:
+                entry[1].append((time.time(), conn))
+
+            # 최근에 사용하지 않은 DB의 연결부터 닫음
+            while len(self._idle) > self.max_databases:
+                self._discard(next(iter(self._idle)))
+
+    def _discard(self, db_path):
+        _, connections = self._idle.pop(db_path)
+        for _, conn in connections:
+            conn.close()
+
+    def _evict_idle(self, now):
+        for db_path in list(self._idle):
+            identity, connections = self._idle[db_path]
+            expired = [conn for released_at, conn in connections if now - released_at > self.idle_timeout]
+            if not expired:
+                continue
+            for conn in expired:
+                conn.close()
+            remaining = [(released_at, conn) for released_at, conn in connections
+                         if now - released_at <= self.idle_timeout]
+            if remaining:
+                self._idle[db_path] = (identity, remaining)
+            else:
+                del self._idle[db_path]
+
+
+# 전역 분석 DB 연결 풀
+analysis_pool = AnalysisConnectionPool(
+    max_connections=getattr(settings, 'ANALYSIS_POOL_MAX_CONNECTIONS', 4),
+    max_databases=getattr(settings, 'ANALYSIS_POOL_MAX_DATABASES', 8),
+    idle_timeout=getattr(settings, 'ANALYSIS_POOL_IDLE_TIMEOUT', 300),
+    cache_size_kb=getattr(settings, 'ANALYSIS_POOL_CACHE_SIZE_KB', 64 * 1024),
+    mmap_size=getattr(settings, 'ANALYSIS_POOL_MMAP_SIZE', 256 * 1024 * 1024)
+)
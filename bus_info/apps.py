@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BusInfoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bus_info'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db_tuning import apply_sqlite_pragmas
+
+        # 모든 DB 연결 생성 시 SQLite PRAGMA(WAL 등) 적용
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='bus_info_sqlite_pragmas')
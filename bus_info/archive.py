@@ -0,0 +1,302 @@
+"""
+오래된 수집 데이터 보관 (월별 보관 파일) 및 조회
+
+보존 기간이 지난 날짜의 수집 데이터를 월별 SQLite 보관 파일로 옮기고 본 DB에서 삭제한다.
+보관 파일은 수집 건마다 버스 목록을 압축(zlib) 바이너리 1개로 저장하며, 차량 번호 테이블을
+함께 저장하여 본 DB 없이도 읽을 수 있다. 일별 목록/날짜별 조회 API는 본 DB에 없는 날짜를
+보관 파일에서 읽는다.
+"""
+import glob
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .snapshots import delete_collections, get_vehicle_ids, load_buses, pack_buses, unpack_buses
+
+
+ARCHIVE_FILE_PREFIX = 'bus_archive_'
+
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archived_day (
+        route_id TEXT NOT NULL,
+        collection_date TEXT NOT NULL,
+        total_collections INTEGER NOT NULL,
+        successful_collections INTEGER NOT NULL,
+        error_collections INTEGER NOT NULL,
+        skipped_collections INTEGER NOT NULL,
+        bus_count INTEGER NOT NULL,
+        last_collection_time TEXT,
+        archived_at TEXT NOT NULL,
+        PRIMARY KEY (route_id, collection_date)
+    );
+    CREATE TABLE IF NOT EXISTS collection (
+        id INTEGER PRIMARY KEY,
+        route_id TEXT NOT NULL,
+        query_time TEXT NOT NULL,
+        collection_date TEXT NOT NULL,
+        result_code INTEGER NOT NULL,
+        result_message TEXT NOT NULL,
+        is_error INTEGER NOT NULL,
+        error_message TEXT NOT NULL,
+        is_skipped INTEGER NOT NULL,
+        skip_reason TEXT NOT NULL,
+        created_at TEXT,
+        buses BLOB
+    );
+    CREATE INDEX IF NOT EXISTS collection_day_idx ON collection (route_id, collection_date, query_time);
+    CREATE TABLE IF NOT EXISTS vehicle (
+        id INTEGER PRIMARY KEY,
+        plate_no TEXT NOT NULL
+    );
+"""
+
+# 보관 작업은 한 번에 하나만 실행
+_archive_lock = threading.Lock()
+
+# 보관 파일별 일별 요약 캐시 {경로: (수정 시각, 요약 목록)}
+_summary_cache = {}
+
+
+class ArchivedCollection:
+    """
+    보관 파일에서 읽은 수집 건 (BusCollection과 같은 속성 + 버스 목록)
+    """
+
+    def __init__(self, row, plates):
+        (self.id, self.route_id, query_time, collection_date, self.result_code, self.result_message,
+         is_error, self.error_message, is_skipped, self.skip_reason, created_at, blob) = row
+        self.query_time = datetime.fromisoformat(query_time)
+        self.collection_date = date.fromisoformat(collection_date)
+        self.is_error = bool(is_error)
+        self.is_skipped = bool(is_skipped)
+        self.created_at = datetime.fromisoformat(created_at) if created_at else None
+        self.buses = [
+            {
+                'plate_no': plates.get(vehicle_id, 'N/A'),
+                'remain_seat_cnt': remain_seat_cnt,
+                'station_seq': station_seq
+            }
+            for vehicle_id, station_seq, remain_seat_cnt in unpack_buses(zlib.decompress(blob) if blob else b'')
+        ]
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')))
+
+
+def get_archive_path(collection_date):
+    """
+    수집 날짜가 속한 월의 보관 파일 경로
+    """
+    return os.path.join(get_archive_dir(), f"{ARCHIVE_FILE_PREFIX}{collection_date.strftime('%Y-%m')}.sqlite3")
+
+
+def get_archive_files():
+    return sorted(glob.glob(os.path.join(get_archive_dir(), f"{ARCHIVE_FILE_PREFIX}*.sqlite3")))
+
+
+def _connect(path, readonly=False):
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(ARCHIVE_SCHEMA)
+    return conn
+
+
+def get_archivable_days(before_date, route_id=None):
+    """
+    before_date 이전(미포함)의 본 DB 수집 날짜 목록 [(노선 ID, 수집 날짜), ...]
+    """
+    from .models import BusCollection
+
+    days = BusCollection.objects.filter(collection_date__lt=before_date)
+    if route_id:
+        days = days.filter(route_id=route_id)
+    return list(
+        days.order_by('collection_date', 'route_id').values_list('route_id', 'collection_date').distinct()
+    )
+
+
+def archive_day(route_id, collection_date):
+    """
+    한 노선의 하루치 수집 데이터를 월별 보관 파일로 옮기고 본 DB에서 삭제
+    """
+    from .models import BusCollection
+
+    collections = list(
+        BusCollection.objects.filter(route_id=route_id, collection_date=collection_date).order_by('query_time', 'id')
+    )
+    if not collections:
+        return None
+
+    buses = load_buses(collections)
+    vehicle_ids = get_vehicle_ids(bus['plate_no'] for items in buses.values() for bus in items)
+
+    collection_rows = []
+    bus_count = 0
+    for collection in collections:
+        entries = [
+            (vehicle_ids[bus['plate_no']], bus['station_seq'], bus['remain_seat_cnt'])
+            for bus in buses[collection.id]
+        ]
+        bus_count += len(entries)
+        collection_rows.append((
+            collection.id,
+            collection.route_id,
+            collection.query_time.isoformat(),
+            collection.collection_date.isoformat(),
+            collection.result_code,
+            collection.result_message,
+            int(collection.is_error),
+            collection.error_message,
+            int(collection.is_skipped),
+            collection.skip_reason,
+            collection.created_at.isoformat() if collection.created_at else None,
+            zlib.compress(pack_buses(entries))
+        ))
+
+    summary = (
+        route_id,
+        collection_date.isoformat(),
+        len(collections),
+        sum(1 for c in collections if not c.is_error and not c.is_skipped),
+        sum(1 for c in collections if c.is_error),
+        sum(1 for c in collections if c.is_skipped),
+        bus_count,
+        max(c.query_time for c in collections).isoformat(),
+        timezone.now().isoformat()
+    )
+
+    # 보관 파일 기록을 먼저 커밋한 뒤 본 DB에서 삭제 (중간에 실패해도 데이터 유실 없음)
+    path = get_archive_path(collection_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute(
+                "DELETE FROM collection WHERE route_id = ? AND collection_date = ?",
+                (route_id, collection_date.isoformat())
+            )
+            conn.executemany("INSERT INTO collection VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", collection_rows)
+            conn.executemany(
+                "INSERT OR IGNORE INTO vehicle (id, plate_no) VALUES (?, ?)",
+                [(vehicle_id, plate_no) for plate_no, vehicle_id in vehicle_ids.items()]
+            )
+            conn.execute("INSERT OR REPLACE INTO archived_day VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", summary)
+    finally:
+        conn.close()
+
+    delete_collections(route_id=route_id, start_date=collection_date, end_date=collection_date)
+
+    return {
+        'route_id': route_id,
+        'date': collection_date.strftime('%Y-%m-%d'),
+        'collections': len(collections),
+        'buses': bus_count,
+        'file': path
+    }
+
+
+def archive_old_days(retention_days=None, before_date=None, route_id=None, dry_run=False):
+    """
+    보존 기간이 지난 날짜를 모두 보관 파일로 이동
+    (before_date를 주면 그 날짜 이전, 아니면 오늘 - retention_days 이전)
+    """
+    if before_date is None:
+        if retention_days is None:
+            retention_days = getattr(settings, 'ARCHIVE_RETENTION_DAYS', 0)
+        if retention_days < 1:
+            raise ValueError("보존 기간은 1일 이상이어야 합니다.")
+        before_date = timezone.localdate() - timedelta(days=retention_days)
+
+    days = get_archivable_days(before_date, route_id)
+    if dry_run:
+        return [{'route_id': r, 'date': d.strftime('%Y-%m-%d')} for r, d in days]
+
+    results = []
+    with _archive_lock:
+        for day_route_id, collection_date in days:
+            result = archive_day(day_route_id, collection_date)
+            if result:
+                print(f"보관 완료: {result['route_id']} {result['date']} "
+                      f"({result['collections']}건, 버스 {result['buses']}대) -> {result['file']}")
+                results.append(result)
+    return results
+
+
+def run_scheduled_archive():
+    """
+    수집 관리자 주기 작업용 - 설정된 보존 기간(ARCHIVE_RETENTION_DAYS) 기준 보관
+    """
+    return archive_old_days(retention_days=getattr(settings, 'ARCHIVE_RETENTION_DAYS', 0))
+
+
+def _read_summaries(path):
+    mtime = os.path.getmtime(path)
+    cached = _summary_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    conn = _connect(path, readonly=True)
+    try:
+        rows = conn.execute("""
+            SELECT route_id, collection_date, total_collections, successful_collections,
+                   error_collections, skipped_collections, last_collection_time
+            FROM archived_day
+        """).fetchall()
+    finally:
+        conn.close()
+
+    summaries = [
+        {
+            'route_id': route_id,
+            'collection_date': date.fromisoformat(collection_date),
+            'total_collections': total,
+            'successful_collections': successful,
+            'error_collections': errors,
+            'skipped_collections': skipped,
+            'last_collection_time': datetime.fromisoformat(last_time) if last_time else None
+        }
+        for route_id, collection_date, total, successful, errors, skipped, last_time in rows
+    ]
+    _summary_cache[path] = (mtime, summaries)
+    return summaries
+
+
+def get_archived_days(route_id):
+    """
+    노선의 보관된 날짜별 요약 목록 (일별 목록 API와 같은 형식)
+    """
+    days = []
+    for path in get_archive_files():
+        days.extend(item for item in _read_summaries(path) if item['route_id'] == route_id)
+    return days
+
+
+def get_archived_collections(route_id, collection_date):
+    """
+    보관 파일에서 하루치 수집 건 조회 (쿼리 시간 역순, 보관되지 않았으면 빈 목록)
+    """
+    path = get_archive_path(collection_date)
+    if not os.path.exists(path):
+        return []
+
+    conn = _connect(path, readonly=True)
+    try:
+        rows = conn.execute("""
+            SELECT id, route_id, query_time, collection_date, result_code, result_message,
+                   is_error, error_message, is_skipped, skip_reason, created_at, buses
+            FROM collection
+            WHERE route_id = ? AND collection_date = ?
+            ORDER BY query_time DESC
+        """, (route_id, collection_date.isoformat())).fetchall()
+        plates = dict(conn.execute("SELECT id, plate_no FROM vehicle").fetchall()) if rows else {}
+    finally:
+        conn.close()
+
+    return [ArchivedCollection(row, plates) for row in rows]
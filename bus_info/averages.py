@@ -0,0 +1,232 @@
+"""
+기간 평균 분석 - 배차 순서/정류장별 승객 수 누적 및 프로세스 풀 병렬 계산
+
+날짜마다 배차 재구성과 결측치 보정은 서로 독립이므로, 병렬 모드(ANALYSIS_WORKERS > 1)에서는
+날짜를 연속 구간으로 나누어 프로세스 풀의 작업자에게 맡긴다. 작업자는 각자 읽기 전용 연결을 열어
+구간의 합계/개수만 돌려주고, 요청 스레드가 이를 합쳐 평균을 계산하므로 결과는 순차 계산과 같다.
+AverageBuckets는 하루를 한 번만 재구성하여 전체/평일/주말/요일별 평균 10종에 함께 누적한다.
+"""
+import multiprocessing
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .analysis_pool import analysis_pool
+from .config import ANALYSIS_PARALLEL_MIN_DAYS, ANALYSIS_WORKERS, DEFAULT_ROUTE_ID
+from .trips import ZERO_STATION_LIMIT, get_day_fingerprints, iter_day_trips
+
+
+# 평균 분석용 프로세스 풀 (요청마다 만들지 않고 프로세스 단위로 재사용)
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# 평균 분석 종류별 (weekday_filter, is_weekend_only) 조건: 전체, 평일, 주말, 요일별 ('0'=월요일 ... '6'=일요일)
+AVERAGE_VARIANTS = {
+    'all': (None, None),
+    'weekday': (None, False),
+    'weekend': (None, True),
+    **{str(weekday): (weekday, None) for weekday in range(7)}
+}
+
+
+def get_date_variants(date_str):
+    """
+    날짜가 속하는 평균 분석 종류 (전체, 평일/주말, 요일)
+    """
+    weekday = datetime.strptime(date_str, '%Y-%m-%d').weekday()
+    return 'all', ('weekend' if weekday >= 5 else 'weekday'), str(weekday)
+
+
+class TripAverage:
+    """
+    배차 순서/정류장별 승객 수 합계와 누적 배차 수 (날짜 단위로 누적, 부분 결과끼리 합산 가능)
+    """
+
+    def __init__(self):
+        # {배차_순서: {정류소 순번: 승객 수 합계}} / {배차_순서: {정류소 순번: 누적 배차 수}}
+        self.sums = {}
+        self.counts = {}
+        # 가장 많은 배차를 가진 날짜의 배차 수 (배차 이름 기준)
+        self.max_trip_count = None
+        self.day_count = 0
+
+    def add_day(self, date_str, trips):
+        """
+        하루치 배차 [(배차 키, 승객 0명 정류장 수, {정류소 순번: 승객 수}), ...] 누적
+        """
+        self.day_count += 1
+        if self.max_trip_count is None or len(trips) > self.max_trip_count:
+            self.max_trip_count = len(trips)
+
+        # 0이 10개 미만인 배차만 배차 순서에 따라 데이터 누적
+        for trip_order, (trip_key, zero_count, passengers) in enumerate(trips):
+            if zero_count >= ZERO_STATION_LIMIT:
+                continue
+            sums = self.sums.setdefault(trip_order, {})
+            counts = self.counts.setdefault(trip_order, {})
+            for station_idx, value in passengers.items():
+                sums[station_idx] = sums.get(station_idx, 0) + value
+                counts[station_idx] = counts.get(station_idx, 0) + 1
+
+    def merge(self, other):
+        """
+        다른 구간의 누적 결과 합산
+        """
+        self.day_count += other.day_count
+        if other.max_trip_count is not None and (
+                self.max_trip_count is None or other.max_trip_count > self.max_trip_count):
+            self.max_trip_count = other.max_trip_count
+
+        for trip_order, other_sums in other.sums.items():
+            sums = self.sums.setdefault(trip_order, {})
+            counts = self.counts.setdefault(trip_order, {})
+            for station_idx, total in other_sums.items():
+                sums[station_idx] = sums.get(station_idx, 0) + total
+                counts[station_idx] = counts.get(station_idx, 0) + other.counts[trip_order][station_idx]
+        return self
+
+    def get_averages(self):
+        """
+        (배차 이름 목록, {배차 이름: {정류소 순번: 평균 승객 수}}) - 소수점 첫째 자리 반올림
+        """
+        avg_passenger_data = {}
+        sorted_trip_keys = []
+        for order_idx in range(self.max_trip_count or 0):
+            if order_idx not in self.sums:
+                continue
+            # 배차 이름 생성 (순서 기반)
+            trip_name = f"배차_{order_idx + 1}"
+            sorted_trip_keys.append(trip_name)
+            counts = self.counts[order_idx]
+            avg_passenger_data[trip_name] = {
+                station_idx: round(total / counts[station_idx], 1)
+                for station_idx, total in sorted(self.sums[order_idx].items())
+            }
+        return sorted_trip_keys, avg_passenger_data
+
+
+class AverageBuckets:
+    """
+    평균 분석 종류별 TripAverage 묶음 (하루치 배차를 해당하는 종류 모두에 누적)
+    """
+
+    def __init__(self):
+        self.buckets = {variant: TripAverage() for variant in AVERAGE_VARIANTS}
+
+    def add_day(self, date_str, trips):
+        for variant in get_date_variants(date_str):
+            self.buckets[variant].add_day(date_str, trips)
+
+    def merge(self, other):
+        for variant, average in other.buckets.items():
+            self.buckets[variant].merge(average)
+        return self
+
+
+def accumulate_dates(db_path, date_condition, params, first_date, last_date, route_id=DEFAULT_ROUTE_ID,
+                     accumulator=TripAverage):
+    """
+    작업자 프로세스 - 조건에 맞는 날짜 중 [first_date, last_date] 구간의 배차를 읽어 누적 결과 반환
+    """
+    average = accumulator()
+    # 업로드 파일은 작업자 프로세스의 연결 풀에서 읽기 전용 연결을 빌림 (다음 요청에서도 캐시 재사용)
+    with analysis_pool.connection(db_path) as conn:
+        condition = f"({date_condition}) AND c.collection_date BETWEEN ? AND ?"
+        for date_str, trips in iter_day_trips(conn.cursor(), condition, (*params, first_date, last_date), route_id):
+            average.add_day(date_str, trips)
+    return average
+
+
+def get_pool(workers):
+    """
+    작업자 수에 맞는 프로세스 풀 (수집 스레드가 도는 프로세스에서도 안전하도록 spawn 방식)
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def split_dates(dates, parts):
+    """
+    날짜 목록을 연속 구간 parts개로 분할
+    """
+    size, extra = divmod(len(dates), parts)
+    chunks = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        if end > start:
+            chunks.append(dates[start:end])
+        start = end
+    return chunks
+
+
+def calculate_trip_average(db_path, date_condition, params, route_id=DEFAULT_ROUTE_ID, workers=None,
+                           accumulator=TripAverage):
+    """
+    조건에 맞는 날짜들의 배차 평균 누적 결과 (accumulator 객체, 기본값: TripAverage)
+
+    workers(기본값: ANALYSIS_WORKERS)가 2 이상이고 날짜가 ANALYSIS_PARALLEL_MIN_DAYS일 이상이면
+    프로세스 풀로 나누어 계산하고, 아니면 요청 스레드에서 하루씩 순차 계산한다.
+    """
+    if workers is None:
+        workers = ANALYSIS_WORKERS
+
+    with analysis_pool.connection(db_path) as conn:
+        cursor = conn.cursor()
+        if workers > 1:
+            dates = list(get_day_fingerprints(cursor, date_condition, params, route_id))
+            if len(dates) >= max(ANALYSIS_PARALLEL_MIN_DAYS, 2):
+                average = _calculate_parallel(db_path, date_condition, params, dates, route_id, workers, accumulator)
+                if average is not None:
+                    return average
+
+        average = accumulator()
+        for date_str, trips in iter_day_trips(cursor, date_condition, params, route_id):
+            average.add_day(date_str, trips)
+        return average
+
+
+def calculate_average_buckets(db_path, start_date, end_date, route_id=DEFAULT_ROUTE_ID, workers=None):
+    """
+    기간 내 날짜를 한 번씩만 재구성하여 평균 분석 10종을 함께 누적 (AverageBuckets)
+    """
+    return calculate_trip_average(
+        db_path, "c.collection_date BETWEEN ? AND ?", (start_date, end_date), route_id, workers,
+        accumulator=AverageBuckets
+    )
+
+
+def _calculate_parallel(db_path, date_condition, params, dates, route_id, workers, accumulator):
+    # 작업자에게는 날짜 목록 대신 연속 구간의 처음/마지막 날짜를 넘김 (IN 절 변수 개수 제한 없음)
+    # 풀이 깨졌으면(작업자 비정상 종료 등) None을 반환하여 순차 계산으로 대체
+    try:
+        pool = get_pool(workers)
+        futures = [
+            pool.submit(accumulate_dates, db_path, date_condition, tuple(params), chunk[0], chunk[-1],
+                        route_id, accumulator)
+            for chunk in split_dates(dates, min(workers, len(dates)))
+        ]
+        average = accumulator()
+        for future in futures:
+            average.merge(future.result())
+        return average
+    except BrokenProcessPool as e:
+        print(f"평균 분석 프로세스 풀 오류, 순차 계산으로 대체: {e}")
+        reset_pool()
+        return None
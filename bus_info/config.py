@@ -8,11 +8,53 @@ GBIS_SERVICE_KEY = os.environ.get('GBIS_SERVICE_KEY', "KkkVy4H1CGa8fSuj2QR5%2BSH
 
 # API 기본 설정
 GBIS_API_BASE_URL = "https://apis.data.go.kr/6410000/buslocationservice/v2"
-GBIS_API_ENDPOINT = f"{GBIS_API_BASE_URL}/getBusLocationListv2"
+# 테스트 시 로컬 스텁 서버 주소로 대체 가능 (예: http://127.0.0.1:8001/getBusLocationListv2)
+GBIS_API_ENDPOINT = os.environ.get('GBIS_API_ENDPOINT', f"{GBIS_API_BASE_URL}/getBusLocationListv2")
 
 # API 요청 타임아웃 (초)
 API_TIMEOUT = 10
 
+# API 요청 재시도 설정 (5xx 응답/타임아웃/연결 오류 시 지터를 섞은 지수 백오프)
+API_MAX_RETRIES = int(os.environ.get('API_MAX_RETRIES', 2))
+API_BACKOFF_BASE = float(os.environ.get('API_BACKOFF_BASE', 0.5))
+API_BACKOFF_MAX = float(os.environ.get('API_BACKOFF_MAX', 5.0))
+
 # 응답 포맷
 RESPONSE_FORMAT = "json"
 
+# 기본 수집 노선 (직행좌석 8201번)
+DEFAULT_ROUTE_ID = "234001730"
+
+# 기본 수집 간격 (초)
+DEFAULT_INTERVAL_SECONDS = 90
+
+# 수집 대상 노선 목록 - "노선ID:간격초" 형식을 콤마로 구분 (간격 생략 시 기본 간격)
+# 예: COLLECTOR_ROUTES="234001730:90,234000026:60"
+COLLECTOR_ROUTES = os.environ.get('COLLECTOR_ROUTES', f"{DEFAULT_ROUTE_ID}:{DEFAULT_INTERVAL_SECONDS}")
+
+# 노선 수집 작업을 처리하는 워커 스레드 최대 개수 (노선 수와 무관하게 고정)
+COLLECTOR_MAX_WORKERS = int(os.environ.get('COLLECTOR_MAX_WORKERS', 4))
+
+# 수집 데이터 write-behind 저장 설정
+# 수집 스레드는 대기열에 넣기만 하고, 저장 스레드가 여러 스냅샷을 한 트랜잭션으로 묶어 저장
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'True').lower() == 'true'
+WRITER_BATCH_SIZE = int(os.environ.get('WRITER_BATCH_SIZE', 20))          # 이 개수가 모이면 즉시 저장
+WRITER_FLUSH_INTERVAL = float(os.environ.get('WRITER_FLUSH_INTERVAL', 5))  # 첫 스냅샷 대기 후 최대 저장 지연 (초)
+WRITER_MAX_ATTEMPTS = int(os.environ.get('WRITER_MAX_ATTEMPTS', 3))       # 저장 실패 시 배치 재시도 횟수
+WRITER_RETRY_DELAY = float(os.environ.get('WRITER_RETRY_DELAY', 0.5))    # 종료/flush 시 저장 재시도 대기 (초, 재시도마다 2배)
+
+# 버스 데이터 저장 방식
+# rows: 버스마다 BusData 행 저장 / packed: 수집 건마다 버스 목록을 바이너리 1개로 압축 저장
+STORAGE_MODE = os.environ.get('STORAGE_MODE', 'rows')
+
+# 변경분 저장 모드 - 같은 날짜의 직전 스냅샷과 버스 목록이 같으면 버스 데이터 없이 기준 수집 건만 참조
+DEDUP_UNCHANGED_SNAPSHOTS = os.environ.get('DEDUP_UNCHANGED_SNAPSHOTS', 'False').lower() == 'true'
+
+# 배차 결측치 보정/변화량 계산 엔진
+# python: 배차마다 정류장을 순회 / numpy: 배차 x 정류장 배열 연산 (numpy 설치 필요, 없으면 python 사용)
+# 두 엔진의 결과 비교와 속도 측정: python manage.py benchmark_engine --synthetic 5000
+ANALYSIS_ENGINE = os.environ.get('ANALYSIS_ENGINE', 'python')
+
+# 기간 평균 분석 병렬 계산 - 날짜를 프로세스 풀 작업자에게 나누어 계산 (1이면 요청 스레드에서 순차 계산)
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 1))
+ANALYSIS_PARALLEL_MIN_DAYS = int(os.environ.get('ANALYSIS_PARALLEL_MIN_DAYS', 14))  # 이보다 짧은 기간은 순차 계산
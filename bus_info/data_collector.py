@@ -1,27 +1,56 @@
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time as dt_time
+from django.conf import settings
 from django.utils import timezone
+from .scheduler import DeadlineScheduler
+from .gbis_client import GbisClient
+from .writer import PendingSnapshot, snapshot_writer, write_snapshots
+from .db_tuning import checkpoint_wal, get_sqlite_status
+from .archive import run_scheduled_archive
+from .db_upload import run_scheduled_upload_cleanup
+from .trips import run_scheduled_trip_refresh
+from .snapshots import parse_station_seq
 from .config import (
-    GBIS_SERVICE_KEY, 
-    GBIS_API_ENDPOINT, 
-    API_TIMEOUT, 
-    RESPONSE_FORMAT
+    DEFAULT_ROUTE_ID,
+    DEFAULT_INTERVAL_SECONDS,
+    COLLECTOR_ROUTES,
+    COLLECTOR_MAX_WORKERS,
+    WRITE_BEHIND_ENABLED,
+    DEDUP_UNCHANGED_SNAPSHOTS
 )
-import requests
-import urllib.parse
+
+
+class CollectionInProgress(Exception):
+    """
+    같은 노선의 수집이 이미 진행 중
+    """
 
 
 class BusDataCollector:
     """
-    버스 데이터를 자동으로 수집하고 데이터베이스에 저장하는 클래스
+    단일 노선의 버스 데이터를 수집하고 데이터베이스에 저장하는 클래스
+    (스케줄링은 CollectorManager가 담당)
     """
     
-    def __init__(self, route_id="234001730", interval_seconds=90):
+    def __init__(self, route_id=DEFAULT_ROUTE_ID, interval_seconds=DEFAULT_INTERVAL_SECONDS, client=None):
         self.route_id = route_id
         self.interval_seconds = interval_seconds
+        self.client = client or GbisClient()
         self.is_running = False
-        self.thread = None
+        
+        # 노선별 수집 상태
+        self.next_collection_time = None
+        self.last_collection_time = None
+        self.last_snapshot = None
+        self.last_processing_time = None
+        self.total_collections = 0
+        self.failed_collections = 0
+        self.deduplicated_collections = 0
+        
+        # 변경분 저장용 마지막 전체 스냅샷 (수집 날짜, 정렬된 버스 목록, 스냅샷)
+        self._last_full = None
     
     def is_skip_time(self, query_time_str=None):
         """
@@ -65,22 +94,8 @@ class BusDataCollector:
                     'skip_reason': '00:00 ~ 05:30 시간대는 수집하지 않습니다. (KST 기준)'
                 }
             
-            # 서비스키 디코딩
-            decoded_service_key = urllib.parse.unquote(GBIS_SERVICE_KEY)
-            
-            # API 요청 파라미터
-            params = {
-                'serviceKey': decoded_service_key,
-                'routeId': self.route_id,
-                'format': RESPONSE_FORMAT
-            }
-            
-            # API 요청
-            response = requests.get(GBIS_API_ENDPOINT, params=params, timeout=API_TIMEOUT)
-            response.raise_for_status()
-            
-            # JSON 응답 파싱
-            data = response.json()
+            # API 요청 (세션 재사용, 일시적 오류는 클라이언트에서 재시도)
+            data = self.client.get_bus_locations(self.route_id)
             
             # 응답 데이터 처리
             response_data = data.get('response', {})
@@ -165,59 +180,86 @@ class BusDataCollector:
                 'error_message': str(e)
             }
     
-    def save_to_database(self, data):
+    def build_snapshot(self, data):
         """
-        수집된 데이터를 데이터베이스에 저장
+        수집된 데이터로 저장 전 스냅샷(BusCollection + 버스 목록) 생성
         """
-        try:
-            from .models import BusCollection, BusData
-            
-            query_time_str = data.get('query_time', 'N/A')
-            
-            # 쿼리 시간 파싱
-            if query_time_str != 'N/A':
-                if '.' in query_time_str:
-                    query_time_str = query_time_str.split('.')[0]
-                query_time = datetime.strptime(query_time_str, '%Y-%m-%d %H:%M:%S')
-                query_time = timezone.make_aware(query_time)
-                collection_date = query_time.date()
-            else:
-                query_time = timezone.now()
-                collection_date = query_time.date()
-            
-            # BusCollection 생성
-            collection = BusCollection.objects.create(
-                route_id=self.route_id,
-                query_time=query_time,
-                collection_date=collection_date,
-                result_code=data.get('result_code', 0),
-                result_message=data.get('result_message', ''),
-                is_error=data.get('error', False),
-                error_message=data.get('error_message', ''),
-                is_skipped=data.get('skipped', False),
-                skip_reason=data.get('skip_reason', '')
-            )
-            
-            # 버스 데이터가 있는 경우에만 BusData 생성
-            if 'buses' in data and not data.get('error', False) and not data.get('skipped', False):
-                bus_data_objects = []
-                for bus in data['buses']:
-                    bus_data_objects.append(BusData(
-                        collection=collection,
-                        plate_no=bus.get('plateNo', 'N/A'),
-                        remain_seat_cnt=bus.get('remainSeatCnt', -1),
-                        station_seq=str(bus.get('stationSeq', 'N/A'))
-                    ))
-                
-                # 벌크 생성으로 성능 최적화
-                if bus_data_objects:
-                    BusData.objects.bulk_create(bus_data_objects)
-            
-            return collection.id
-            
-        except Exception as e:
-            print(f"데이터베이스 저장 오류: {e}")
-            return None
+        from .models import BusCollection
+        
+        query_time_str = data.get('query_time', 'N/A')
+        
+        # 쿼리 시간 파싱
+        if query_time_str != 'N/A':
+            if '.' in query_time_str:
+                query_time_str = query_time_str.split('.')[0]
+            query_time = datetime.strptime(query_time_str, '%Y-%m-%d %H:%M:%S')
+            query_time = timezone.make_aware(query_time)
+            collection_date = query_time.date()
+        else:
+            query_time = timezone.now()
+            collection_date = query_time.date()
+        
+        collection = BusCollection(
+            route_id=self.route_id,
+            query_time=query_time,
+            collection_date=collection_date,
+            result_code=data.get('result_code', 0),
+            result_message=data.get('result_message', ''),
+            is_error=data.get('error', False),
+            error_message=data.get('error_message', ''),
+            is_skipped=data.get('skipped', False),
+            skip_reason=data.get('skip_reason', '')
+        )
+        
+        # 버스 데이터가 있는 경우에만 버스 목록 생성 (차량 번호, 잔여 좌석, 정류소 순번)
+        buses = []
+        if 'buses' in data and not data.get('error', False) and not data.get('skipped', False):
+            for bus in data['buses']:
+                buses.append((
+                    str(bus.get('plateNo', 'N/A')),
+                    int(bus.get('remainSeatCnt', -1)),
+                    parse_station_seq(bus.get('stationSeq'))
+                ))
+        
+        return PendingSnapshot(collection, buses)
+    
+    def link_unchanged(self, snapshot):
+        """
+        직전 전체 스냅샷과 버스 목록이 같으면 참조만 저장하도록 표시
+        (같은 노선, 같은 수집 날짜 안에서만 참조하여 날짜 단위 삭제/보관과 일관성 유지)
+        """
+        collection = snapshot.collection
+        if collection.is_error or collection.is_skipped:
+            return snapshot
+        
+        buses = tuple(sorted(snapshot.buses, key=lambda bus: (bus[0], bus[1], -1 if bus[2] is None else bus[2])))
+        key = (collection.collection_date, buses)
+        last = self._last_full
+        if last is not None and last[0] == key and not last[1].failed:
+            snapshot.base = last[1]
+            self.deduplicated_collections += 1
+        else:
+            self._last_full = (key, snapshot)
+        return snapshot
+    
+    def queue_snapshot(self, data):
+        """
+        수집된 데이터를 write-behind 대기열에 등록 (비활성화 시 즉시 저장)
+        """
+        snapshot = self.build_snapshot(data)
+        if DEDUP_UNCHANGED_SNAPSHOTS:
+            self.link_unchanged(snapshot)
+        
+        if not WRITE_BEHIND_ENABLED:
+            try:
+                write_snapshots([snapshot])
+                snapshot.resolve()
+            except Exception as e:
+                print(f"데이터베이스 저장 오류: {e}")
+                snapshot.resolve(error=str(e))
+            return snapshot
+        
+        return snapshot_writer.submit(snapshot)
     
     def get_log_time_kst(self):
         """
@@ -233,9 +275,10 @@ class BusDataCollector:
         except Exception as e:
             return f"[시간 오류: {e}]"
 
-    def collect_and_save(self):
+    def collect_and_save(self, wait=False):
         """
-        데이터 수집 및 저장 실행
+        데이터 수집 및 저장 실행 (저장은 write-behind 대기열을 거침)
+        wait: True면 저장 완료까지 대기
         """
         data = self.collect_bus_data()
         query_time = data.get('query_time', 'N/A')
@@ -247,23 +290,24 @@ class BusDataCollector:
         if data.get('skipped'):
             print(f"{log_time} 수집 건너뜀: {data.get('skip_reason')}")
             print(f"  - API 쿼리 시간: {query_time}")
-            # 건너뛴 경우에도 데이터베이스에 기록
-            collection_id = self.save_to_database(data)
-            return collection_id
+        elif 'buses' in data:
+            print(f"  - API 쿼리 시간: {query_time}")
+            print(f"  - 수집된 버스 수: {len(data['buses'])}대")
+            for bus in data['buses']:
+                print(f"    🚌 {bus['plateNo']} - 잔여좌석: {bus['remainSeatCnt']}개, 정류소순번: {bus['stationSeq']}")
         
-        collection_id = self.save_to_database(data)
+        # 건너뛴 경우에도 데이터베이스에 기록
+        snapshot = self.queue_snapshot(data)
         
-        if collection_id:
-            print(f"{log_time} 데이터 저장 완료: Collection ID {collection_id}")
-            if 'buses' in data:
-                print(f"  - API 쿼리 시간: {query_time}")
-                print(f"  - 수집된 버스 수: {len(data['buses'])}대")
-                for bus in data['buses']:
-                    print(f"    🚌 {bus['plateNo']} - 잔여좌석: {bus['remainSeatCnt']}개, 정류소순번: {bus['stationSeq']}")
-        else:
-            print(f"{log_time} 데이터 저장 실패")
+        if wait:
+            snapshot_writer.flush()
+            collection_id = snapshot.wait(timeout=30)
+            if collection_id:
+                print(f"{log_time} 데이터 저장 완료: Collection ID {collection_id}")
+            else:
+                print(f"{log_time} 데이터 저장 실패")
         
-        return collection_id
+        return snapshot
     
     def get_current_interval(self):
         """
@@ -271,66 +315,358 @@ class BusDataCollector:
         """
         return self.interval_seconds
     
-    def start_collection(self):
+    def run_once(self, wait=False):
         """
-        자동 수집 시작
+        1회 수집을 실행하고 노선별 상태를 갱신
         """
-        if self.is_running:
-            print("이미 수집이 실행 중입니다.")
-            return
+        start_time = time.time()
+        snapshot = None
+        try:
+            snapshot = self.collect_and_save(wait=wait)
+        finally:
+            self.last_collection_time = start_time
+            self.last_processing_time = time.time() - start_time
+            self.last_snapshot = snapshot
+            self.total_collections += 1
+            if snapshot is None:
+                self.failed_collections += 1
+        return snapshot
+    
+    def get_last_result(self):
+        """
+        마지막 수집 결과 (queued / success / failed)
+        """
+        snapshot = self.last_snapshot
+        if snapshot is None:
+            return 'failed' if self.total_collections else None
+        if not snapshot.is_done:
+            return 'queued'
+        return 'failed' if snapshot.failed else 'success'
+    
+    def get_status(self):
+        """
+        수집 상태 반환
+        """
+        def format_time(timestamp):
+            if timestamp is None:
+                return None
+            return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
         
-        self.is_running = True
+        return {
+            'is_running': self.is_running,
+            'route_id': self.route_id,
+            'interval_seconds': self.interval_seconds,
+            'next_collection_time': format_time(self.next_collection_time) if self.is_running else None,
+            'last_collection_time': format_time(self.last_collection_time),
+            'last_collection_id': self.last_snapshot.collection_id if self.last_snapshot else None,
+            'last_processing_time': round(self.last_processing_time, 3) if self.last_processing_time is not None else None,
+            'last_result': self.get_last_result(),
+            'total_collections': self.total_collections,
+            'failed_collections': self.failed_collections,
+            'deduplicated_collections': self.deduplicated_collections
+        }
+
+
+class CollectorManager:
+    """
+    여러 노선의 수집기를 등록/관리하는 클래스
+    
+    노선마다 스레드를 두지 않고, 데드라인 스케줄러가 수집 시각이 된 노선을
+    고정 크기 워커 풀에 넘긴다. GBIS 클라이언트(커넥션 풀)는 모든 노선이 공유한다.
+    """
+    
+    def __init__(self, max_workers=COLLECTOR_MAX_WORKERS, client=None):
+        self.max_workers = max_workers
+        self.client = client or GbisClient(pool_maxsize=max_workers)
         
-        def collection_loop():
-            next_collection_time = time.time()
-            
-            while self.is_running:
-                current_time = time.time()
+        self._collectors = {}
+        self._in_flight = set()
+        self._lock = threading.RLock()
+        self._executor = None
+        self.scheduler = DeadlineScheduler(name='bus-collector-scheduler')
+        
+        # 주기 유지보수 작업 (WAL 체크포인트 등): 이름 -> 작업 정보
+        self._jobs = {}
+    
+    def register_route(self, route_id, interval_seconds=DEFAULT_INTERVAL_SECONDS):
+        """
+        수집 노선 등록 (이미 등록된 노선이면 간격만 갱신)
+        """
+        route_id = str(route_id)
+        with self._lock:
+            collector = self._collectors.get(route_id)
+            if collector is None:
+                collector = BusDataCollector(route_id=route_id, interval_seconds=interval_seconds, client=self.client)
+                self._collectors[route_id] = collector
+            else:
+                collector.interval_seconds = interval_seconds
                 
-                if current_time >= next_collection_time:
-                    start_time = time.time()
-                    self.collect_and_save()
-                    end_time = time.time()
-                    
-                    # 현재 시간에 따른 간격 결정
-                    current_interval = self.get_current_interval()
-                    next_collection_time += current_interval
-                    
-                    # 만약 처리 시간이 너무 길어서 다음 수집 시간을 놓쳤다면, 즉시 다음 수집 시간으로 설정
-                    if next_collection_time <= current_time:
-                        next_collection_time = current_time + current_interval
-                    
-                    processing_time = end_time - start_time
-                    wait_time = next_collection_time - current_time
-                    
-                    print(f"  - 처리 시간: {processing_time:.2f}초, 다음 수집까지: {wait_time:.1f}초")
+                # 실행 중이면 마지막 수집 시각 기준으로 다음 수집을 재예약
+                if collector.is_running and collector.route_id not in self._in_flight and collector.last_collection_time:
+                    self._schedule_collector(collector, collector.last_collection_time + interval_seconds)
+            return collector
+    
+    def unregister_route(self, route_id):
+        """
+        수집 노선 등록 해제
+        """
+        with self._lock:
+            collector = self._collectors.pop(str(route_id), None)
+            if collector:
+                collector.is_running = False
+                self.scheduler.cancel(collector.route_id)
+            return collector is not None
+    
+    def add_job(self, name, interval_seconds, func):
+        """
+        주기 유지보수 작업 등록 (수집 여부와 관계없이 워커 풀에서 interval_seconds마다 실행)
+        
+        분석만 하는 프로세스에서도 업로드 정리, WAL 체크포인트 등이 돌도록 스케줄러를 바로 시작한다.
+        """
+        with self._lock:
+            self._jobs[name] = {
+                'interval_seconds': interval_seconds,
+                'func': func,
+                'last_run': None,
+                'last_duration': None,
+                'last_error': None,
+                'runs': 0
+            }
+            if self.scheduler.is_alive():
+                self._schedule_job(name, time.time() + interval_seconds)
+            else:
+                self._ensure_workers()
+    
+    def get_collector(self, route_id):
+        """
+        등록된 노선의 수집기 반환 (없으면 None)
+        """
+        return self._collectors.get(str(route_id))
+    
+    def get_route_ids(self):
+        """
+        등록된 노선 ID 목록 반환
+        """
+        with self._lock:
+            return list(self._collectors.keys())
+    
+    def start(self, route_id=None):
+        """
+        노선 자동 수집 시작 (route_id가 없으면 등록된 전체 노선)
+        """
+        with self._lock:
+            targets = self._get_targets(route_id)
+            now = time.time()
+            for collector in targets:
+                if collector.is_running:
+                    print(f"이미 수집이 실행 중입니다. - 노선: {collector.route_id}")
+                    continue
+                collector.is_running = True
+                print(f"자동 데이터 수집 시작 - 노선: {collector.route_id}, 간격: {collector.interval_seconds}초")
                 
-                # 0.1초마다 체크 (CPU 사용량 최소화)
-                time.sleep(0.1)
+                # 수집 중인 작업이 끝나면 완료 처리에서 이 시각 기준으로 재예약됨
+                if collector.route_id in self._in_flight:
+                    collector.next_collection_time = now
+                else:
+                    self._schedule_collector(collector, now)
+            self._ensure_workers()
+    
+    def stop(self, route_id=None):
+        """
+        노선 자동 수집 중지 (route_id가 없으면 등록된 전체 노선)
+        """
+        with self._lock:
+            targets = self._get_targets(route_id)
+            for collector in targets:
+                collector.is_running = False
+                collector.next_collection_time = None
+                self.scheduler.cancel(collector.route_id)
+                print(f"자동 데이터 수집 중지 - 노선: {collector.route_id}")
+    
+    def shutdown(self):
+        """
+        전체 수집 중지, 스케줄러 및 워커 풀 종료 (대기 중인 스냅샷은 저장)
+        """
+        self.stop()
+        self.scheduler.stop()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        snapshot_writer.stop()
+        self.client.close()
+    
+    def collect_once(self, route_id):
+        """
+        지정 노선 1회 수집 (호출 스레드에서 저장 완료까지 동기 실행)
+        같은 노선의 자동/수동 수집이 진행 중이면 CollectionInProgress
+        """
+        collector = self.get_collector(route_id)
+        if collector is None:
+            raise KeyError(f"등록되지 않은 노선입니다: {route_id}")
         
-        self.thread = threading.Thread(target=collection_loop, daemon=True)
-        self.thread.start()
-        print(f"자동 데이터 수집 시작 - 노선: {self.route_id}, 간격: {self.interval_seconds}초")
+        with self._lock:
+            if collector.route_id in self._in_flight:
+                raise CollectionInProgress(f"이미 수집이 진행 중입니다. - 노선: {collector.route_id}")
+            self._in_flight.add(collector.route_id)
+        
+        try:
+            snapshot = collector.run_once(wait=True)
+        finally:
+            with self._lock:
+                self._in_flight.discard(collector.route_id)
+                
+                # 수동 수집 중 예정 시각이 되어 건너뛴 자동 수집은 다시 예약
+                if collector.is_running and self.scheduler.get_due_time(collector.route_id) is None:
+                    self._schedule_collector(collector, time.time() + collector.get_current_interval())
+        return snapshot.collection_id if snapshot else None
     
-    def stop_collection(self):
+    def is_running(self, route_id=None):
         """
-        자동 수집 중지
+        수집 실행 여부 (route_id가 없으면 하나라도 실행 중인지)
         """
-        self.is_running = False
-        if self.thread:
-            self.thread.join(timeout=5)
-        print("자동 데이터 수집 중지")
+        if route_id is not None:
+            collector = self.get_collector(route_id)
+            return bool(collector and collector.is_running)
+        return any(c.is_running for c in list(self._collectors.values()))
     
-    def get_status(self):
+    def get_status(self, route_id=None):
         """
-        수집 상태 반환
+        노선별 수집 상태 반환
         """
+        if route_id is not None:
+            collector = self.get_collector(route_id)
+            if collector is None:
+                return None
+            status = collector.get_status()
+            status['in_flight'] = collector.route_id in self._in_flight
+            return status
+        
         return {
-            'is_running': self.is_running,
-            'route_id': self.route_id,
-            'interval_seconds': self.interval_seconds
+            'is_running': self.is_running(),
+            'max_workers': self.max_workers,
+            'in_flight': len(self._in_flight),
+            'routes': [self.get_status(rid) for rid in self.get_route_ids()],
+            'scheduler': self.scheduler.get_stats(),
+            'http': self.client.get_stats(),
+            'writer': snapshot_writer.get_stats(),
+            'sqlite': get_sqlite_status(),
+            'jobs': {
+                name: {k: v for k, v in job.items() if k != 'func'}
+                for name, job in list(self._jobs.items())
+            }
         }
+    
+    def _get_targets(self, route_id):
+        if route_id is None:
+            return list(self._collectors.values())
+        collector = self.get_collector(route_id)
+        if collector is None:
+            raise KeyError(f"등록되지 않은 노선입니다: {route_id}")
+        return [collector]
+    
+    def _ensure_workers(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bus-collector')
+        if not self.scheduler.is_alive():
+            self.scheduler.start()
+            now = time.time()
+            for name, job in self._jobs.items():
+                if self.scheduler.get_due_time(('job', name)) is None:
+                    self._schedule_job(name, now + job['interval_seconds'])
+    
+    def _schedule_job(self, name, due_time):
+        key = ('job', name)
+        self.scheduler.schedule(key, due_time, lambda: self._executor.submit(self._run_job, name))
+    
+    def _run_job(self, name):
+        job = self._jobs.get(name)
+        if job is None:
+            return
+        
+        start_time = time.time()
+        try:
+            job['func']()
+            job['last_error'] = None
+        except Exception as e:
+            job['last_error'] = str(e)
+            print(f"유지보수 작업 오류 ({name}): {e}")
+        finally:
+            job['runs'] += 1
+            job['last_run'] = start_time
+            job['last_duration'] = round(time.time() - start_time, 4)
+            if name in self._jobs:
+                self._schedule_job(name, time.time() + job['interval_seconds'])
+    
+    def _schedule_collector(self, collector, due_time):
+        collector.next_collection_time = due_time
+        self.scheduler.schedule(collector.route_id, due_time, lambda: self._dispatch(collector))
+    
+    def _dispatch(self, collector):
+        # 스케줄러 스레드에서 호출되므로 실제 수집은 워커 풀로 넘김
+        with self._lock:
+            if not collector.is_running or collector.route_id in self._in_flight:
+                return
+            self._in_flight.add(collector.route_id)
+        self._executor.submit(self._run_collector, collector)
+    
+    def _run_collector(self, collector):
+        try:
+            collector.run_once()
+        except Exception as e:
+            print(f"{collector.get_log_time_kst()} 수집 작업 오류 - 노선: {collector.route_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(collector.route_id)
+                if collector.is_running:
+                    interval = collector.get_current_interval()
+                    now = time.time()
+                    
+                    # 수집 중 중지 후 다시 시작되어 기준 시각이 없으면 현재 시간 기준
+                    if collector.next_collection_time is None:
+                        next_collection_time = now + interval
+                    else:
+                        next_collection_time = collector.next_collection_time + interval
+                    
+                    # 처리 시간이 길어서 다음 수집 시간을 놓쳤다면 현재 시간 기준으로 재설정
+                    if next_collection_time <= now:
+                        next_collection_time = now + interval
+                    
+                    self._schedule_collector(collector, next_collection_time)
+                    
+                    wait_time = next_collection_time - now
+                    print(f"  - 처리 시간: {collector.last_processing_time:.2f}초, 다음 수집까지: {wait_time:.1f}초")
+
+def parse_route_config(value):
+    """
+    "노선ID:간격초,노선ID" 형식의 노선 설정 문자열을 [(노선ID, 간격), ...]로 변환
+    """
+    routes = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        route_id, _, interval = item.partition(':')
+        routes.append((route_id.strip(), int(interval) if interval.strip() else DEFAULT_INTERVAL_SECONDS))
+    return routes
+
+
+# 전역 수집 관리자 인스턴스
+collector_manager = CollectorManager(max_workers=COLLECTOR_MAX_WORKERS)
+for _route_id, _interval in parse_route_config(COLLECTOR_ROUTES):
+    collector_manager.register_route(_route_id, _interval)
+
+# SQLite WAL 파일이 계속 커지지 않도록 주기적으로 체크포인트
+if getattr(settings, 'SQLITE_CHECKPOINT_INTERVAL', 0) > 0:
+    collector_manager.add_job('wal_checkpoint', settings.SQLITE_CHECKPOINT_INTERVAL, checkpoint_wal)
+
+# 보존 기간이 지난 날짜를 주기적으로 월별 보관 파일로 이동
+if getattr(settings, 'ARCHIVE_RETENTION_DAYS', 0) > 0:
+    collector_manager.add_job('archive', settings.ARCHIVE_INTERVAL, run_scheduled_archive)
 
+# 지난 날짜와 오늘 수집분의 배차 재구성 결과를 주기적으로 갱신 (분석 API는 저장된 결과를 읽음)
+if getattr(settings, 'TRIP_REFRESH_INTERVAL', 0) > 0:
+    collector_manager.add_job('trip_refresh', settings.TRIP_REFRESH_INTERVAL, run_scheduled_trip_refresh)
 
-# 전역 수집기 인스턴스
-bus_collector = BusDataCollector(route_id="234001730", interval_seconds=90)
+# 오래된 분할 업로드와 참조가 없는 업로드 DB 저장소 항목 정리
+if getattr(settings, 'UPLOAD_CLEANUP_INTERVAL', 0) > 0:
+    collector_manager.add_job('upload_cleanup', settings.UPLOAD_CLEANUP_INTERVAL, run_scheduled_upload_cleanup)
@@ -0,0 +1,164 @@
+"""
+다운로드용 데이터베이스 스냅샷 생성 및 스트리밍
+
+SQLite 온라인 백업 API로 일관된 시점의 복사본을 임시 디렉터리에 만들고,
+파일을 메모리에 올리지 않고 청크 단위로 스트리밍한다. 만들어진 스냅샷은
+DOWNLOAD_SNAPSHOT_TTL 동안 남겨 두어 끊긴 다운로드를 Range 요청으로 이어받을 수 있다.
+"""
+import glob
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from django.conf import settings
+
+
+SNAPSHOT_PREFIX = 'bus_data_db_'
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+_SNAPSHOT_ID_PATTERN = re.compile(r'^[0-9_\-]+$')
+
+# 동시에 여러 요청이 같은 시점의 스냅샷을 중복 생성하지 않도록 잠금
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot_dir():
+    return str(getattr(settings, 'DOWNLOAD_SNAPSHOT_DIR', '') or
+               os.path.join(tempfile.gettempdir(), 'bus_info_snapshots'))
+
+
+def get_snapshot_path(snapshot_id):
+    """
+    스냅샷 ID의 파일 경로 (형식이 잘못되었거나 없으면 None)
+    """
+    if not snapshot_id or not _SNAPSHOT_ID_PATTERN.match(snapshot_id):
+        return None
+    path = os.path.join(get_snapshot_dir(), f"{SNAPSHOT_PREFIX}{snapshot_id}.sqlite3")
+    return path if os.path.exists(path) else None
+
+
+def get_snapshot_id(path):
+    return os.path.basename(path)[len(SNAPSHOT_PREFIX):-len('.sqlite3')]
+
+
+def cleanup_snapshots(ttl=None):
+    """
+    보존 시간(DOWNLOAD_SNAPSHOT_TTL)이 지난 스냅샷과 남은 임시 파일 삭제
+    """
+    if ttl is None:
+        ttl = getattr(settings, 'DOWNLOAD_SNAPSHOT_TTL', 3600)
+    now = time.time()
+    # 프로세스가 백업 중 종료되어 남은 임시 파일(*.sqlite3.tmp와 저널)도 함께 정리
+    for path in glob.glob(os.path.join(get_snapshot_dir(), f"{SNAPSHOT_PREFIX}*.sqlite3*")):
+        try:
+            if now - os.path.getmtime(path) > ttl:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def create_snapshot(db_path, reuse_seconds=None):
+    """
+    온라인 백업 API로 DB의 일관된 복사본 생성 후 (스냅샷 ID, 경로) 반환
+
+    WAL에 남은 변경분까지 포함되며, 백업 중에도 수집 스레드의 쓰기를 막지 않는다.
+    reuse_seconds 이내에 만든 스냅샷이 있으면 새로 만들지 않고 재사용한다.
+    """
+    if reuse_seconds is None:
+        reuse_seconds = getattr(settings, 'DOWNLOAD_SNAPSHOT_REUSE', 30)
+
+    snapshot_dir = get_snapshot_dir()
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    with _snapshot_lock:
+        cleanup_snapshots()
+
+        snapshots = sorted(glob.glob(os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}*.sqlite3")),
+                           key=os.path.getmtime)
+        if snapshots and time.time() - os.path.getmtime(snapshots[-1]) <= reuse_seconds:
+            return get_snapshot_id(snapshots[-1]), snapshots[-1]
+
+        snapshot_id = datetime.now().strftime('%Y-%m-%d_%H%M%S')
+        path = os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}{snapshot_id}.sqlite3")
+        temp_path = f"{path}.tmp"
+
+        source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            target = sqlite3.connect(temp_path)
+            try:
+                source.backup(target)
+                # 다운로드 파일은 단독으로 열 수 있도록 롤백 저널 모드로 저장
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+        except Exception:
+            # 실패한 백업의 임시 파일(수 GB일 수 있음)은 바로 삭제
+            for partial_path in glob.glob(f"{glob.escape(temp_path)}*"):
+                try:
+                    os.remove(partial_path)
+                except OSError:
+                    pass
+            raise
+        finally:
+            source.close()
+
+        # 완성된 파일만 스냅샷 이름으로 노출
+        os.replace(temp_path, path)
+        return snapshot_id, path
+
+
+def parse_range(header, size):
+    """
+    단일 Range 헤더를 (시작, 끝) 바이트 위치로 변환 (형식 오류는 None, 범위 밖은 ValueError)
+    """
+    match = _RANGE_PATTERN.match((header or '').strip())
+    if not match or match.group(0) == 'bytes=-':
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        # 마지막 N바이트
+        length = int(end)
+        if length == 0:
+            raise ValueError("잘못된 범위입니다.")
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("잘못된 범위입니다.")
+    return start, end
+
+
+def iter_file(path, start=0, end=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    파일의 [start, end] 구간을 청크 단위로 읽는 제너레이터
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = (end - start + 1) if end is not None else None
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def iter_gzip(chunks):
+    """
+    청크를 gzip 형식으로 즉시 압축하는 제너레이터
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,123 @@
+"""
+SQLite 연결 튜닝 (PRAGMA 적용 및 WAL 체크포인트)
+"""
+import os
+import time
+
+from django.conf import settings
+from django.db import connection as default_connection
+
+
+# PRAGMA 이름 -> 허용 값 검증 함수 (설정값이 SQL에 그대로 들어가므로 검증 필요)
+PRAGMA_VALIDATORS = {
+    'journal_mode': lambda v: str(v).upper() in ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': lambda v: str(v).upper() in ('OFF', 'NORMAL', 'FULL', 'EXTRA', '0', '1', '2', '3'),
+    'temp_store': lambda v: str(v).upper() in ('DEFAULT', 'FILE', 'MEMORY', '0', '1', '2'),
+    'mmap_size': lambda v: isinstance(v, int),
+    'cache_size': lambda v: isinstance(v, int),
+    'busy_timeout': lambda v: isinstance(v, int),
+}
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+# 마지막 체크포인트 결과
+last_checkpoint = {
+    'time': None,
+    'mode': None,
+    'busy': None,
+    'log_frames': None,
+    'checkpointed_frames': None,
+    'duration': None,
+    'error': None
+}
+
+
+def get_pragma_statements(tuning=None):
+    """
+    설정(SQLITE_TUNING)을 PRAGMA 문 목록으로 변환
+    """
+    if tuning is None:
+        tuning = getattr(settings, 'SQLITE_TUNING', {})
+
+    statements = []
+    for name, value in tuning.items():
+        validator = PRAGMA_VALIDATORS.get(name)
+        if validator is None or value is None or value == '':
+            continue
+        if not validator(value):
+            raise ValueError(f"잘못된 SQLite 설정값입니다: {name}={value}")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    connection_created 시그널 핸들러 - 새 SQLite 연결마다 PRAGMA 적용
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for statement in get_pragma_statements():
+            cursor.execute(statement)
+
+
+def checkpoint_wal(mode=None, using_connection=None):
+    """
+    WAL 파일을 본 DB 파일에 반영 (체크포인트)
+    """
+    conn = using_connection or default_connection
+    if conn.vendor != 'sqlite':
+        return None
+
+    mode = (mode or getattr(settings, 'SQLITE_CHECKPOINT_MODE', 'TRUNCATE')).upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"잘못된 체크포인트 모드입니다: {mode}")
+
+    start_time = time.time()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, log_frames, checkpointed_frames = cursor.fetchone()
+    except Exception as e:
+        last_checkpoint.update({'time': start_time, 'mode': mode, 'error': str(e)})
+        raise
+
+    last_checkpoint.update({
+        'time': start_time,
+        'mode': mode,
+        'busy': busy,
+        'log_frames': log_frames,
+        'checkpointed_frames': checkpointed_frames,
+        'duration': round(time.time() - start_time, 4),
+        'error': None
+    })
+    return dict(last_checkpoint)
+
+
+def get_sqlite_status(using_connection=None):
+    """
+    현재 연결에 적용된 PRAGMA 값과 마지막 체크포인트 결과 반환
+    """
+    conn = using_connection or default_connection
+    if conn.vendor != 'sqlite':
+        return None
+
+    pragmas = {}
+    with conn.cursor() as cursor:
+        for name in PRAGMA_VALIDATORS:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            pragmas[name] = row[0] if row else None
+
+    # WAL 모드일 때 아직 체크포인트되지 않은 WAL 파일 크기
+    try:
+        wal_size = os.path.getsize(f"{conn.settings_dict['NAME']}-wal")
+    except OSError:
+        wal_size = None
+
+    return {
+        'pragmas': pragmas,
+        'wal_size': wal_size,
+        'last_checkpoint': dict(last_checkpoint)
+    }
@@ -0,0 +1,456 @@
+"""
+분석용 데이터베이스 파일 분할 업로드 및 백그라운드 검증
+
+큰 파일도 요청 하나가 작업자 제한 시간에 걸리지 않도록 UPLOAD_CHUNK_SIZE 단위 조각으로 나누어 받는다.
+조각마다 SHA-256을 확인하고 받은 조각은 표시 파일로 남기므로, 연결이 끊기면 빠진 조각만 다시 보내면 된다.
+모든 조각을 받으면 전체 해시 계산, SQLite 파일 검증, 날짜 범위 조회는 백그라운드 스레드에서 처리하고
+진행 상태는 업로드 디렉터리의 status.json에 기록하여 어느 작업자 프로세스에서든 조회할 수 있다.
+검증이 끝난 파일에는 분석용 인덱스 추가와 ANALYZE를 미리 해 두고, 분석 시작 화면의 일자별 수집 건수도
+daily.json으로 저장하여 이후 분석 쿼리가 모두 인덱스를 타도록 한다.
+준비된 파일은 원본 해시 기준 저장소(upload_store)에 넣어 같은 파일은 한 번만 준비하고 함께 사용한다.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import upload_store
+from .analysis_pool import analysis_pool
+from .result_cache import HASH_CHUNK_SIZE
+
+
+DATA_FILE = 'data.part'
+MANIFEST_FILE = 'manifest.json'
+DAILY_FILE = 'daily.json'
+STATUS_FILE = 'status.json'
+PARTS_DIR = 'parts'
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+STATUS_UPLOADING = 'uploading'
+STATUS_VALIDATING = 'validating'
+STATUS_READY = 'ready'
+STATUS_ERROR = 'error'
+
+JOURNAL_MODES = ('delete', 'wal')
+
+# 예전 스키마(BusData에 vehicle_id 대신 plate_no) 업로드 DB에 추가하는 커버링 인덱스
+LEGACY_INDEXES = [
+    ('bus_info_busdata', 'bus_info_bu_coll_seq_plate_idx', ['collection_id', 'station_seq', 'plate_no', 'remain_seat_cnt']),
+]
+
+_UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+_SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# 업로드 완료 처리(검증) 작업 스레드 / 같은 업로드의 완료 요청이 겹치지 않도록 잠금
+_executor = None
+_executor_lock = threading.Lock()
+_complete_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """
+    잘못된 업로드 요청 (status: 응답 HTTP 상태 코드)
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_upload_root():
+    return str(getattr(settings, 'UPLOAD_DIR', '') or
+               os.path.join(tempfile.gettempdir(), 'bus_info_uploads'))
+
+
+def get_chunk_size():
+    return getattr(settings, 'UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def get_upload_dir(upload_id):
+    """
+    업로드 ID의 디렉터리 (형식이 잘못되었거나 없으면 None)
+    """
+    if not upload_id or not _UPLOAD_ID_PATTERN.match(upload_id):
+        return None
+    upload_dir = os.path.join(get_upload_root(), upload_id)
+    return upload_dir if os.path.isdir(upload_dir) else None
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    # 다른 프로세스가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _set_status(upload_dir, status, **fields):
+    _write_json(os.path.join(upload_dir, STATUS_FILE), {'status': status, 'updated_at': time.time(), **fields})
+
+
+def cleanup_uploads(ttl=None):
+    """
+    마지막 상태 변경 후 보존 시간(UPLOAD_TTL)이 지난 업로드 디렉터리 삭제
+    """
+    if ttl is None:
+        ttl = getattr(settings, 'UPLOAD_TTL', 24 * 60 * 60)
+    now = time.time()
+    for upload_dir in glob.glob(os.path.join(get_upload_root(), '*')):
+        if not _UPLOAD_ID_PATTERN.match(os.path.basename(upload_dir)):
+            continue
+        try:
+            if now - os.path.getmtime(os.path.join(upload_dir, STATUS_FILE)) > ttl:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def create_upload(filename, size, sha256=None):
+    """
+    새 분할 업로드 생성 후 manifest 반환 (sha256: 전체 파일 해시, 있으면 검증 시 비교)
+    """
+    if not filename or not filename.endswith('.sqlite3'):
+        raise UploadError('SQLite 데이터베이스 파일(.sqlite3)만 업로드 가능합니다.')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('파일 크기가 올바르지 않습니다.')
+    max_bytes = getattr(settings, 'UPLOAD_MAX_BYTES', 0)
+    if size <= 0 or (max_bytes and size > max_bytes):
+        raise UploadError('업로드할 수 없는 파일 크기입니다.')
+    if sha256 is not None:
+        sha256 = str(sha256).lower()
+        if not _SHA256_PATTERN.match(sha256):
+            raise UploadError('파일 해시(SHA-256) 형식이 올바르지 않습니다.')
+
+    cleanup_uploads()
+
+    upload_id = uuid.uuid4().hex
+    upload_dir = os.path.join(get_upload_root(), upload_id)
+    os.makedirs(os.path.join(upload_dir, PARTS_DIR))
+
+    chunk_size = get_chunk_size()
+    manifest = {
+        'upload_id': upload_id,
+        'filename': os.path.basename(filename),
+        'size': size,
+        'sha256': sha256,
+        'chunk_size': chunk_size,
+        'chunk_count': (size + chunk_size - 1) // chunk_size,
+        'created_at': time.time()
+    }
+
+    # 같은 내용의 파일이 이미 저장소에 있으면 조각을 받지 않고 바로 사용
+    entry = upload_store.get_entry(sha256) if sha256 else None
+    if entry is not None:
+        _write_json(os.path.join(upload_dir, MANIFEST_FILE), manifest)
+        _set_status(upload_dir, STATUS_READY, summary=entry['summary'], sha256=sha256, db_path=entry['db_path'])
+        return manifest
+
+    # 조각을 순서와 관계없이 제자리에 쓸 수 있도록 전체 크기로 미리 생성
+    with open(os.path.join(upload_dir, DATA_FILE), 'wb') as f:
+        f.truncate(size)
+    _write_json(os.path.join(upload_dir, MANIFEST_FILE), manifest)
+    _set_status(upload_dir, STATUS_UPLOADING)
+    return manifest
+
+
+def get_manifest(upload_dir):
+    return _read_json(os.path.join(upload_dir, MANIFEST_FILE))
+
+
+def get_received_parts(upload_dir):
+    """
+    체크섬 확인까지 끝난 조각 번호 목록
+    """
+    parts_dir = os.path.join(upload_dir, PARTS_DIR)
+    try:
+        return sorted(int(name) for name in os.listdir(parts_dir) if name.isdigit())
+    except OSError:
+        return []
+
+
+def write_part(upload_dir, index, stream, length, sha256=None):
+    """
+    조각 index를 stream에서 읽어 제자리에 기록 (sha256이 있으면 내용과 비교) 후 조각 해시 반환
+
+    읽으면서 바로 파일에 쓰므로 조각 전체를 메모리에 올리지 않는다. 체크섬이 맞지 않거나 길이가 다르면
+    받은 표시를 남기지 않으므로 같은 조각을 다시 보내면 덮어쓴다.
+    """
+    manifest = get_manifest(upload_dir)
+    status = get_status(upload_dir)['status']
+    if status != STATUS_UPLOADING:
+        raise UploadError('이미 완료된 업로드입니다.', status=409)
+    if not 0 <= index < manifest['chunk_count']:
+        raise UploadError('조각 번호가 올바르지 않습니다.')
+
+    offset = index * manifest['chunk_size']
+    expected = min(manifest['chunk_size'], manifest['size'] - offset)
+    if length != expected:
+        raise UploadError(f'조각 크기가 올바르지 않습니다. (예상: {expected}바이트)')
+    if sha256 is not None:
+        sha256 = sha256.lower()
+
+    digest = hashlib.sha256()
+    received = 0
+    with open(os.path.join(upload_dir, DATA_FILE), 'r+b') as f:
+        f.seek(offset)
+        while received < expected:
+            data = stream.read(min(HASH_CHUNK_SIZE, expected - received))
+            if not data:
+                break
+            f.write(data)
+            digest.update(data)
+            received += len(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if received != expected:
+        raise UploadError('조각 데이터가 중간에 끊겼습니다. 다시 보내주세요.')
+    part_hash = digest.hexdigest()
+    if sha256 and part_hash != sha256:
+        raise UploadError('조각 체크섬이 일치하지 않습니다. 다시 보내주세요.', status=422)
+
+    with open(os.path.join(upload_dir, PARTS_DIR, str(index)), 'w') as f:
+        f.write(part_hash)
+    return part_hash
+
+
+def get_status(upload_dir):
+    return _read_json(os.path.join(upload_dir, STATUS_FILE))
+
+
+def get_upload_info(upload_dir):
+    """
+    업로드 진행 상태 (조각 정보, 받은 조각 목록, 검증 결과)
+    """
+    manifest = get_manifest(upload_dir)
+    status = get_status(upload_dir)
+    info = {
+        'upload_id': manifest['upload_id'],
+        'filename': manifest['filename'],
+        'size': manifest['size'],
+        'chunk_size': manifest['chunk_size'],
+        'chunk_count': manifest['chunk_count'],
+        'status': status['status']
+    }
+    if status['status'] == STATUS_UPLOADING:
+        info['received'] = get_received_parts(upload_dir)
+    if status.get('error'):
+        info['error'] = status['error']
+    if status.get('summary'):
+        info['summary'] = status['summary']
+        info['sha256'] = status['sha256']
+    return info
+
+
+def get_db_path(upload_dir):
+    """
+    검증이 끝난 업로드 파일 경로 (아직 준비되지 않았으면 None)
+    """
+    status = get_status(upload_dir)
+    if status['status'] != STATUS_READY or not os.path.exists(status['db_path']):
+        return None
+    return status['db_path']
+
+
+def complete_upload(upload_dir):
+    """
+    모든 조각을 받았으면 검증 작업을 백그라운드에 등록하고 즉시 반환 (이미 등록되었으면 그대로)
+    """
+    manifest = get_manifest(upload_dir)
+    with _complete_lock:
+        status = get_status(upload_dir)['status']
+        if status != STATUS_UPLOADING:
+            return status
+
+        missing = sorted(set(range(manifest['chunk_count'])) - set(get_received_parts(upload_dir)))
+        if missing:
+            raise UploadError(f'받지 못한 조각이 {len(missing)}개 있습니다.', status=409)
+
+        _set_status(upload_dir, STATUS_VALIDATING)
+    _get_executor().submit(validate_upload, upload_dir)
+    return STATUS_VALIDATING
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'UPLOAD_VALIDATION_WORKERS', 1),
+                thread_name_prefix='upload-validation'
+            )
+        return _executor
+
+
+def read_database_summary(db_path):
+    """
+    버스 데이터베이스 파일 확인 후 날짜 범위/수집 건수 반환 (올바른 파일이 아니면 UploadError)
+    """
+    from .views_analysis import get_db_summary
+
+    with open(db_path, 'rb') as f:
+        if f.read(len(SQLITE_HEADER)) != SQLITE_HEADER:
+            raise UploadError('올바른 버스 데이터베이스 파일이 아닙니다.')
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bus_info_buscollection'")
+        if not cursor.fetchone():
+            raise UploadError('올바른 버스 데이터베이스 파일이 아닙니다.')
+        return get_db_summary(cursor)
+    except sqlite3.DatabaseError as e:
+        raise UploadError(f'데이터베이스 파일을 읽을 수 없습니다: {e}')
+    finally:
+        conn.close()
+
+
+def get_analysis_index_sql(table_columns):
+    """
+    분석용 인덱스 생성 SQL 목록 (모델에 정의된 인덱스 중 업로드 DB에 해당 컬럼이 모두 있는 것만)
+    table_columns: {테이블 이름: 컬럼 이름 집합}
+    """
+    from django.db import connection
+    from .models import BusCollection, BusData
+
+    # 운영 DB와 같은 이름/조건식으로 만들어 최신 스키마 DB에는 중복 인덱스가 생기지 않음
+    editor = connection.schema_editor(collect_sql=True)
+    statements = []
+    for model in (BusCollection, BusData):
+        columns = table_columns.get(model._meta.db_table, set())
+        for index in model._meta.indexes:
+            names = list(index.fields)
+            if index.condition is not None:
+                names += [name for name, _ in index.condition.children]
+            if all(model._meta.get_field(name).column in columns for name in names):
+                sql = str(index.create_sql(model, editor))
+                statements.append(sql.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+
+    for table, name, index_columns in LEGACY_INDEXES:
+        if set(index_columns) <= table_columns.get(table, set()):
+            column_sql = ', '.join(f'"{column}"' for column in index_columns)
+            statements.append(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({column_sql})')
+    return statements
+
+
+def prepare_database(db_path, summary):
+    """
+    업로드 DB 분석 준비 - 분석용 인덱스 추가, ANALYZE, 저널 모드(UPLOAD_JOURNAL_MODE) 변환 후
+    기간 전체의 일자별 수집 건수를 같은 디렉터리의 daily.json에 저장
+    """
+    from .views_analysis import get_daily_collections
+
+    journal_mode = getattr(settings, 'UPLOAD_JOURNAL_MODE', 'delete').lower()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"지원하지 않는 저널 모드입니다: {journal_mode}")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        table_columns = {}
+        for table in ('bus_info_buscollection', 'bus_info_busdata'):
+            cursor.execute(f"PRAGMA table_info({table})")
+            table_columns[table] = {row[1] for row in cursor.fetchall()}
+
+        for sql in get_analysis_index_sql(table_columns):
+            cursor.execute(sql)
+        conn.commit()
+        # 쿼리 플래너가 인덱스를 고를 수 있도록 통계 갱신
+        cursor.execute("ANALYZE")
+        conn.commit()
+        # delete: 파일 하나로 정리 (immutable 읽기에 적합) / wal: 읽기 연결이 서로 막지 않음
+        cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+
+        daily = []
+        if summary['min_date']:
+            daily = get_daily_collections(cursor, summary['min_date'], summary['max_date'])
+    finally:
+        conn.close()
+
+    _write_json(os.path.join(os.path.dirname(db_path), DAILY_FILE), daily)
+    return daily
+
+
+def get_daily_summary(db_path, start_date, end_date):
+    """
+    미리 계산한 기간 내 일자별 수집 건수 (준비되지 않은 업로드면 None)
+    """
+    try:
+        daily = _read_json(os.path.join(os.path.dirname(db_path), DAILY_FILE))
+    except (OSError, ValueError):
+        return None
+    return [day for day in daily if start_date <= day['date'] <= end_date]
+
+
+def store_database(file_hash, temp_dir):
+    """
+    temp_dir의 업로드 파일을 검증/분석 준비 후 저장소에 등록하고 항목 반환 (실패하면 temp_dir 삭제)
+
+    인덱스 추가로 파일 내용은 바뀌지만 데이터는 같으므로 원본 해시를 저장소 키이자 분석 결과 캐시 지문으로 사용한다.
+    """
+    try:
+        db_path = os.path.join(temp_dir, upload_store.DB_FILE)
+        summary = read_database_summary(db_path)
+        prepare_database(db_path, summary)
+        return upload_store.add_entry(file_hash, temp_dir, summary)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+
+def run_scheduled_upload_cleanup():
+    """
+    수집 관리자 주기 작업용 - 오래된 업로드 디렉터리와 저장소 항목, 유휴 분석 DB 연결 정리
+    """
+    analysis_pool.close_idle()
+    cleanup_uploads()
+    return upload_store.cleanup_store()
+
+
+def validate_upload(upload_dir):
+    """
+    백그라운드 작업 - 전체 파일 해시 확인, SQLite 검증, 날짜 범위 조회, 분석 준비 후 상태 기록
+    """
+    try:
+        manifest = get_manifest(upload_dir)
+        data_path = os.path.join(upload_dir, DATA_FILE)
+
+        digest = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+        if manifest['sha256'] and file_hash != manifest['sha256']:
+            raise UploadError('파일 해시가 일치하지 않습니다. 다시 업로드해주세요.')
+
+        entry = upload_store.get_entry(file_hash)
+        if entry is None:
+            temp_dir = upload_store.create_temp_dir()
+            shutil.move(data_path, os.path.join(temp_dir, upload_store.DB_FILE))
+            entry = store_database(file_hash, temp_dir)
+        elif os.path.exists(data_path):
+            os.remove(data_path)
+        _set_status(upload_dir, STATUS_READY, summary=entry['summary'], sha256=file_hash, db_path=entry['db_path'])
+    except UploadError as e:
+        _set_status(upload_dir, STATUS_ERROR, error=str(e))
+    except Exception as e:
+        print(f"업로드 검증 오류 ({upload_dir}): {e}")
+        _set_status(upload_dir, STATUS_ERROR, error=f'업로드 검증 중 오류 발생: {e}')
@@ -0,0 +1,242 @@
+"""
+노선/기간 단위 수집 데이터 내보내기 (NDJSON / CSV / SQLite 부분 DB)
+
+전체 DB를 내려받지 않고 필요한 노선과 기간만 내보낸다. 수집 건은 ID 순으로 청크 단위 조회하여
+제너레이터로 스트리밍하며, 내보낸 마지막 수집 건 ID를 커서로 돌려주어 다음 내보내기에서
+since 파라미터로 이후 데이터만 받을 수 있다. 보관 파일로 옮겨진 날짜도 함께 내보낸다.
+(SQLite 부분 DB는 파일을 다 만든 뒤 보내므로 스트리밍되지 않음)
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+
+from django.db import connection
+
+from .archive import get_archived_collections, get_archived_days
+from .snapshots import QUERY_CHUNK_SIZE, load_buses, pack_buses
+
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'sqlite')
+
+CSV_COLUMNS = (
+    'collection_id', 'route_id', 'query_time', 'collection_date', 'is_error', 'is_skipped',
+    'plate_no', 'remain_seat_cnt', 'station_seq'
+)
+
+# 분석 페이지에 그대로 업로드할 수 있는 스키마 (버스 목록은 압축 저장)
+SQLITE_SCHEMA = """
+    CREATE TABLE bus_info_vehicle (
+        id INTEGER PRIMARY KEY,
+        plate_no VARCHAR(20) NOT NULL UNIQUE
+    );
+    CREATE TABLE bus_info_buscollection (
+        id INTEGER PRIMARY KEY,
+        route_id VARCHAR(20) NOT NULL,
+        query_time DATETIME NOT NULL,
+        collection_date DATE NOT NULL,
+        result_code INTEGER NOT NULL,
+        result_message VARCHAR(200) NOT NULL,
+        is_error BOOL NOT NULL,
+        error_message TEXT NOT NULL,
+        is_skipped BOOL NOT NULL,
+        skip_reason VARCHAR(200) NOT NULL,
+        packed_buses BLOB NULL,
+        created_at DATETIME NULL
+    );
+    CREATE TABLE bus_info_busdata (
+        id INTEGER PRIMARY KEY,
+        collection_id INTEGER NOT NULL,
+        vehicle_id INTEGER NOT NULL,
+        remain_seat_cnt INTEGER NOT NULL,
+        station_seq INTEGER NULL
+    );
+    CREATE INDEX bus_info_buscollection_route_date ON bus_info_buscollection (route_id, collection_date);
+"""
+
+
+class ExportQuery:
+    """
+    내보내기 대상 (노선, 기간, since 커서)
+
+    생성 시점의 마지막 수집 건 ID(cursor)까지만 내보내므로, 스트리밍 중 새로 저장된
+    수집 건은 다음 내보내기에 포함된다.
+    """
+
+    def __init__(self, route_id, start_date=None, end_date=None, since=None):
+        from django.db.models import Max
+        from .models import BusCollection
+
+        self.route_id = route_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.since = since
+
+        queryset = BusCollection.objects.filter(route_id=route_id)
+        if start_date:
+            queryset = queryset.filter(collection_date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(collection_date__lte=end_date)
+        if since is not None:
+            queryset = queryset.filter(id__gt=since)
+
+        # 본 DB에 없는 날짜는 보관 파일에서 읽음
+        hot_dates = set(queryset.values_list('collection_date', flat=True).distinct())
+        self.archived_dates = sorted(
+            item['collection_date'] for item in get_archived_days(route_id)
+            if item['collection_date'] not in hot_dates
+            and (start_date is None or item['collection_date'] >= start_date)
+            and (end_date is None or item['collection_date'] <= end_date)
+        )
+
+        self.cursor = queryset.aggregate(last_id=Max('id'))['last_id']
+        self.queryset = queryset.filter(id__lte=self.cursor or 0).order_by('id')
+
+    def iter_collections(self):
+        """
+        (수집 건, 버스 목록) 제너레이터 - 수집 건 ID 순
+        """
+        for collection_date in self.archived_dates:
+            for collection in reversed(get_archived_collections(self.route_id, collection_date)):
+                if self.since is not None and collection.id <= self.since:
+                    continue
+                yield collection, collection.buses
+
+        last_id = 0
+        while True:
+            chunk = list(self.queryset.filter(id__gt=last_id)[:QUERY_CHUNK_SIZE])
+            if not chunk:
+                break
+            buses = load_buses(chunk)
+            for collection in chunk:
+                yield collection, buses[collection.id]
+            last_id = chunk[-1].id
+
+    def get_next_cursor(self):
+        """
+        다음 내보내기의 since 값 (내보낼 데이터가 없으면 요청한 since 그대로)
+        보관된 날짜는 본 DB의 날짜보다 이전이므로 ID도 항상 더 작다.
+        """
+        cursor = self.cursor
+        if cursor is None and self.archived_dates:
+            cursor = max(
+                (collection.id
+                 for collection_date in self.archived_dates
+                 for collection in get_archived_collections(self.route_id, collection_date)),
+                default=None
+            )
+        if self.since is not None:
+            cursor = max(cursor or 0, self.since)
+        return cursor
+
+
+def iter_ndjson(export):
+    """
+    수집 건마다 JSON 한 줄
+    """
+    for collection, buses in export.iter_collections():
+        yield json.dumps({
+            'id': collection.id,
+            'route_id': collection.route_id,
+            'query_time': collection.query_time.isoformat(),
+            'collection_date': collection.collection_date.strftime('%Y-%m-%d'),
+            'is_error': collection.is_error,
+            'is_skipped': collection.is_skipped,
+            'buses': [
+                {
+                    'plateNo': bus['plate_no'],
+                    'remainSeatCnt': bus['remain_seat_cnt'],
+                    'stationSeq': bus['station_seq']
+                }
+                for bus in buses
+            ]
+        }, ensure_ascii=False) + '\n'
+
+
+def iter_csv(export):
+    """
+    버스마다 한 행 (버스가 없는 수집 건은 버스 열이 빈 행 1개)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    for collection, buses in export.iter_collections():
+        base = [
+            collection.id,
+            collection.route_id,
+            collection.query_time.isoformat(),
+            collection.collection_date.strftime('%Y-%m-%d'),
+            int(collection.is_error),
+            int(collection.is_skipped)
+        ]
+        if not buses:
+            writer.writerow(base + ['', '', ''])
+        for bus in buses:
+            station_seq = bus['station_seq']
+            writer.writerow(base + [bus['plate_no'], bus['remain_seat_cnt'], '' if station_seq is None else station_seq])
+        yield flush()
+
+
+def write_sqlite(export, path):
+    """
+    분석 페이지에 업로드할 수 있는 부분 SQLite DB 생성
+
+    NDJSON/CSV와 달리 요청 안에서 파일 전체를 만든 뒤 보내므로(스트리밍 아님) 기간이 길면
+    응답이 시작되기까지 오래 걸린다. 차량 ID는 본 DB에 쓰지 않도록 내보내기 파일 안에서 새로 매긴다.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SQLITE_SCHEMA)
+        vehicles = {}
+        rows = []
+
+        def insert_rows():
+            conn.executemany(
+                "INSERT INTO bus_info_buscollection VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            rows.clear()
+
+        for collection, buses in export.iter_collections():
+            packed = pack_buses(
+                (vehicles.setdefault(bus['plate_no'], len(vehicles) + 1), bus['station_seq'], bus['remain_seat_cnt'])
+                for bus in buses
+            ) if not collection.is_error and not collection.is_skipped else None
+            rows.append((
+                collection.id,
+                collection.route_id,
+                connection.ops.adapt_datetimefield_value(collection.query_time),
+                collection.collection_date.isoformat(),
+                collection.result_code,
+                collection.result_message,
+                collection.is_error,
+                collection.error_message,
+                collection.is_skipped,
+                collection.skip_reason,
+                packed,
+                connection.ops.adapt_datetimefield_value(collection.created_at)
+            ))
+            if len(rows) >= QUERY_CHUNK_SIZE:
+                insert_rows()
+
+        insert_rows()
+        conn.executemany(
+            "INSERT INTO bus_info_vehicle (id, plate_no) VALUES (?, ?)",
+            [(vehicle_id, plate_no) for plate_no, vehicle_id in vehicles.items()]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return path
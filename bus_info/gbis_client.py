@@ -0,0 +1,175 @@
+"""
+GBIS API HTTP 클라이언트
+"""
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    GBIS_SERVICE_KEY,
+    GBIS_API_ENDPOINT,
+    API_TIMEOUT,
+    RESPONSE_FORMAT,
+    API_MAX_RETRIES,
+    API_BACKOFF_BASE,
+    API_BACKOFF_MAX
+)
+
+
+# 요청 지연시간 히스토그램 구간 상한 (초)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class GbisApiError(Exception):
+    """
+    재시도 후에도 실패한 GBIS API 요청
+    """
+
+
+class LatencyHistogram:
+    """
+    요청 지연시간 누적 히스토그램
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        labels = [f"<={upper}s" for upper in self.buckets] + [f">{self.buckets[-1]}s"]
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 4) if self.count else None,
+            'max': round(self.max, 4),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class GbisClient:
+    """
+    GBIS 버스 위치 API 클라이언트
+
+    - 커넥션 풀을 가진 세션을 재사용하여 요청마다 TCP/TLS 연결을 새로 맺지 않음
+    - 서비스키 디코딩과 쿼리스트링 인코딩은 노선별로 한 번만 수행
+    - 5xx 응답, 타임아웃, 연결 오류는 지터를 섞은 지수 백오프로 재시도
+    """
+
+    def __init__(self, endpoint=GBIS_API_ENDPOINT, service_key=GBIS_SERVICE_KEY, timeout=API_TIMEOUT,
+                 max_retries=API_MAX_RETRIES, backoff_base=API_BACKOFF_BASE, backoff_max=API_BACKOFF_MAX,
+                 pool_maxsize=10):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # 서비스키는 한 번만 디코딩하고, 노선별 URL은 최초 요청 시 인코딩하여 캐시
+        self._service_key = urllib.parse.unquote(service_key)
+        self._route_urls = {}
+
+        self._stats_lock = threading.Lock()
+        self._latency = LatencyHistogram()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    def get_route_url(self, route_id):
+        """
+        노선별로 미리 인코딩된 요청 URL 반환
+        """
+        url = self._route_urls.get(route_id)
+        if url is None:
+            query = urllib.parse.urlencode({
+                'serviceKey': self._service_key,
+                'routeId': route_id,
+                'format': RESPONSE_FORMAT
+            })
+            url = f"{self.endpoint}?{query}"
+            self._route_urls[route_id] = url
+        return url
+
+    def get_bus_locations(self, route_id):
+        """
+        노선의 버스 위치 목록 조회 (JSON 응답 반환)
+        """
+        url = self.get_route_url(route_id)
+        attempt = 0
+
+        while True:
+            start_time = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                self._record(time.perf_counter() - start_time)
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    raise GbisApiError(f"GBIS API 요청 실패 ({attempt + 1}회 시도): {e}") from e
+            else:
+                self._record(time.perf_counter() - start_time)
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return response.json()
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    raise GbisApiError(f"GBIS API 서버 오류 ({attempt + 1}회 시도): HTTP {response.status_code}")
+
+            time.sleep(self.get_backoff(attempt))
+            attempt += 1
+            with self._stats_lock:
+                self._retries += 1
+
+    def get_backoff(self, attempt):
+        """
+        재시도 대기 시간 (full jitter 지수 백오프)
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_stats(self):
+        """
+        요청 통계 및 지연시간 히스토그램 반환
+        """
+        with self._stats_lock:
+            return {
+                'requests': self._requests,
+                'retries': self._retries,
+                'failures': self._failures,
+                'latency': self._latency.to_dict()
+            }
+
+    def close(self):
+        """
+        세션 및 커넥션 풀 종료
+        """
+        self.session.close()
+
+    def _record(self, seconds):
+        with self._stats_lock:
+            self._requests += 1
+            self._latency.observe(seconds)
+
+    def _record_failure(self):
+        with self._stats_lock:
+            self._failures += 1
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_info.archive import archive_old_days
+
+
+class Command(BaseCommand):
+    help = '보존 기간이 지난 수집 데이터를 월별 보관 파일로 옮기고 본 DB에서 삭제합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='보존 기간 (일, 기본값: ARCHIVE_RETENTION_DAYS 설정)')
+        parser.add_argument('--before', default=None,
+                            help='이 날짜 이전(미포함)의 데이터를 보관 (YYYY-MM-DD, --days 대신 사용)')
+        parser.add_argument('--route', default=None, help='보관할 노선 ID (기본값: 전체 노선)')
+        parser.add_argument('--dry-run', action='store_true', help='보관 대상 날짜만 출력')
+
+    def handle(self, *args, **options):
+        before_date = None
+        if options['before']:
+            try:
+                before_date = datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('올바른 날짜 형식이 아닙니다. (YYYY-MM-DD)')
+
+        retention_days = options['days']
+        if before_date is None and retention_days is None:
+            retention_days = getattr(settings, 'ARCHIVE_RETENTION_DAYS', 0)
+            if retention_days < 1:
+                raise CommandError('--days 또는 --before를 지정하거나 ARCHIVE_RETENTION_DAYS를 설정하세요.')
+
+        try:
+            results = archive_old_days(
+                retention_days=retention_days,
+                before_date=before_date,
+                route_id=options['route'],
+                dry_run=options['dry_run']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            for item in results:
+                self.stdout.write(f"{item['route_id']} {item['date']}")
+            self.stdout.write(f"보관 대상: {len(results)}일")
+            return
+
+        total_collections = sum(item['collections'] for item in results)
+        total_buses = sum(item['buses'] for item in results)
+        self.stdout.write(self.style.SUCCESS(
+            f"보관 완료: {len(results)}일, 수집 {total_collections}건, 버스 {total_buses}대"
+        ))
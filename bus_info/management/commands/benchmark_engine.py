@@ -0,0 +1,99 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_info import trips, trips_numpy
+from bus_info.snapshots import fetch_snapshot_rows
+from bus_info.trips import STATION_COUNT, collect_observations, compute_changes, fill_missing_stations, split_trips
+
+
+class Command(BaseCommand):
+    help = '결측치 보정 / 변화량 계산의 python 엔진과 numpy 엔진 결과를 비교하고 속도를 측정합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', default=None, help='운영 DB에서 읽을 시작 날짜 (YYYY-MM-DD)')
+        parser.add_argument('--end', default=None, help='운영 DB에서 읽을 종료 날짜 (YYYY-MM-DD)')
+        parser.add_argument('--synthetic', type=int, default=0, help='운영 DB 대신 무작위 배차 N개 사용')
+        parser.add_argument('--repeat', type=int, default=5, help='반복 측정 횟수 (기본값: 5)')
+
+    def handle(self, *args, **options):
+        if trips_numpy.np is None:
+            raise CommandError('numpy가 설치되어 있지 않습니다. (pip install numpy)')
+
+        if options['synthetic']:
+            observations = self.synthetic_observations(options['synthetic'])
+        else:
+            if not options['start'] or not options['end']:
+                raise CommandError('--start와 --end 또는 --synthetic을 지정해주세요.')
+            observations = self.load_observations(options['start'], options['end'])
+        if not observations:
+            raise CommandError('비교할 배차가 없습니다.')
+
+        self.stdout.write(f"배차 {len(observations)}개, 반복 {options['repeat']}회")
+
+        python_result, python_time = self.measure(
+            lambda: [fill_missing_stations(dict(observed)) for observed in observations], options['repeat']
+        )
+        numpy_result, numpy_time = self.measure(lambda: trips_numpy.impute_many(observations), options['repeat'])
+        self.report('결측치 보정', python_result, python_time, numpy_result, numpy_time)
+
+        averages = [
+            {station_idx: value + 0.1 * (station_idx % 7) for station_idx, value in passengers.items()}
+            for passengers in python_result
+        ]
+        for label, data, digits in (('변화량', python_result, None), ('변화량(평균)', averages, 1)):
+            python_changes, python_time = self.measure(
+                lambda: [compute_changes(passengers, digits) for passengers in data], options['repeat']
+            )
+            numpy_changes, numpy_time = self.measure(
+                lambda: trips_numpy.compute_changes_many(data, digits), options['repeat']
+            )
+            self.report(label, python_changes, python_time, numpy_changes, numpy_time)
+
+    def load_observations(self, start_date, end_date):
+        conn = trips.connect_analysis_db(trips.get_live_db_uri())
+        try:
+            rows = fetch_snapshot_rows(conn.cursor(), "c.collection_date BETWEEN ? AND ?", (start_date, end_date))
+        finally:
+            conn.close()
+
+        date_rows = {}
+        for _, query_time, collection_date, plate_no, station_seq, remain_seat in rows:
+            date_rows.setdefault(collection_date, []).append((query_time, plate_no, station_seq, remain_seat))
+
+        # 배차 분리는 엔진과 무관하므로 모든 배차의 관측값을 비교 대상으로 사용
+        return [
+            collect_observations(time_data)
+            for day_rows in date_rows.values()
+            for time_data in split_trips(day_rows).values()
+        ]
+
+    def synthetic_observations(self, count):
+        generator = random.Random(0)
+        observations = []
+        for _ in range(count):
+            stations = generator.sample(range(STATION_COUNT), generator.randint(0, STATION_COUNT))
+            time_data = {0: {station_idx: generator.choice([-1, 0, 5, 20, 44, 45]) for station_idx in stations}}
+            observations.append(collect_observations(time_data))
+        return observations
+
+    def measure(self, func, repeat):
+        best = None
+        result = None
+        for _ in range(max(1, repeat)):
+            start_time = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
+
+    def report(self, label, python_result, python_time, numpy_result, numpy_time):
+        identical = python_result == numpy_result
+        speedup = python_time / numpy_time if numpy_time else 0
+        self.stdout.write(
+            f"{label}: python {python_time * 1000:.2f}ms / numpy {numpy_time * 1000:.2f}ms "
+            f"({speedup:.1f}배) - 결과 {'일치' if identical else '불일치'}"
+        )
+        if not identical:
+            raise CommandError(f'{label} 결과가 python 엔진과 다릅니다.')
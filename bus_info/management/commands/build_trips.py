@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_info.trips import refresh_trips
+
+
+class Command(BaseCommand):
+    help = '수집 데이터로 배차를 재구성하여 Trip / TripStationLoad 테이블에 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', default=None, help='시작 날짜 (YYYY-MM-DD, 기본값: 전체)')
+        parser.add_argument('--end', default=None, help='종료 날짜 (YYYY-MM-DD, 기본값: 전체)')
+        parser.add_argument('--route', default=None, help='노선 ID (기본값: 전체 노선)')
+        parser.add_argument('--force', action='store_true', help='수집 건이 바뀌지 않은 날짜도 다시 계산')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError('올바른 날짜 형식이 아닙니다. (YYYY-MM-DD)')
+
+        results = refresh_trips(
+            route_id=options['route'],
+            start_date=start_date,
+            end_date=end_date,
+            force=options['force']
+        )
+
+        for route_id, service_date, trip_count in results:
+            self.stdout.write(f"{route_id} {service_date}: 배차 {trip_count}회")
+        self.stdout.write(self.style.SUCCESS(f"배차 재구성 완료: {len(results)}일"))
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from bus_info.db_upload import cleanup_uploads
+from bus_info.upload_store import cleanup_store, get_entries
+
+
+class Command(BaseCommand):
+    help = '오래된 분할 업로드와 참조가 없는 업로드 DB 저장소 항목을 정리합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-bytes', type=int, default=None,
+                            help='저장소 최대 크기 (바이트, 기본값: UPLOAD_STORE_MAX_BYTES 설정)')
+        parser.add_argument('--ttl', type=int, default=None,
+                            help='참조가 없는 항목의 보존 시간 (초, 기본값: UPLOAD_STORE_TTL 설정)')
+        parser.add_argument('--dry-run', action='store_true', help='삭제 대상만 출력')
+
+    def handle(self, *args, **options):
+        entries = get_entries()
+        for entry in sorted(entries, key=lambda entry: entry['last_used']):
+            last_used = datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(
+                f"{entry['sha256'][:12]} {entry['size'] / 1024 / 1024:.1f}MB "
+                f"마지막 사용 {last_used} / 참조 {entry['refs']}개"
+            )
+
+        if not options['dry_run']:
+            cleanup_uploads()
+        removed = cleanup_store(max_bytes=options['max_bytes'], ttl=options['ttl'], dry_run=options['dry_run'])
+
+        label = '삭제 대상' if options['dry_run'] else '삭제'
+        for file_hash in removed:
+            self.stdout.write(f"{label}: {file_hash[:12]}")
+        self.stdout.write(self.style.SUCCESS(f"저장소 항목 {len(entries)}개 중 {len(removed)}개 {label}"))
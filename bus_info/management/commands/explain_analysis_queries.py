@@ -0,0 +1,89 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus_info import trips
+from bus_info.config import DEFAULT_ROUTE_ID
+from bus_info.views_analysis import get_collection_weekdays, get_daily_collections, get_db_summary
+
+
+# 전체를 읽는 것이 의도된 작은 조회용 테이블 (차량 번호 목록)
+ALLOWED_SCANS = {'bus_info_vehicle'}
+
+SCAN_PATTERN = re.compile(r'^SCAN (\w+)')
+
+
+class Command(BaseCommand):
+    help = '분석 조회 쿼리의 실행 계획(EXPLAIN QUERY PLAN)을 출력하고, 전체 테이블 스캔이나 임시 정렬이 있으면 실패합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=None, help='검사할 SQLite 파일 경로 (기본값: 운영 DB)')
+        parser.add_argument('--start', default=None, help='시작 날짜 (YYYY-MM-DD, 기본값: 수집 기간 전체)')
+        parser.add_argument('--end', default=None, help='종료 날짜 (YYYY-MM-DD, 기본값: 수집 기간 전체)')
+        parser.add_argument('--route', default=DEFAULT_ROUTE_ID, help='노선 ID')
+
+    def handle(self, *args, **options):
+        db_path = trips.get_upload_uri(options['database']) if options['database'] else trips.get_live_db_uri()
+        route_id = options['route']
+
+        conn = trips.connect_analysis_db(db_path)
+        try:
+            statements = self.capture_statements(conn, options['start'], options['end'], route_id)
+            problems = []
+            for sql in statements:
+                self.stdout.write(' '.join(sql.split()))
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                    detail = row[-1]
+                    scan = SCAN_PATTERN.match(detail)
+                    is_problem = (scan and scan.group(1) not in ALLOWED_SCANS) or 'USE TEMP B-TREE' in detail
+                    if is_problem:
+                        problems.append(detail)
+                    self.stdout.write(f"    {detail}", self.style.ERROR if is_problem else None)
+        finally:
+            conn.close()
+
+        if problems:
+            raise CommandError(f"인덱스를 사용하지 않는 실행 계획 {len(problems)}건: {', '.join(problems)}")
+        self.stdout.write(self.style.SUCCESS(f"분석 쿼리 {len(statements)}개 실행 계획 확인 완료"))
+
+    def capture_statements(self, conn, start_date, end_date, route_id):
+        """
+        실제 분석 함수들을 실행하면서 보낸 SQL을 값이 채워진 형태로 수집 (PRAGMA, 스키마 조회 제외)
+        """
+        statements = []
+        cursor = conn.cursor()
+        conn.set_trace_callback(statements.append)
+        try:
+            summary = get_db_summary(cursor)
+            start_date = start_date or summary['min_date'] or '0000-00-00'
+            end_date = end_date or summary['max_date'] or '0000-00-00'
+
+            get_daily_collections(cursor, start_date, end_date)
+            get_collection_weekdays(cursor, start_date, end_date, route_id)
+
+            date_condition = "c.collection_date BETWEEN ? AND ?"
+            params = (start_date, end_date)
+            weekday_condition, weekday_params = trips.get_weekday_condition(is_weekend_only=False)
+            trips.get_day_fingerprints(
+                cursor, f"{date_condition} AND {weekday_condition}", params + weekday_params, route_id
+            )
+            cursor.execute(f"""
+                SELECT 1 FROM bus_info_buscollection c
+                WHERE {date_condition} AND c.route_id = ? AND NOT c.is_error AND NOT c.is_skipped
+                LIMIT 1
+            """, params + (route_id,))
+            cursor.fetchall()
+
+            fingerprints = trips.get_day_fingerprints(cursor, date_condition, params, route_id)
+            # 실행 계획만 필요하므로 배차 조회는 첫 날짜만
+            dates = sorted(fingerprints)[:1]
+            fresh_dates = trips.get_fresh_days(cursor, fingerprints, route_id)
+            list(trips.iter_stored_trips(cursor, fresh_dates[:1], route_id))
+            list(trips.iter_reconstructed_days(cursor, dates, route_id))
+        finally:
+            conn.set_trace_callback(None)
+
+        return [
+            sql for sql in statements
+            if not sql.lstrip().upper().startswith(('PRAGMA', 'BEGIN', 'COMMIT')) and 'sqlite_master' not in sql
+        ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info', '0002_alter_busdata_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plate_no', models.CharField(max_length=20, unique=True, verbose_name='차량 번호')),
+            ],
+            options={
+                'verbose_name': '차량',
+                'verbose_name_plural': '차량들',
+                'ordering': ['plate_no'],
+            },
+        ),
+        migrations.AddField(
+            model_name='buscollection',
+            name='packed_buses',
+            field=models.BinaryField(blank=True, null=True, verbose_name='압축 버스 데이터'),
+        ),
+    ]
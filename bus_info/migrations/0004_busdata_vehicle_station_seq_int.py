@@ -0,0 +1,88 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_vehicles(apps, schema_editor):
+    """
+    BusData.plate_no를 Vehicle 테이블로 정규화하고, 숫자가 아닌 정류소 순번은 NULL로 변환
+    """
+    Vehicle = apps.get_model('bus_info', 'Vehicle')
+    BusData = apps.get_model('bus_info', 'BusData')
+    
+    plate_nos = BusData.objects.order_by().values_list('plate_no', flat=True).distinct()
+    Vehicle.objects.bulk_create(
+        [Vehicle(plate_no=plate_no) for plate_no in plate_nos],
+        ignore_conflicts=True,
+        batch_size=500
+    )
+    BusData.objects.update(
+        vehicle_id=Subquery(
+            Vehicle.objects.filter(plate_no=OuterRef('plate_no')).values('id')[:1]
+        )
+    )
+    BusData.objects.exclude(station_seq__regex=r'^[0-9]+$').update(station_seq=None)
+
+
+def restore_plate_numbers(apps, schema_editor):
+    """
+    역방향: Vehicle 테이블의 차량 번호를 BusData.plate_no로 복원
+    """
+    Vehicle = apps.get_model('bus_info', 'Vehicle')
+    BusData = apps.get_model('bus_info', 'BusData')
+    
+    BusData.objects.update(
+        plate_no=Subquery(
+            Vehicle.objects.filter(id=OuterRef('vehicle_id')).values('plate_no')[:1]
+        )
+    )
+    BusData.objects.filter(station_seq__isnull=True).update(station_seq='N/A')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info', '0003_vehicle_packed_buses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='busdata',
+            name='vehicle',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='records', to='bus_info.vehicle', verbose_name='차량'),
+        ),
+        migrations.AlterField(
+            model_name='busdata',
+            name='station_seq',
+            field=models.CharField(max_length=10, null=True, verbose_name='정류소 순번'),
+        ),
+        # 역방향에서 RemoveField가 plate_no를 다시 추가할 때 값 복원 전이라 NULL 허용
+        migrations.AlterField(
+            model_name='busdata',
+            name='plate_no',
+            field=models.CharField(max_length=20, null=True, verbose_name='차량 번호'),
+        ),
+        migrations.RunPython(populate_vehicles, restore_plate_numbers),
+        migrations.AlterField(
+            model_name='busdata',
+            name='station_seq',
+            field=models.PositiveSmallIntegerField(null=True, verbose_name='정류소 순번'),
+        ),
+        migrations.AlterField(
+            model_name='busdata',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='records', to='bus_info.vehicle', verbose_name='차량'),
+        ),
+        migrations.RemoveField(
+            model_name='busdata',
+            name='plate_no',
+        ),
+        migrations.AlterModelOptions(
+            name='busdata',
+            options={'ordering': ['station_seq'], 'verbose_name': '버스 데이터', 'verbose_name_plural': '버스 데이터들'},
+        ),
+        migrations.AddIndex(
+            model_name='busdata',
+            index=models.Index(fields=['collection', 'station_seq', 'vehicle', 'remain_seat_cnt'], name='bus_info_bu_coll_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info', '0004_busdata_vehicle_station_seq_int'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buscollection',
+            name='same_as',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='repeats', to='bus_info.buscollection', verbose_name='동일 스냅샷 기준 수집'),
+        ),
+    ]
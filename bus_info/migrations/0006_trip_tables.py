@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info', '0005_buscollection_same_as'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route_id', models.CharField(max_length=20, verbose_name='노선 ID')),
+                ('service_date', models.DateField(verbose_name='운행 날짜')),
+                ('trip_order', models.PositiveSmallIntegerField(verbose_name='출발 순서')),
+                ('trip_key', models.CharField(max_length=40, verbose_name='배차 키')),
+                ('start_time', models.DateTimeField(null=True, verbose_name='출발 시간')),
+                ('zero_count', models.PositiveSmallIntegerField(default=0, verbose_name='승객 0명 정류장 수')),
+            ],
+            options={
+                'verbose_name': '배차',
+                'verbose_name_plural': '배차들',
+                'ordering': ['service_date', 'trip_order'],
+                'constraints': [models.UniqueConstraint(fields=('route_id', 'service_date', 'trip_order'), name='bus_info_trip_route_date_order_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TripDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route_id', models.CharField(max_length=20, verbose_name='노선 ID')),
+                ('service_date', models.DateField(verbose_name='운행 날짜')),
+                ('trip_count', models.PositiveSmallIntegerField(default=0, verbose_name='배차 수')),
+                ('collection_count', models.PositiveIntegerField(default=0, verbose_name='수집 건수')),
+                ('last_collection_id', models.BigIntegerField(null=True, verbose_name='마지막 수집 건 ID')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='생성 시간')),
+            ],
+            options={
+                'verbose_name': '배차 재구성 날짜',
+                'verbose_name_plural': '배차 재구성 날짜들',
+                'ordering': ['-service_date'],
+                'constraints': [models.UniqueConstraint(fields=('route_id', 'service_date'), name='bus_info_tripday_route_date_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TripStationLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station_idx', models.PositiveSmallIntegerField(verbose_name='정류소 순번')),
+                ('passengers', models.SmallIntegerField(verbose_name='승객 수')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loads', to='bus_info.trip', verbose_name='배차')),
+            ],
+            options={
+                'verbose_name': '배차 정류장 승객 수',
+                'verbose_name_plural': '배차 정류장 승객 수들',
+                'ordering': ['trip', 'station_idx'],
+                'constraints': [models.UniqueConstraint(fields=('trip', 'station_idx'), name='bus_info_tripload_trip_station_uniq')],
+            },
+        ),
+    ]
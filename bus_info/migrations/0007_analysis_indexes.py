@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bus_info', '0006_trip_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='buscollection',
+            index=models.Index(condition=models.Q(('is_error', False), ('is_skipped', False)), fields=['route_id', 'collection_date', 'query_time'], name='bus_info_bu_success_idx'),
+        ),
+    ]
@@ -2,6 +2,21 @@ from django.db import models
 from django.utils import timezone
 
 
+class Vehicle(models.Model):
+    """
+    차량 번호 차원 테이블 (반복되는 차량 번호 문자열을 정수 ID로 대체)
+    """
+    plate_no = models.CharField(max_length=20, unique=True, verbose_name="차량 번호")
+    
+    class Meta:
+        verbose_name = "차량"
+        verbose_name_plural = "차량들"
+        ordering = ['plate_no']
+    
+    def __str__(self):
+        return self.plate_no
+
+
 class BusCollection(models.Model):
     """
     버스 데이터 수집 정보를 저장하는 모델
@@ -15,6 +30,18 @@ class BusCollection(models.Model):
     error_message = models.TextField(blank=True, verbose_name="오류 메시지")
     is_skipped = models.BooleanField(default=False, verbose_name="건너뛰기 여부")
     skip_reason = models.CharField(max_length=200, blank=True, verbose_name="건너뛰기 사유")
+    # 압축 저장 모드(STORAGE_MODE='packed')에서는 BusData 행 대신 버스 목록을 바이너리로 저장
+    packed_buses = models.BinaryField(null=True, blank=True, verbose_name="압축 버스 데이터")
+    # 변경분 저장 모드에서 직전 스냅샷과 버스 목록이 같으면 버스 데이터 대신 기준 수집 건만 참조
+    # (기준 수집 건은 항상 같은 노선, 같은 수집 날짜의 전체 스냅샷)
+    same_as = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='repeats',
+        verbose_name="동일 스냅샷 기준 수집"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="생성 시간")
     
     class Meta:
@@ -24,6 +51,13 @@ class BusCollection(models.Model):
         indexes = [
             models.Index(fields=['route_id', 'collection_date']),
             models.Index(fields=['collection_date']),
+            # 분석 조회용 부분 인덱스 - 성공한 수집 건만 노선/날짜/쿼리 시간 순으로 정렬
+            # (날짜별 건수/마지막 ID 집계는 테이블 접근 없이, 버스 행 조회는 정렬 없이 처리)
+            models.Index(
+                fields=['route_id', 'collection_date', 'query_time'],
+                name='bus_info_bu_success_idx',
+                condition=models.Q(is_error=False, is_skipped=False)
+            ),
         ]
     
     def __str__(self):
@@ -40,14 +74,107 @@ class BusData(models.Model):
         related_name='buses',
         verbose_name="수집 정보"
     )
-    plate_no = models.CharField(max_length=20, verbose_name="차량 번호")
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.PROTECT,
+        related_name='records',
+        verbose_name="차량"
+    )
     remain_seat_cnt = models.IntegerField(verbose_name="잔여 좌석 수")
-    station_seq = models.CharField(max_length=10, verbose_name="정류소 순번")
+    # 숫자가 아닌 정류소 순번(API 응답 누락 등)은 NULL로 저장
+    station_seq = models.PositiveSmallIntegerField(null=True, verbose_name="정류소 순번")
     
     class Meta:
         verbose_name = "버스 데이터"
         verbose_name_plural = "버스 데이터들"
-        ordering = ['station_seq', 'plate_no']
+        ordering = ['station_seq']
+        indexes = [
+            # 수집 건별 정류소 순 조회를 테이블 접근 없이 처리하는 커버링 인덱스
+            models.Index(
+                fields=['collection', 'station_seq', 'vehicle', 'remain_seat_cnt'],
+                name='bus_info_bu_coll_seq_idx'
+            ),
+        ]
+    
+    @property
+    def plate_no(self):
+        return self.vehicle.plate_no
     
     def __str__(self):
         return f"{self.plate_no} - 잔여좌석: {self.remain_seat_cnt}개"
+
+
+class TripDay(models.Model):
+    """
+    배차 재구성 결과가 만들어진 날짜 (원본 수집 건이 바뀌었는지 확인하는 기준 포함)
+    """
+    route_id = models.CharField(max_length=20, verbose_name="노선 ID")
+    service_date = models.DateField(verbose_name="운행 날짜")
+    trip_count = models.PositiveSmallIntegerField(default=0, verbose_name="배차 수")
+    # 재구성에 사용한 성공 수집 건 수와 마지막 수집 건 ID (다르면 다시 계산)
+    collection_count = models.PositiveIntegerField(default=0, verbose_name="수집 건수")
+    last_collection_id = models.BigIntegerField(null=True, verbose_name="마지막 수집 건 ID")
+    built_at = models.DateTimeField(auto_now=True, verbose_name="생성 시간")
+    
+    class Meta:
+        verbose_name = "배차 재구성 날짜"
+        verbose_name_plural = "배차 재구성 날짜들"
+        ordering = ['-service_date']
+        constraints = [
+            models.UniqueConstraint(fields=['route_id', 'service_date'], name='bus_info_tripday_route_date_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.route_id} - {self.service_date} ({self.trip_count}회)"
+
+
+class Trip(models.Model):
+    """
+    하루치 수집 데이터에서 재구성한 배차 (출발 순서 기준 상위 배차만 저장)
+    """
+    route_id = models.CharField(max_length=20, verbose_name="노선 ID")
+    service_date = models.DateField(verbose_name="운행 날짜")
+    trip_order = models.PositiveSmallIntegerField(verbose_name="출발 순서")
+    trip_key = models.CharField(max_length=40, verbose_name="배차 키")  # "{차량 번호}_{회차}"
+    start_time = models.DateTimeField(null=True, verbose_name="출발 시간")
+    # 보정 후 승객 수가 0인 정류장 수 (평균 분석에서 10개 이상인 배차는 제외)
+    zero_count = models.PositiveSmallIntegerField(default=0, verbose_name="승객 0명 정류장 수")
+    
+    class Meta:
+        verbose_name = "배차"
+        verbose_name_plural = "배차들"
+        ordering = ['service_date', 'trip_order']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['route_id', 'service_date', 'trip_order'],
+                name='bus_info_trip_route_date_order_uniq'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.service_date} {self.trip_order + 1}번째 배차 ({self.trip_key})"
+
+
+class TripStationLoad(models.Model):
+    """
+    배차별 정류장 승객 수 (결측치 보정 후)
+    """
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.CASCADE,
+        related_name='loads',
+        verbose_name="배차"
+    )
+    station_idx = models.PositiveSmallIntegerField(verbose_name="정류소 순번")
+    passengers = models.SmallIntegerField(verbose_name="승객 수")
+    
+    class Meta:
+        verbose_name = "배차 정류장 승객 수"
+        verbose_name_plural = "배차 정류장 승객 수들"
+        ordering = ['trip', 'station_idx']
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'station_idx'], name='bus_info_tripload_trip_station_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.trip} - {self.station_idx}: {self.passengers}명"
@@ -0,0 +1,257 @@
+"""
+평균 분석 결과 캐시 (프로세스 내 LRU + 선택적 디스크 저장소)
+
+키는 분석 대상 DB의 지문과 조회 조건(기간, 요일, 평일/주말)으로 만든다. 업로드된 DB는
+변하지 않으므로 파일 내용 해시를, 운영 DB는 수집 건 수와 마지막 ID를 지문으로 사용하여
+수집이 진행되면 자동으로 새 키가 된다. 항목 수/크기와 TTL 기준으로 제거한다.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .trips import connect_analysis_db
+
+
+# 계산 방식이 바뀌면 올려서 이전 디스크 캐시를 무효화
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 업로드 파일 내용 해시 {경로: (크기, 수정 시각, 해시)}
+_file_hashes = {}
+_file_hash_lock = threading.Lock()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remember_file_hash(path, digest):
+    """
+    업로드 중 계산한 파일 해시 등록 (이후 지문 계산 시 파일을 다시 읽지 않음)
+    """
+    stat = os.stat(path)
+    with _file_hash_lock:
+        _file_hashes[path] = (stat.st_size, stat.st_mtime_ns, digest)
+
+
+def get_file_hash(path):
+    """
+    파일 내용 해시 (크기/수정 시각이 같으면 이전에 계산한 값 사용)
+    """
+    stat = os.stat(path)
+    with _file_hash_lock:
+        cached = _file_hashes.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    digest = hash_file(path)
+    with _file_hash_lock:
+        _file_hashes[path] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
+def get_db_fingerprint(db_path):
+    """
+    분석 대상 DB의 지문 (업로드 파일: 내용 해시 / 운영 DB URI: 수집 건 수와 마지막 ID)
+    """
+    if not db_path.startswith('file:'):
+        return f"sha256:{get_file_hash(db_path)}"
+
+    conn = connect_analysis_db(db_path)
+    try:
+        count, last_id = conn.execute("SELECT COUNT(*), MAX(id) FROM bus_info_buscollection").fetchone()
+    finally:
+        conn.close()
+    return f"live:{count}:{last_id}"
+
+
+def make_key(*parts):
+    return hashlib.sha256(json.dumps([CACHE_VERSION, *parts], default=str).encode('utf-8')).hexdigest()
+
+
+class AnalysisResultCache:
+    """
+    JSON으로 직렬화 가능한 분석 결과 캐시
+
+    메모리에는 최근 사용 순으로 max_entries개 / max_bytes 이하만 유지하고, disk_dir이 있으면
+    결과를 파일로도 저장하여 프로세스 재시작이나 다른 작업자 프로세스에서도 재사용한다.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=24 * 60 * 60,
+                 disk_dir='', disk_max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries = OrderedDict()  # {키: (저장 시각, 크기, 값)}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        캐시된 값 반환 (없거나 만료되면 KeyError)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                self._remove(key)
+
+        value, created_at, size = self._read_disk(key, now)
+        with self._lock:
+            self.disk_hits += 1
+            self._store(key, value, created_at, size)
+        return value
+
+    def set(self, key, value):
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now, len(data))
+        self._write_disk(key, data)
+
+    def get_or_compute(self, key, compute):
+        """
+        (값, 캐시 적중 여부) - 없으면 compute()로 계산하여 저장
+        """
+        try:
+            return self.get(key), True
+        except KeyError:
+            pass
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self.set(key, value)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'disk_enabled': bool(self.disk_dir)
+        }
+
+    def _store(self, key, value, created_at, size):
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (created_at, size, value)
+        self._bytes += size
+        # 최근에 사용하지 않은 항목부터 제거
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_files(self):
+        if not self.disk_dir:
+            return []
+        return glob.glob(os.path.join(self.disk_dir, '*.json'))
+
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            raise KeyError(key)
+        path = self._disk_path(key)
+        try:
+            created_at = os.path.getmtime(path)
+            if now - created_at > self.ttl:
+                os.remove(path)
+                raise KeyError(key)
+            with open(path, 'rb') as f:
+                data = f.read()
+            # 최근 사용 시각 갱신 (디스크 용량 초과 시 오래 사용하지 않은 파일부터 제거)
+            os.utime(path, (now, created_at))
+        except OSError:
+            raise KeyError(key)
+        return json.loads(data), created_at, len(data)
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            temp_path = f"{self._disk_path(key)}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._disk_path(key))
+            self._evict_disk()
+        except OSError as e:
+            print(f"분석 결과 캐시 저장 오류: {e}")
+
+    def _evict_disk(self):
+        now = time.time()
+        files = []
+        total = 0
+        for path in self._disk_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            files.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# 전역 평균 분석 결과 캐시
+average_cache = AnalysisResultCache(
+    max_entries=getattr(settings, 'ANALYSIS_CACHE_MAX_ENTRIES', 256),
+    max_bytes=getattr(settings, 'ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+    ttl=getattr(settings, 'ANALYSIS_CACHE_TTL', 24 * 60 * 60),
+    disk_dir=getattr(settings, 'ANALYSIS_CACHE_DIR', ''),
+    disk_max_bytes=getattr(settings, 'ANALYSIS_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024)
+)
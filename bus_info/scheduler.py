@@ -0,0 +1,159 @@
+"""
+데드라인 기반 작업 스케줄러
+"""
+import heapq
+import itertools
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """
+    힙(우선순위 큐) 기반 데드라인 스케줄러
+
+    주기적으로 깨어나 시간을 비교하지 않고, 가장 가까운 예정 시각까지
+    threading.Event.wait(timeout)으로 잠든다. 작업 등록/재등록/취소/중지 시에는
+    이벤트를 세워 즉시 깨어나 대기 시간을 다시 계산한다.
+
+    콜백은 스케줄러 스레드에서 실행되므로 오래 걸리는 작업은 콜백 안에서
+    워커 풀로 넘겨야 한다.
+    """
+
+    def __init__(self, name='deadline-scheduler'):
+        self.name = name
+        self._heap = []  # (예정 시각, 순번, 작업 키)
+        self._jobs = {}  # 작업 키 -> (예정 시각, 순번, 콜백)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = False
+
+        # 드리프트 통계 (실제 실행 시각 - 예정 시각)
+        self._drift_stats = {}
+        self._wakeups = 0
+
+    def schedule(self, key, due_time, callback):
+        """
+        작업 등록 (같은 키의 기존 예약은 대체됨)
+        """
+        with self._lock:
+            seq = next(self._counter)
+            self._jobs[key] = (due_time, seq, callback)
+            heapq.heappush(self._heap, (due_time, seq, key))
+        self._wakeup.set()
+
+    def cancel(self, key):
+        """
+        작업 예약 취소 (힙에 남은 항목은 실행 시점에 무시됨)
+        """
+        with self._lock:
+            removed = self._jobs.pop(key, None) is not None
+        self._wakeup.set()
+        return removed
+
+    def get_due_time(self, key):
+        """
+        작업의 다음 예정 시각 반환 (예약이 없으면 None)
+        """
+        job = self._jobs.get(key)
+        return job[0] if job else None
+
+    def start(self):
+        """
+        스케줄러 스레드 시작
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        스케줄러 스레드 중지 (대기 중이면 즉시 깨어나 종료)
+        """
+        self._running = False
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        self._thread = None
+
+    def is_alive(self):
+        """
+        스케줄러 스레드 실행 여부
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_stats(self):
+        """
+        작업별 드리프트 통계 반환 (초 단위)
+        """
+        with self._lock:
+            jobs = {}
+            for key, stats in self._drift_stats.items():
+                jobs[str(key)] = {
+                    'runs': stats['runs'],
+                    'last_drift': round(stats['last'], 4),
+                    'avg_drift': round(stats['total'] / stats['runs'], 4),
+                    'max_drift': round(stats['max'], 4)
+                }
+            return {
+                'pending_jobs': len(self._jobs),
+                'wakeups': self._wakeups,
+                'jobs': jobs
+            }
+
+    def _pop_due_job(self):
+        """
+        실행할 작업을 꺼내거나, 다음 작업까지 대기할 시간을 반환
+        반환값: (작업 키, 예정 시각, 콜백, None) 또는 (None, None, None, 대기 시간)
+        """
+        with self._lock:
+            # 이벤트는 잠금 안에서 초기화해야 그 사이의 등록 신호를 놓치지 않음
+            self._wakeup.clear()
+
+            while self._heap:
+                due_time, seq, key = self._heap[0]
+                job = self._jobs.get(key)
+
+                # 취소되었거나 재등록으로 대체된 항목은 버림
+                if job is None or job[1] != seq:
+                    heapq.heappop(self._heap)
+                    continue
+
+                wait_time = due_time - time.time()
+                if wait_time > 0:
+                    return None, None, None, wait_time
+
+                heapq.heappop(self._heap)
+                del self._jobs[key]
+                return key, due_time, job[2], None
+
+            # 예약된 작업이 없으면 등록 신호가 올 때까지 대기
+            return None, None, None, None
+
+    def _record_drift(self, key, drift):
+        with self._lock:
+            stats = self._drift_stats.setdefault(key, {'runs': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+            stats['runs'] += 1
+            stats['total'] += drift
+            stats['last'] = drift
+            stats['max'] = max(stats['max'], drift)
+
+    def _run(self):
+        while self._running:
+            key, due_time, callback, wait_time = self._pop_due_job()
+
+            if key is None:
+                self._wakeup.wait(wait_time)
+                self._wakeups += 1
+                continue
+
+            self._record_drift(key, time.time() - due_time)
+            try:
+                callback()
+            except Exception as e:
+                print(f"스케줄 작업 실행 오류 ({key}): {e}")
@@ -0,0 +1,375 @@
+"""
+수집 스냅샷(버스 목록) 저장 형식 변환, 조회 및 일괄 삭제
+
+저장 방식(STORAGE_MODE)과 무관하게 수집 건별 버스 목록을 읽을 수 있도록
+행 저장(BusData)과 압축 저장(BusCollection.packed_buses)을 모두 처리한다.
+"""
+import struct
+import threading
+
+from .config import DEFAULT_ROUTE_ID
+
+
+# 압축 형식: 버전(1바이트) + 버스별 [차량 ID(uint32), 정류소 순번(uint16), 잔여 좌석(int16)]
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<B')
+PACKED_BUS = struct.Struct('<IHh')
+
+# 숫자가 아닌 정류소 순번 ('N/A' 등)
+UNKNOWN_STATION_SEQ = 0xFFFF
+
+# 조회 시 IN 절에 넣을 최대 ID 수 (SQLite 변수 개수 제한 대비)
+QUERY_CHUNK_SIZE = 500
+
+# 차량 번호 -> 차량 ID 캐시 (프로세스 단위)
+_vehicle_ids = {}
+_vehicle_lock = threading.Lock()
+
+
+def parse_station_seq(value):
+    """
+    API의 정류소 순번을 정수로 변환 (숫자가 아니면 None)
+    """
+    try:
+        seq = int(value)
+    except (ValueError, TypeError):
+        return None
+    return seq if 0 <= seq < UNKNOWN_STATION_SEQ else None
+
+
+def pack_buses(entries):
+    """
+    [(차량 ID, 정류소 순번 또는 None, 잔여 좌석), ...]을 바이너리로 압축
+    """
+    parts = [PACKED_HEADER.pack(PACKED_VERSION)]
+    for vehicle_id, station_seq, remain_seat_cnt in entries:
+        seq = UNKNOWN_STATION_SEQ if station_seq is None else station_seq
+        parts.append(PACKED_BUS.pack(vehicle_id, seq, int(remain_seat_cnt)))
+    return b''.join(parts)
+
+
+def unpack_buses(blob):
+    """
+    압축된 바이너리를 [(차량 ID, 정류소 순번 또는 None, 잔여 좌석), ...]으로 복원
+    """
+    blob = bytes(blob)
+    if not blob:
+        return []
+
+    (version,) = PACKED_HEADER.unpack_from(blob, 0)
+    if version != PACKED_VERSION:
+        raise ValueError(f"지원하지 않는 압축 버전입니다: {version}")
+
+    return [
+        (vehicle_id, None if seq == UNKNOWN_STATION_SEQ else seq, remain_seat_cnt)
+        for vehicle_id, seq, remain_seat_cnt in PACKED_BUS.iter_unpack(blob[PACKED_HEADER.size:])
+    ]
+
+
+def packed_bus_count(blob):
+    """
+    압축 데이터의 버스 수 (복원하지 않고 계산)
+    """
+    if not blob:
+        return 0
+    return (len(blob) - PACKED_HEADER.size) // PACKED_BUS.size
+
+
+def get_vehicle_ids(plate_nos):
+    """
+    차량 번호 목록을 차량 ID로 변환 (없는 차량은 생성)
+    """
+    from .models import Vehicle
+
+    plate_nos = set(plate_nos)
+    with _vehicle_lock:
+        missing = [plate_no for plate_no in plate_nos if plate_no not in _vehicle_ids]
+        if missing:
+            Vehicle.objects.bulk_create([Vehicle(plate_no=p) for p in missing], ignore_conflicts=True)
+            for vehicle_id, plate_no in Vehicle.objects.filter(plate_no__in=missing).values_list('id', 'plate_no'):
+                _vehicle_ids[plate_no] = vehicle_id
+        return {plate_no: _vehicle_ids[plate_no] for plate_no in plate_nos}
+
+
+def get_plate_numbers(vehicle_ids):
+    """
+    차량 ID 목록을 차량 번호로 변환
+    """
+    from .models import Vehicle
+
+    plates = {}
+    vehicle_ids = list(set(vehicle_ids))
+    for i in range(0, len(vehicle_ids), QUERY_CHUNK_SIZE):
+        chunk = vehicle_ids[i:i + QUERY_CHUNK_SIZE]
+        plates.update(Vehicle.objects.filter(id__in=chunk).values_list('id', 'plate_no'))
+    return plates
+
+
+def station_sort_key(station_seq):
+    """
+    정류소 순번 숫자 정렬 키 (숫자가 아니면 맨 뒤)
+    """
+    try:
+        return int(station_seq)
+    except (ValueError, TypeError):
+        return float('inf')
+
+
+def load_buses(collections):
+    """
+    수집 정보 목록의 버스 데이터를 저장 방식과 무관하게 일괄 조회
+
+    반환값: {collection_id: [{'plate_no', 'remain_seat_cnt', 'station_seq'}, ...]}
+    (각 목록은 정류소 순번 순으로 정렬, 순번을 알 수 없는 버스(None)는 맨 뒤)
+    """
+    from django.db.models import F
+    from .models import BusCollection, BusData
+
+    result = {collection.id: [] for collection in collections}
+
+    # 변경분 저장 모드의 동일 스냅샷은 기준 수집 건의 버스 데이터를 읽음
+    sources = {collection.id: collection for collection in collections if collection.same_as_id is None}
+    base_ids = list({
+        collection.same_as_id for collection in collections
+        if collection.same_as_id is not None and collection.same_as_id not in sources
+    })
+    for i in range(0, len(base_ids), QUERY_CHUNK_SIZE):
+        chunk = base_ids[i:i + QUERY_CHUNK_SIZE]
+        for base in BusCollection.objects.filter(id__in=chunk).only('id', 'packed_buses'):
+            sources[base.id] = base
+    buses_by_source = {source_id: [] for source_id in sources}
+
+    # 행 저장 방식 (정렬은 DB에서 처리)
+    row_ids = [source.id for source in sources.values() if source.packed_buses is None]
+    for i in range(0, len(row_ids), QUERY_CHUNK_SIZE):
+        chunk = row_ids[i:i + QUERY_CHUNK_SIZE]
+        buses = BusData.objects.filter(collection_id__in=chunk).order_by(
+            F('station_seq').asc(nulls_last=True)
+        ).values_list(
+            'collection_id', 'vehicle__plate_no', 'remain_seat_cnt', 'station_seq'
+        )
+        for collection_id, plate_no, remain_seat_cnt, station_seq in buses:
+            buses_by_source[collection_id].append({
+                'plate_no': plate_no,
+                'remain_seat_cnt': remain_seat_cnt,
+                'station_seq': station_seq
+            })
+
+    # 압축 저장 방식
+    packed = [
+        (source.id, unpack_buses(source.packed_buses))
+        for source in sources.values() if source.packed_buses is not None
+    ]
+    if packed:
+        plates = get_plate_numbers(vehicle_id for _, entries in packed for vehicle_id, _, _ in entries)
+        for collection_id, entries in packed:
+            buses = buses_by_source[collection_id]
+            for vehicle_id, station_seq, remain_seat_cnt in entries:
+                buses.append({
+                    'plate_no': plates.get(vehicle_id, 'N/A'),
+                    'remain_seat_cnt': remain_seat_cnt,
+                    'station_seq': station_seq
+                })
+            buses.sort(key=lambda bus: station_sort_key(bus['station_seq']))
+
+    for collection in collections:
+        source_buses = buses_by_source.get(collection.same_as_id or collection.id, [])
+        if collection.same_as_id is None:
+            result[collection.id] = source_buses
+        else:
+            result[collection.id] = [dict(bus) for bus in source_buses]
+
+    return result
+
+
+def delete_collections(route_id=None, start_date=None, end_date=None):
+    """
+    조건에 맞는 수집 건과 버스 데이터를 한 트랜잭션에서 일괄 삭제
+
+    ORM의 delete()처럼 ID를 모두 읽어 나눠 지우지 않고, 집합 기반 DELETE 2개로 처리한다.
+    (변경분 저장의 기준 수집 건은 항상 같은 노선/날짜이므로 날짜 단위 삭제에서 함께 지워짐)
+    반환값: (삭제된 수집 건 수, 삭제된 버스 데이터 행 수)
+    """
+    from django.db import connection, transaction
+    from .models import BusCollection, BusData, Trip, TripDay, TripStationLoad
+
+    if not (route_id or start_date or end_date):
+        raise ValueError("삭제 조건(노선 또는 날짜)이 필요합니다.")
+
+    collection_table = BusCollection._meta.db_table
+    where, params = _get_delete_condition('collection_date', route_id, start_date, end_date)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM {BusData._meta.db_table}
+            WHERE collection_id IN (SELECT id FROM {collection_table} WHERE {where})
+        """, params)
+        deleted_buses = cursor.rowcount
+        cursor.execute(f"DELETE FROM {collection_table} WHERE {where}", params)
+        deleted_collections = cursor.rowcount
+
+        # 삭제된 날짜의 배차 재구성 결과도 함께 삭제
+        trip_where, trip_params = _get_delete_condition('service_date', route_id, start_date, end_date)
+        cursor.execute(f"""
+            DELETE FROM {TripStationLoad._meta.db_table}
+            WHERE trip_id IN (SELECT id FROM {Trip._meta.db_table} WHERE {trip_where})
+        """, trip_params)
+        cursor.execute(f"DELETE FROM {Trip._meta.db_table} WHERE {trip_where}", trip_params)
+        cursor.execute(f"DELETE FROM {TripDay._meta.db_table} WHERE {trip_where}", trip_params)
+
+    return deleted_collections, deleted_buses
+
+
+def _get_delete_condition(date_column, route_id=None, start_date=None, end_date=None):
+    """
+    노선/날짜 범위 삭제 조건 (date_column: 테이블의 날짜 컬럼 이름) 반환값: (WHERE 절, 파라미터)
+    """
+    conditions = []
+    params = []
+    if route_id:
+        conditions.append('route_id = %s')
+        params.append(route_id)
+    if start_date:
+        conditions.append(f'{date_column} >= %s')
+        params.append(start_date.isoformat())
+    if end_date:
+        conditions.append(f'{date_column} <= %s')
+        params.append(end_date.isoformat())
+    return ' AND '.join(conditions), params
+
+
+def pack_snapshots(snapshots, vehicle_ids):
+    """
+    압축 저장 모드: 스냅샷의 버스 목록을 BusCollection.packed_buses로 변환
+    (변환된 스냅샷은 BusData 행을 저장하지 않음)
+    """
+    for snapshot in snapshots:
+        if snapshot.collection.is_error or snapshot.collection.is_skipped:
+            continue
+        if snapshot.collection.packed_buses is not None:
+            continue  # 재시도 시 이미 변환된 스냅샷
+        snapshot.collection.packed_buses = pack_buses(
+            (vehicle_ids[plate_no], station_seq, remain_seat_cnt)
+            for plate_no, remain_seat_cnt, station_seq in snapshot.buses
+        )
+        snapshot.buses = []
+
+
+def _get_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _row_sort_key(row):
+    # ORDER BY plate_no, CAST(station_seq AS INTEGER)와 같은 순서 (NULL 먼저, 숫자가 아니면 0)
+    plate_no, station_seq = row[3], row[4]
+    try:
+        seq = int(station_seq)
+    except (ValueError, TypeError):
+        seq = 0
+    return (plate_no is not None, plate_no or '', station_seq is not None, seq)
+
+
+def fetch_snapshot_rows(cursor, date_condition, params, route_id=DEFAULT_ROUTE_ID):
+    """
+    sqlite3 커서(업로드된 DB 등)에서 성공한 수집 건의 버스 행 조회
+
+    반환값: [(collection_id, query_time, collection_date, plate_no, station_seq, remain_seat_cnt), ...]
+    수집 날짜, 쿼리 시간, 차량 번호, 정류소 순번 순으로 정렬되며,
+    압축 저장된 수집 건은 행 형태로 풀어서 같은 순서로 끼워 넣는다.
+    버스가 없는 수집 건은 차량 번호 등이 None인 행 1개로 반환된다.
+    동일 스냅샷(same_as)은 기준 수집 건의 버스 행을 자신의 ID로 반환한다.
+    """
+    return list(iter_snapshot_rows(cursor, date_condition, params, route_id))
+
+
+def iter_snapshot_rows(cursor, date_condition, params, route_id=DEFAULT_ROUTE_ID):
+    """
+    fetch_snapshot_rows와 같은 행을 커서에서 바로 읽어 하나씩 반환하는 제너레이터
+    (전체 결과를 메모리에 올리지 않음 - 다 읽기 전에는 같은 커서로 다른 쿼리를 실행하지 말 것)
+    """
+    collection_columns = _get_columns(cursor, 'bus_info_buscollection')
+    has_packed = 'packed_buses' in collection_columns
+
+    # 변경분 저장 모드의 동일 스냅샷은 기준 수집 건의 버스 데이터를 사용
+    if 'same_as_id' in collection_columns:
+        bus_join = (
+            'LEFT JOIN bus_info_buscollection base ON base.id = c.same_as_id '
+            'LEFT JOIN bus_info_busdata b ON b.collection_id = COALESCE(c.same_as_id, c.id)'
+        )
+        packed_column = 'COALESCE(base.packed_buses, c.packed_buses)'
+    else:
+        bus_join = 'LEFT JOIN bus_info_busdata b ON c.id = b.collection_id'
+        packed_column = 'c.packed_buses' if has_packed else 'NULL'
+
+    # 차량 번호/정류소 순번 저장 형식은 DB 버전에 따라 다름
+    # (이전 버전: busdata.plate_no 문자열 + 문자열 순번 / 현재: vehicle 테이블 참조 + 정수 순번)
+    if 'vehicle_id' in _get_columns(cursor, 'bus_info_busdata'):
+        plate_column = 'v.plate_no'
+        vehicle_join = 'LEFT JOIN bus_info_vehicle v ON v.id = b.vehicle_id'
+    else:
+        plate_column = 'b.plate_no'
+        vehicle_join = ''
+
+    # 압축 저장된 버스 목록의 차량 번호 (본 쿼리를 읽는 중에는 커서를 쓸 수 없으므로 먼저 조회)
+    plates = {}
+    if has_packed:
+        cursor.execute("SELECT id, plate_no FROM bus_info_vehicle")
+        plates = dict(cursor.fetchall())
+
+    # 정렬은 성공 수집 건 부분 인덱스(노선, 날짜, 쿼리 시간) 순서를 그대로 쓰고, 차량 번호/정류소 순번
+    # 정렬은 같은 (수집 날짜, 쿼리 시간) 그룹 안에서만 처리 (하루 전체 행을 임시 B-tree로 정렬하지 않음)
+    # 조건식은 부분 인덱스 조건(NOT is_error AND NOT is_skipped)과 같은 형태로 작성
+    cursor.execute(f"""
+        SELECT
+            c.id,
+            c.query_time,
+            c.collection_date,
+            {plate_column},
+            b.station_seq,
+            b.remain_seat_cnt,
+            {packed_column}
+        FROM bus_info_buscollection c
+        {bus_join}
+        {vehicle_join}
+        WHERE {date_condition}
+        AND c.route_id = ?
+        AND NOT c.is_error
+        AND NOT c.is_skipped
+        ORDER BY c.collection_date, c.query_time
+    """, tuple(params) + (route_id,))
+
+    # 같은 (수집 날짜, 쿼리 시간) 그룹 안에서 압축 행을 풀고 차량 번호, 정류소 순번 순으로 정렬
+    group = []
+    group_key = None
+
+    for row in cursor:
+        key = (row[2], row[1])
+        if key != group_key:
+            group.sort(key=_row_sort_key)
+            yield from group
+            group = []
+            group_key = key
+
+        collection_id, query_time, collection_date, plate_no, station_seq, remain_seat_cnt, blob = row
+        if blob is None:
+            group.append(row[:6])
+            continue
+
+        entries = unpack_buses(blob)
+        if not entries:
+            group.append((collection_id, query_time, collection_date, None, None, None))
+            continue
+
+        for vehicle_id, seq, seats in entries:
+            group.append((
+                collection_id,
+                query_time,
+                collection_date,
+                plates.get(vehicle_id),
+                seq,
+                seats
+            ))
+
+    group.sort(key=_row_sort_key)
+    yield from group
@@ -1,3 +1,645 @@
-from django.test import TestCase
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from . import snapshots
+from .data_collector import BusDataCollector, CollectionInProgress, CollectorManager
+from .gbis_client import GbisApiError, GbisClient
+from .archive import archive_day
+from .config import DEFAULT_ROUTE_ID
+from .export import ExportQuery, write_sqlite
+from .models import BusCollection, BusData, Trip, TripDay, TripStationLoad, Vehicle
+from .snapshots import iter_snapshot_rows, load_buses
+from .trips import (
+    count_zero_stations, get_day_fingerprints, get_day_trips, get_fresh_days, reconstruct_days, refresh_trips
+)
+from .writer import PendingSnapshot, SnapshotWriter, write_snapshots
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+SAMPLE_RESPONSE = {
+    'response': {
+        'msgHeader': {'resultCode': 0, 'resultMessage': '정상', 'queryTime': '2025-11-03 08:00:00'},
+        'msgBody': {'busLocationList': [{'plateNo': '경기70아1111', 'remainSeatCnt': 10, 'stationSeq': 3}]}
+    }
+}
+
+
+class StubGbisServer:
+    """
+    재시도 경로 확인용 로컬 GBIS API 서버
+
+    responses: 요청 순서대로 돌려줄 (상태 코드, 응답 지연 초) 목록 (다 쓰면 마지막 항목 반복)
+    상태 코드가 200이면 SAMPLE_RESPONSE를 보낸다.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, delay = stub.next_response()
+                if delay:
+                    time.sleep(delay)
+                body = json.dumps(SAMPLE_RESPONSE if status == 200 else {'error': status}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 클라이언트가 시간 초과로 먼저 끊음
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/getBusLocationListv2"
+
+    def next_response(self):
+        with self._lock:
+            index = min(self.requests, len(self.responses) - 1)
+            self.requests += 1
+            return self.responses[index]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_day_data(day='2025-11-03', minutes=50):
+    """
+    하루치 수집 데이터 (버스 3대가 2분마다 한 정류장씩 이동하므로 절반은 직전과 같은 스냅샷)
+    """
+    plates = ['경기70아1001', '경기70아1002', '경기70아1003']
+    data = []
+    for minute in range(minutes):
+        step = minute // 2
+        buses = []
+        for i, plate in enumerate(plates):
+            station = 1 + (step + i * 12) % 36
+            buses.append({'plateNo': plate, 'remainSeatCnt': 45 - (station * 7 + i) % 40, 'stationSeq': station})
+        data.append({'query_time': f"{day} 07:{minute:02d}:00", 'buses': buses})
+    return data
+
+
+class CollectionTestCase(TransactionTestCase):
+    def setUp(self):
+        # 차량 ID 캐시는 테스트 DB 초기화와 무관하게 남으므로 테스트마다 비움
+        snapshots._vehicle_ids.clear()
+
+    def raw_cursor(self):
+        # 분석 함수들처럼 Django 연결과 별도의 sqlite3 연결로 읽음 (날짜/시간은 문자열)
+        conn = sqlite3.connect(connection.settings_dict['NAME'], uri=True)
+        self.addCleanup(conn.close)
+        return conn.cursor()
+
+    def ingest(self, route_id, data, storage_mode='rows', dedup=False, batch_size=7):
+        collector = BusDataCollector(route_id=route_id, client=mock.Mock())
+        pending = []
+        with mock.patch('bus_info.writer.STORAGE_MODE', storage_mode):
+            for item in data:
+                snapshot = collector.build_snapshot(item)
+                if dedup:
+                    collector.link_unchanged(snapshot)
+                pending.append(snapshot)
+                if len(pending) >= batch_size:
+                    write_snapshots(pending)
+                    pending = []
+            if pending:
+                write_snapshots(pending)
+        return collector
+
+
+def make_client(stub, **kwargs):
+    options = {'service_key': 'test', 'timeout': 1, 'max_retries': 2, 'backoff_base': 0.001, 'backoff_max': 0.01}
+    options.update(kwargs)
+    return GbisClient(endpoint=stub.endpoint, **options)
+
+
+class GbisClientTests(SimpleTestCase):
+    def test_retries_transient_server_error(self):
+        with StubGbisServer([(503, 0), (502, 0), (200, 0)]) as stub:
+            client = make_client(stub)
+            data = client.get_bus_locations('1')
+            client.close()
+
+        self.assertEqual(data, SAMPLE_RESPONSE)
+        self.assertEqual(stub.requests, 3)
+        stats = client.get_stats()
+        self.assertEqual((stats['requests'], stats['retries'], stats['failures']), (3, 2, 0))
+
+    def test_gives_up_after_max_retries(self):
+        with StubGbisServer([(500, 0)]) as stub:
+            client = make_client(stub, max_retries=2)
+            with self.assertRaises(GbisApiError):
+                client.get_bus_locations('1')
+            client.close()
+
+        self.assertEqual(stub.requests, 3)
+        stats = client.get_stats()
+        self.assertEqual((stats['requests'], stats['retries'], stats['failures']), (3, 2, 1))
+
+    def test_retries_timeout(self):
+        with StubGbisServer([(200, 0.5), (200, 0)]) as stub:
+            client = make_client(stub, timeout=0.1)
+            data = client.get_bus_locations('1')
+            client.close()
+
+        self.assertEqual(data, SAMPLE_RESPONSE)
+        self.assertEqual(stub.requests, 2)
+        self.assertEqual(client.get_stats()['retries'], 1)
+
+    def test_client_error_is_not_retried(self):
+        with StubGbisServer([(404, 0)]) as stub:
+            client = make_client(stub)
+            with self.assertRaises(requests.HTTPError):
+                client.get_bus_locations('1')
+            client.close()
+
+        self.assertEqual(stub.requests, 1)
+        self.assertEqual(client.get_stats()['retries'], 0)
+
+    def test_backoff_is_capped_exponential(self):
+        client = GbisClient(endpoint='http://127.0.0.1:1/', service_key='test', backoff_base=0.5, backoff_max=5.0)
+        with mock.patch('bus_info.gbis_client.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([client.get_backoff(attempt) for attempt in range(6)], [0.5, 1.0, 2.0, 4.0, 5.0, 5.0])
+        client.close()
+
+
+class CollectorRetryTests(CollectionTestCase):
+    @mock.patch('bus_info.data_collector.WRITE_BEHIND_ENABLED', False)
+    @mock.patch.object(BusDataCollector, 'is_skip_time', return_value=False)
+    def test_transient_server_error_is_not_saved_as_error(self, _):
+        """
+        재시도로 복구된 5xx 응답은 오류 수집 건(is_error)으로 저장되지 않음
+        """
+        with StubGbisServer([(503, 0), (200, 0)]) as stub:
+            client = make_client(stub)
+            collector = BusDataCollector(route_id='1', client=client)
+            snapshot = collector.collect_and_save()
+            client.close()
+
+        self.assertEqual(stub.requests, 2)
+        self.assertIsNotNone(snapshot.collection_id)
+        self.assertFalse(BusCollection.objects.filter(is_error=True).exists())
+        self.assertEqual(BusCollection.objects.filter(route_id='1').count(), 1)
+        self.assertEqual(snapshot.collection.buses.count(), 1)
+
+
+class SnapshotDedupTests(CollectionTestCase):
+    def read_back(self, route_id, day):
+        collections = list(BusCollection.objects.filter(route_id=route_id).order_by('query_time'))
+        buses = load_buses(collections)
+        loaded = [(collection.query_time, buses[collection.id]) for collection in collections]
+        rows = [row[1:] for row in iter_snapshot_rows(self.raw_cursor(), 'c.collection_date = ?', (day,), route_id)]
+        trips = reconstruct_days(self.raw_cursor(), [day], route_id)
+        return loaded, rows, trips
+
+    def test_dedup_and_packed_read_back_matches_rows(self):
+        """
+        변경분 저장(same_as)과 압축 저장으로 저장해도 조회/분석 결과가 행 저장과 같음
+        """
+        day = '2025-11-03'
+        data = make_day_data(day)
+        self.ingest('R0', data)
+        expected = self.read_back('R0', day)
+        self.assertTrue(expected[2][day])
+
+        for route_id, storage_mode in (('R1', 'rows'), ('R2', 'packed')):
+            with self.subTest(storage_mode=storage_mode):
+                collector = self.ingest(route_id, data, storage_mode=storage_mode, dedup=True)
+                repeats = BusCollection.objects.filter(route_id=route_id, same_as__isnull=False)
+                self.assertEqual(collector.deduplicated_collections, len(data) // 2)
+                self.assertEqual(repeats.count(), len(data) // 2)
+                self.assertFalse(BusData.objects.filter(collection__in=repeats).exists())
+                if storage_mode == 'packed':
+                    self.assertFalse(BusData.objects.filter(collection__route_id=route_id).exists())
+                self.assertEqual(self.read_back(route_id, day), expected)
+
+    @mock.patch('bus_info.data_collector.WRITE_BEHIND_ENABLED', False)
+    @mock.patch('bus_info.data_collector.DEDUP_UNCHANGED_SNAPSHOTS', True)
+    def test_failed_write_is_not_used_as_base(self):
+        """
+        저장에 실패한 스냅샷은 다음 동일 스냅샷의 참조 기준이 되지 않음
+        """
+        collector = BusDataCollector(route_id='1', client=mock.Mock())
+        data = make_day_data()[0]
+
+        with mock.patch.object(BusData.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            first = collector.queue_snapshot(data)
+        self.assertTrue(first.failed)
+        self.assertIsNone(first.collection_id)
+        self.assertIsNone(first.collection.same_as_id)
+
+        second = collector.queue_snapshot(data)
+        self.assertFalse(second.failed)
+        self.assertIsNone(second.collection.same_as_id)
+        self.assertEqual(second.collection.buses.count(), len(data['buses']))
+
+        third = collector.queue_snapshot(data)
+        self.assertEqual(third.collection.same_as_id, second.collection_id)
+        self.assertEqual(load_buses([third.collection])[third.collection_id],
+                         load_buses([second.collection])[second.collection_id])
+
+
+class TripRefreshTests(CollectionTestCase):
+    def setUp(self):
+        super().setUp()
+        # 배차 재구성은 운영 DB를 별도 연결로 읽으므로 테스트 DB를 가리키게 함
+        patcher = mock.patch('bus_info.trips.get_live_db_uri', return_value=connection.settings_dict['NAME'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fresh_days(self):
+        cursor = self.raw_cursor()
+        return get_fresh_days(cursor, get_day_fingerprints(cursor, 'c.collection_date = ?', ('2025-11-03',)))
+
+    def expected_trips(self):
+        # 원본 수집 건에서 직접 재구성한 결과 (저장된 결과와 같은 형식)
+        trips = reconstruct_days(self.raw_cursor(), ['2025-11-03'])['2025-11-03']
+        return [(trip_key, count_zero_stations(passengers), passengers)
+                for trip_key, _, passengers in trips]
+
+    def test_stored_trips_follow_new_collections(self):
+        """
+        저장된 배차 결과는 수집 건이 추가되면 오래된 것으로 보고 재구성하며, 갱신 후 다시 사용
+        """
+        self.ingest(DEFAULT_ROUTE_ID, make_day_data('2025-11-03', minutes=50))
+        self.assertEqual(self.fresh_days(), [])
+
+        built = refresh_trips()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(self.fresh_days(), ['2025-11-03'])
+        self.assertEqual(refresh_trips(), [])
+        expected = self.expected_trips()
+        self.assertTrue(expected)
+        self.assertEqual(get_day_trips(self.raw_cursor(), 'c.collection_date = ?', ('2025-11-03',))['2025-11-03'],
+                         expected)
+
+        # 같은 날짜에 수집 건이 추가되면 저장된 결과 대신 원본에서 재구성
+        self.ingest(DEFAULT_ROUTE_ID, make_day_data('2025-11-03', minutes=3))
+        self.assertEqual(self.fresh_days(), [])
+        expected = self.expected_trips()
+        self.assertEqual(get_day_trips(self.raw_cursor(), 'c.collection_date = ?', ('2025-11-03',))['2025-11-03'],
+                         expected)
+
+        self.assertEqual(len(refresh_trips()), 1)
+        self.assertEqual(self.fresh_days(), ['2025-11-03'])
+        day = TripDay.objects.get(route_id=DEFAULT_ROUTE_ID)
+        collections = BusCollection.objects.filter(route_id=DEFAULT_ROUTE_ID)
+        self.assertEqual((day.collection_count, day.last_collection_id),
+                         (collections.count(), collections.order_by('-id').first().id))
+        self.assertEqual(day.trip_count, len(expected))
+
+        # force면 최신이어도 다시 만듦
+        self.assertEqual(refresh_trips(), [])
+        self.assertEqual(len(refresh_trips(force=True)), 1)
+
+
+class DeleteCollectionsTests(CollectionTestCase):
+    def test_deletes_only_route_and_range_with_trips(self):
+        """
+        노선/기간 삭제는 해당 노선의 기간 안 수집 건, 버스 데이터, 배차 결과만 지움
+        """
+        for day in ('2025-11-03', '2025-11-04', '2025-11-05'):
+            self.ingest('R', make_day_data(day, minutes=30))
+        self.ingest('X', make_day_data('2025-11-04', minutes=30))
+        with mock.patch('bus_info.trips.get_live_db_uri', return_value=connection.settings_dict['NAME']):
+            refresh_trips()
+        self.assertTrue(Trip.objects.filter(route_id='R', service_date='2025-11-04').exists())
+
+        def counts(**filters):
+            return (BusCollection.objects.filter(**filters).count(),
+                    BusData.objects.filter(**{f'collection__{key}': value for key, value in filters.items()}).count())
+
+        kept = {
+            (route_id, day): (counts(route_id=route_id, collection_date=day),
+                              list(Trip.objects.filter(route_id=route_id, service_date=day).values_list('id', flat=True)))
+            for route_id, day in (('R', '2025-11-03'), ('R', '2025-11-05'), ('X', '2025-11-04'))
+        }
+        deleted = counts(route_id='R', collection_date='2025-11-04')
+        deleted_trips = list(Trip.objects.filter(route_id='R', service_date='2025-11-04').values_list('id', flat=True))
+
+        self.assertEqual(snapshots.delete_collections('R', date(2025, 11, 4), date(2025, 11, 4)), deleted)
+
+        self.assertEqual(counts(route_id='R', collection_date='2025-11-04'), (0, 0))
+        self.assertFalse(Trip.objects.filter(id__in=deleted_trips).exists())
+        self.assertFalse(TripStationLoad.objects.filter(trip_id__in=deleted_trips).exists())
+        self.assertFalse(TripDay.objects.filter(route_id='R', service_date='2025-11-04').exists())
+        for (route_id, day), (day_counts, trip_ids) in kept.items():
+            self.assertEqual(counts(route_id=route_id, collection_date=day), day_counts)
+            self.assertEqual(list(Trip.objects.filter(route_id=route_id, service_date=day)
+                                  .values_list('id', flat=True)), trip_ids)
+            self.assertEqual(TripStationLoad.objects.filter(trip_id__in=trip_ids).count(),
+                             TripStationLoad.objects.filter(trip__route_id=route_id, trip__service_date=day).count())
+            self.assertTrue(TripDay.objects.filter(route_id=route_id, service_date=day).exists())
+
+        # 시작 날짜만 주면 그 이후 전체 (다른 노선 포함)
+        snapshots.delete_collections(start_date=date(2025, 11, 4))
+        self.assertEqual(set(BusCollection.objects.values_list('collection_date', flat=True)), {date(2025, 11, 3)})
+        self.assertEqual(sorted(TripDay.objects.values_list('route_id', 'service_date')),
+                         [('R', date(2025, 11, 3))])
+
+        with self.assertRaises(ValueError):
+            snapshots.delete_collections()
+
+
+class VehicleMigrationTests(TransactionTestCase):
+    before = [('bus_info', '0003_vehicle_packed_buses')]
+    after = [('bus_info', '0004_busdata_vehicle_station_seq_int')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes('bus_info'))
+
+    def test_plate_numbers_round_trip(self):
+        """
+        0004는 차량 번호를 Vehicle로 옮기고 숫자가 아닌 정류소 순번을 NULL로, 역방향은 원래 값으로 복원
+        """
+        apps = self.migrate(self.before)
+        BusCollection = apps.get_model('bus_info', 'BusCollection')
+        BusData = apps.get_model('bus_info', 'BusData')
+        collection = BusCollection.objects.create(
+            route_id='R', query_time='2025-11-03T07:00:00Z', collection_date='2025-11-03'
+        )
+        rows = [('경기70아1001', 10, '3'), ('경기70아1002', 20, 'N/A'), ('경기70아1001', 15, '12')]
+        for plate_no, remain_seat_cnt, station_seq in rows:
+            BusData.objects.create(collection=collection, plate_no=plate_no,
+                                   remain_seat_cnt=remain_seat_cnt, station_seq=station_seq)
+
+        apps = self.migrate(self.after)
+        Vehicle = apps.get_model('bus_info', 'Vehicle')
+        BusData = apps.get_model('bus_info', 'BusData')
+        self.assertEqual(sorted(Vehicle.objects.values_list('plate_no', flat=True)), ['경기70아1001', '경기70아1002'])
+        self.assertEqual(
+            list(BusData.objects.order_by('id').values_list('vehicle__plate_no', 'remain_seat_cnt', 'station_seq')),
+            [('경기70아1001', 10, 3), ('경기70아1002', 20, None), ('경기70아1001', 15, 12)]
+        )
+
+        apps = self.migrate(self.before)
+        BusData = apps.get_model('bus_info', 'BusData')
+        self.assertEqual(
+            list(BusData.objects.order_by('id').values_list('plate_no', 'remain_seat_cnt', 'station_seq')),
+            rows
+        )
+
+
+class ArchiveTestCase(CollectionTestCase):
+    def setUp(self):
+        super().setUp()
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.archive_dir = archive_dir.name
+
+
+class ExportTests(ArchiveTestCase):
+    def test_since_cursor_across_archived_and_hot_days(self):
+        """
+        보관된 날짜와 본 DB 날짜를 ID 순으로 이어서 내보내고, since 커서 이후 수집 건만 다시 내보냄
+        """
+        self.ingest('R', make_day_data('2025-11-03', minutes=10))
+        self.ingest('R', make_day_data('2025-11-04', minutes=10))
+        self.ingest('X', make_day_data('2025-11-04', minutes=5))
+        archived_ids = list(BusCollection.objects.filter(route_id='R', collection_date='2025-11-03')
+                            .order_by('id').values_list('id', flat=True))
+        archive_day('R', date(2025, 11, 3))
+        self.assertFalse(BusCollection.objects.filter(id__in=archived_ids).exists())
+
+        export = ExportQuery('R')
+        exported = [collection.id for collection, _ in export.iter_collections()]
+        hot_ids = list(BusCollection.objects.filter(route_id='R').order_by('id').values_list('id', flat=True))
+        self.assertEqual(exported, archived_ids + hot_ids)
+        cursor = export.get_next_cursor()
+        self.assertEqual(cursor, hot_ids[-1])
+
+        # 보관된 날짜 중간부터
+        since = archived_ids[4]
+        self.assertEqual([c.id for c, _ in ExportQuery('R', since=since).iter_collections()],
+                         archived_ids[5:] + hot_ids)
+
+        # 다음 내보내기는 커서 이후 새 수집 건만
+        self.assertEqual(list(ExportQuery('R', since=cursor).iter_collections()), [])
+        self.assertEqual(ExportQuery('R', since=cursor).get_next_cursor(), cursor)
+        self.ingest('R', make_day_data('2025-11-04', minutes=3))
+        new_ids = list(BusCollection.objects.filter(route_id='R', id__gt=cursor).order_by('id')
+                       .values_list('id', flat=True))
+        self.assertEqual(len(new_ids), 3)
+        self.assertEqual([c.id for c, _ in ExportQuery('R', since=cursor).iter_collections()], new_ids)
+
+    def test_sqlite_export_does_not_write_hot_db(self):
+        """
+        SQLite 내보내기는 본 DB에 차량을 만들지 않고, 내보낸 파일은 원본과 같은 버스 행으로 읽힘
+        """
+        self.ingest('R', make_day_data('2025-11-03', minutes=10))
+        vehicle_count = Vehicle.objects.count()
+        path = os.path.join(self.archive_dir, 'export.sqlite3')
+
+        snapshots._vehicle_ids.clear()
+        with mock.patch.object(Vehicle.objects, 'bulk_create') as bulk_create:
+            write_sqlite(ExportQuery('R'), path)
+        bulk_create.assert_not_called()
+        self.assertEqual(Vehicle.objects.count(), vehicle_count)
+
+        exported = sqlite3.connect(path)
+        self.addCleanup(exported.close)
+        expected = [row[1:] for row in iter_snapshot_rows(self.raw_cursor(), 'c.collection_date = ?', ('2025-11-03',), 'R')]
+        rows = [row[1:] for row in iter_snapshot_rows(exported.cursor(), 'c.collection_date = ?', ('2025-11-03',), 'R')]
+        self.assertEqual(rows, expected)
+
+
+class LiveAnalysisArchiveTests(ArchiveTestCase):
+    def get(self, path, **params):
+        # 테스트 DB(메모리 공유 캐시)를 운영 DB로 사용
+        with mock.patch('bus_info.views_analysis.get_live_db_uri', return_value=connection.settings_dict['NAME']):
+            return self.client.get(path, dict(params, source='live'))
+
+    def test_archived_day_is_reported_not_empty(self):
+        """
+        운영 DB 분석에서 보관된 날짜는 빈 성공 결과가 아니라 보관됨 오류로 응답
+        """
+        self.ingest(DEFAULT_ROUTE_ID, make_day_data('2025-11-03', minutes=10))
+        self.ingest(DEFAULT_ROUTE_ID, make_day_data('2025-11-04', minutes=10))
+        archive_day(DEFAULT_ROUTE_ID, date(2025, 11, 3))
+
+        response = self.get('/api/analysis/data/', date='2025-11-03')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['archived_dates'], ['2025-11-03'])
+
+        for path in ('/api/analysis/average/', '/api/analysis/average/all/'):
+            response = self.get(path, start_date='2025-11-01', end_date='2025-11-30')
+            self.assertEqual(response.status_code, 409)
+            self.assertTrue(response.json()['archived'])
+
+        # 본 DB에 남은 날짜만 포함하면 그대로 분석
+        response = self.get('/api/analysis/data/', date='2025-11-04')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+
+
+class SnapshotWriterTests(SimpleTestCase):
+    def make_snapshot(self, route_id):
+        return PendingSnapshot(BusCollection(route_id=route_id), [])
+
+    def fake_write(self, bad):
+        ids = iter(range(1, 100))
+
+        def write(batch):
+            if any(snapshot in bad for snapshot in batch):
+                raise OperationalError('database is locked')
+            for snapshot in batch:
+                snapshot.collection.pk = next(ids)
+        return write
+
+    def test_final_attempt_drops_only_failing_snapshot(self):
+        """
+        배치 저장이 재시도 한도까지 실패하면 한 건씩 저장하여 실패한 스냅샷만 버림
+        """
+        writer = SnapshotWriter(max_attempts=2)
+        good, bad, other = self.make_snapshot('1'), self.make_snapshot('2'), self.make_snapshot('3')
+
+        with mock.patch('bus_info.writer.write_snapshots', side_effect=self.fake_write({bad})):
+            retry = writer._flush_batch([good, bad, other])
+            self.assertEqual(retry, [good, bad, other])
+            self.assertEqual(writer._flush_batch(retry), [])
+
+        self.assertFalse(good.failed)
+        self.assertFalse(other.failed)
+        self.assertTrue(bad.failed)
+        self.assertIsNotNone(good.collection_id)
+        self.assertEqual(writer.get_stats()['dropped_snapshots'], 1)
+
+    def test_drain_backs_off_between_retries(self):
+        writer = SnapshotWriter(max_attempts=3, retry_delay=0.1)
+        snapshot = self.make_snapshot('1')
+
+        with mock.patch('bus_info.writer.write_snapshots', side_effect=self.fake_write({snapshot})), \
+                mock.patch('bus_info.writer.time.sleep') as sleep:
+            writer._drain([snapshot])
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.1, 0.2])
+        self.assertTrue(snapshot.failed)
+
+
+class CollectorManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.manager = CollectorManager(max_workers=2, client=mock.Mock())
+
+    def tearDown(self):
+        self.manager.stop()
+        self.manager.scheduler.stop()
+        if self.manager._executor:
+            self.manager._executor.shutdown(wait=True)
+
+    def test_restart_while_collecting_reschedules(self):
+        """
+        수집 중에 중지 후 다시 시작해도 수집이 끝나면 다음 수집이 예약됨
+        """
+        collector = self.manager.register_route('1', interval_seconds=60)
+        started = threading.Event()
+        release = threading.Event()
+
+        def collect_and_save(wait=False):
+            started.set()
+            release.wait(5)
+
+        collector.collect_and_save = collect_and_save
+
+        self.manager.start('1')
+        self.assertTrue(started.wait(5))
+        self.manager.stop('1')
+        self.manager.start('1')
+        release.set()
+
+        def is_finished():
+            with self.manager._lock:
+                return '1' not in self.manager._in_flight
+
+        self.assertTrue(wait_until(is_finished))
+        self.assertTrue(collector.is_running)
+        due_time = self.manager.scheduler.get_due_time('1')
+        self.assertIsNotNone(due_time)
+        self.assertAlmostEqual(due_time, time.time() + 60, delta=5)
+        self.assertEqual(collector.next_collection_time, due_time)
+
+    def test_jobs_run_without_route_collection(self):
+        """
+        유지보수 작업은 노선 수집을 시작하지 않아도 주기적으로 실행됨
+        """
+        ran = threading.Event()
+        self.manager.add_job('test_job', 0.05, ran.set)
+
+        self.assertTrue(ran.wait(5))
+        self.assertFalse(self.manager.is_running())
+        self.assertTrue(wait_until(lambda: self.manager._jobs['test_job']['runs'] >= 1))
+
+    def test_collect_once_refuses_while_collecting(self):
+        """
+        자동 수집이 진행 중인 노선은 수동 수집하지 않음
+        """
+        collector = self.manager.register_route('1', interval_seconds=60)
+        started = threading.Event()
+        release = threading.Event()
+
+        def collect_and_save(wait=False):
+            started.set()
+            release.wait(5)
+
+        collector.collect_and_save = collect_and_save
+
+        self.manager.start('1')
+        self.assertTrue(started.wait(5))
+        with self.assertRaises(CollectionInProgress):
+            self.manager.collect_once('1')
+        release.set()
+
+        self.assertTrue(wait_until(lambda: self.manager.scheduler.get_due_time('1') is not None))
+        self.assertEqual(collector.total_collections, 1)
+
+    def test_collect_once_view_returns_conflict(self):
+        with mock.patch('bus_info.views.collector_manager') as manager:
+            manager.collect_once.side_effect = CollectionInProgress('이미 수집이 진행 중입니다.')
+            response = self.client.post('/api/collection/once/', {'route_id': '1'})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['success'])
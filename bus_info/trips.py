@@ -0,0 +1,520 @@
+"""
+배차 재구성 및 정류장별 승객 수 보정
+
+수집 건(버스 위치/잔여 좌석)을 차량별로 이어 배차로 나누고, 정류장별 승객 수를 계산한 뒤
+결측 정류장을 (경유) 정류장 규칙과 평균 보간으로 채운다. 결과는 Trip / TripStationLoad 테이블에
+날짜 단위로 저장해 두고, 분석 API는 원본 수집 건이 바뀌지 않은 날짜에 한해 저장된 결과를 읽는다.
+"""
+import heapq
+import sqlite3
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .busstop import BUS_STOPS_8201
+from .config import ANALYSIS_ENGINE, DEFAULT_ROUTE_ID
+from .snapshots import QUERY_CHUNK_SIZE, iter_snapshot_rows
+
+
+BUS_CAPACITY = 45
+MIDPOINT_STATION_1 = 26  # 종점 (승객 0명으로 처리)
+MIDPOINT_STATION_2 = 51  # 회차
+MAX_TRIPS_WEEKDAY = 20
+MAX_TRIPS_WEEKEND = 16
+# 정류소 순번이 직전보다 이만큼 넘게 줄어들면 새 배차로 판단
+TRIP_BREAK_STATIONS = 20
+# 승객 0명 정류장이 이 수 이상인 배차는 평균 분석에서 제외
+ZERO_STATION_LIMIT = 10
+
+STATION_COUNT = len(BUS_STOPS_8201)
+IS_BYPASS = [("(경유)" in name) for name in BUS_STOPS_8201]
+
+
+def get_live_db_uri():
+    """
+    운영 DB 읽기 전용 연결 URI (분석 중에도 수집 쓰기를 막지 않음)
+    """
+    return f"file:{settings.DATABASES['default']['NAME']}?mode=ro"
+
+
+def get_upload_uri(db_path):
+    """
+    업로드 파일 읽기 전용 연결 URI
+    ANALYSIS_UPLOAD_IMMUTABLE이면 immutable=1로 열어 잠금과 변경 확인을 생략 (업로드 파일은 분석 중 바뀌지 않음)
+    """
+    if getattr(settings, 'ANALYSIS_UPLOAD_IMMUTABLE', True):
+        return f"file:{db_path}?mode=ro&immutable=1"
+    return f"file:{db_path}?mode=ro"
+
+
+def connect_analysis_db(db_path):
+    """
+    분석 대상 DB 연결 (운영 DB URI는 그대로, 업로드 파일 경로는 읽기 전용으로 연결)
+    """
+    if not db_path.startswith('file:'):
+        db_path = get_upload_uri(db_path)
+    return sqlite3.connect(db_path, uri=True)
+
+
+def get_max_trips(date_str):
+    """
+    날짜의 (주말 여부, 최대 배차 수)
+    """
+    is_weekend = datetime.strptime(date_str, '%Y-%m-%d').weekday() >= 5  # 5=토요일, 6=일요일
+    return is_weekend, (MAX_TRIPS_WEEKEND if is_weekend else MAX_TRIPS_WEEKDAY)
+
+
+def get_engine():
+    """
+    사용할 계산 엔진 ('numpy' 설정이어도 numpy가 없으면 'python')
+    """
+    if ANALYSIS_ENGINE == 'numpy':
+        from . import trips_numpy
+        if trips_numpy.np is not None:
+            return 'numpy'
+    return 'python'
+
+
+def collect_observations(time_data):
+    """
+    한 배차의 {쿼리 시간: {정류소 순번: 잔여 좌석}}을 정류장별 승객 수로 변환 (정류장마다 마지막 관측값)
+    """
+    result = {}
+
+    for current_time in sorted(time_data.keys()):
+        stations_in_time = time_data[current_time]
+        for station_idx in sorted(stations_in_time.keys()):
+            remain_seat = stations_in_time[station_idx]
+
+            if remain_seat == -1:
+                continue
+
+            if station_idx == MIDPOINT_STATION_1:
+                current_passengers = 0
+            else:
+                current_passengers = BUS_CAPACITY - remain_seat
+                if current_passengers < 0:
+                    current_passengers = 0
+
+            result[station_idx] = current_passengers
+
+    if MIDPOINT_STATION_1 not in result:
+        result[MIDPOINT_STATION_1] = 0
+    if MIDPOINT_STATION_2 not in result:
+        result[MIDPOINT_STATION_2] = 0
+    return result
+
+
+def fill_missing_stations(result):
+    """
+    관측값 {정류소 순번: 승객 수}의 결측 정류장을 (경유) 정류장 규칙과 평균 보간으로 채움 (제자리 수정)
+    """
+    for station_idx in range(STATION_COUNT):
+        if station_idx == MIDPOINT_STATION_1:
+            continue
+
+        # 다음 정류장이 (경유)인지 확인하고 대체 (결측치 여부와 관계없이)
+        next_value = None
+        for next_idx in range(station_idx + 1, STATION_COUNT):
+            if not IS_BYPASS[next_idx]:
+                break
+            if next_idx in result:
+                next_value = result[next_idx]
+                break
+
+        if next_value is not None:
+            result[station_idx] = next_value
+            continue
+
+        if station_idx in result:
+            continue
+
+        # 1. 현재와 이전이 모두 (경유)
+        filled = False
+        if station_idx > 0:
+            for prev_idx in range(station_idx - 1, -1, -1):
+                if prev_idx in result:
+                    if IS_BYPASS[station_idx] and IS_BYPASS[prev_idx]:
+                        result[station_idx] = result[prev_idx]
+                        filled = True
+                    break
+
+        # 2. 평균 보간
+        if not filled:
+            prev_value = None
+            next_value = None
+
+            for prev_idx in range(station_idx - 1, -1, -1):
+                if prev_idx in result:
+                    prev_value = result[prev_idx]
+                    break
+
+            for next_idx in range(station_idx + 1, STATION_COUNT):
+                if next_idx in result:
+                    next_value = result[next_idx]
+                    break
+
+            if prev_value is not None and next_value is not None:
+                result[station_idx] = round((prev_value + next_value) / 2)
+
+    return result
+
+
+def impute_many(observations):
+    """
+    여러 배차의 관측값 목록을 한 번에 보정 (설정된 엔진 사용)
+    """
+    if get_engine() == 'numpy':
+        from .trips_numpy import impute_many as impute_many_numpy
+        return impute_many_numpy(observations)
+    return [fill_missing_stations(dict(observed)) for observed in observations]
+
+
+def split_trips(rows):
+    """
+    하루치 행 [(쿼리 시간, 차량 번호, 정류소 순번, 잔여 좌석), ...]을 차량별 배차로 분리
+
+    반환값: {배차 키: {쿼리 시간: {정류소 순번: 잔여 좌석}}}
+    """
+    bus_trips = {}
+    bus_last_station = {}
+    bus_trip_counter = {}
+
+    for query_time, plate_no, station_seq, remain_seat in rows:
+        if not plate_no or not station_seq:
+            continue
+
+        try:
+            station_idx = int(station_seq)
+            if not (0 <= station_idx < STATION_COUNT):
+                continue
+        except (ValueError, TypeError):
+            continue
+
+        # 배차 구분 로직
+        if plate_no not in bus_trip_counter:
+            bus_trip_counter[plate_no] = 1
+        elif station_idx < bus_last_station[plate_no] - TRIP_BREAK_STATIONS:
+            bus_trip_counter[plate_no] += 1
+        bus_last_station[plate_no] = station_idx
+
+        trip_key = f"{plate_no}_{bus_trip_counter[plate_no]}"
+        bus_trips.setdefault(trip_key, {}).setdefault(query_time, {})[station_idx] = remain_seat
+
+    return bus_trips
+
+
+def reconstruct_trips(rows, date_str):
+    """
+    하루치 행 [(쿼리 시간, 차량 번호, 정류소 순번, 잔여 좌석), ...]으로 배차 재구성
+
+    반환값: 출발 순 상위 배차 [(배차 키, 출발 시간, {정류소 순번: 승객 수}), ...]
+    """
+    bus_trips = split_trips(rows)
+
+    # 출발 시간 순서대로 정렬 후 배차 수 제한
+    _, max_trips = get_max_trips(date_str)
+    trip_start_times = {trip_key: min(time_data) for trip_key, time_data in bus_trips.items() if time_data}
+    sorted_trip_keys = sorted(trip_start_times.keys(), key=lambda x: trip_start_times[x])[:max_trips]
+
+    passengers = impute_many([collect_observations(bus_trips[trip_key]) for trip_key in sorted_trip_keys])
+    return [
+        (trip_key, trip_start_times[trip_key], trip_passengers)
+        for trip_key, trip_passengers in zip(sorted_trip_keys, passengers)
+    ]
+
+
+def count_zero_stations(passengers):
+    return sum(1 for value in passengers.values() if value == 0)
+
+
+def compute_changes(passengers, digits=None):
+    """
+    정류장별 승객 변화량 (26번까지는 승차: 현재 - 이전 / 이후는 하차: 이전 - 현재)
+    """
+    changes = {}
+    prev_passengers = None
+    for station_idx in range(STATION_COUNT):
+        if station_idx not in passengers:
+            continue
+
+        current_passengers = passengers[station_idx]
+        if prev_passengers is not None:
+            if station_idx <= MIDPOINT_STATION_1:
+                change = current_passengers - prev_passengers
+            else:
+                change = prev_passengers - current_passengers
+            changes[station_idx] = round(change, digits) if digits is not None else change
+        prev_passengers = current_passengers
+    return changes
+
+
+def get_day_fingerprints(cursor, date_condition, params, route_id=DEFAULT_ROUTE_ID):
+    """
+    날짜별 성공 수집 건 (건수, 마지막 ID) - 저장된 배차 결과가 최신인지 확인하는 기준
+    """
+    cursor.execute(f"""
+        SELECT c.collection_date, COUNT(*), MAX(c.id)
+        FROM bus_info_buscollection c
+        WHERE {date_condition}
+        AND c.route_id = ?
+        AND NOT c.is_error
+        AND NOT c.is_skipped
+        GROUP BY c.collection_date
+        ORDER BY c.collection_date
+    """, tuple(params) + (route_id,))
+    return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+
+def get_weekday_condition(weekday_filter=None, is_weekend_only=None, column='c.collection_date'):
+    """
+    요일 / 평일·주말 조건 SQL과 파라미터 (weekday_filter: 0=월요일 ... 6=일요일)
+    SQLite strftime('%w')는 0=일요일 ... 6=토요일
+    """
+    if weekday_filter is not None:
+        return f"strftime('%w', {column}) = ?", (str((weekday_filter + 1) % 7),)
+    if is_weekend_only is True:
+        return f"strftime('%w', {column}) IN ('0', '6')", ()
+    if is_weekend_only is False:
+        return f"strftime('%w', {column}) NOT IN ('0', '6')", ()
+    return None, ()
+
+
+def iter_date_chunks(dates):
+    """
+    날짜 목록을 IN 절 변수 개수 제한(QUERY_CHUNK_SIZE) 이하로 나누어 반환
+    """
+    for offset in range(0, len(dates), QUERY_CHUNK_SIZE):
+        yield dates[offset:offset + QUERY_CHUNK_SIZE]
+
+
+def get_fresh_days(cursor, fingerprints, route_id=DEFAULT_ROUTE_ID):
+    """
+    저장된 배차 결과가 원본 수집 건과 일치하는 날짜 목록 (테이블이 없는 DB는 빈 목록)
+    """
+    if not fingerprints:
+        return []
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bus_info_tripday'")
+    if not cursor.fetchone():
+        return []
+
+    # 날짜 목록 대신 범위로 조회 (긴 기간도 SQLite 변수 개수 제한에 걸리지 않음)
+    cursor.execute("""
+        SELECT service_date, collection_count, last_collection_id
+        FROM bus_info_tripday
+        WHERE route_id = ? AND service_date BETWEEN ? AND ?
+    """, (route_id, min(fingerprints), max(fingerprints)))
+    return sorted(
+        service_date for service_date, count, last_id in cursor.fetchall()
+        if fingerprints.get(service_date) == (count, last_id)
+    )
+
+
+def iter_stored_trips(cursor, dates, route_id=DEFAULT_ROUTE_ID):
+    """
+    저장된 배차 결과를 날짜 순으로 하루씩 반환하는 제너레이터
+
+    반환값: (날짜, [(배차 키, 승객 0명 정류장 수, {정류소 순번: 승객 수}), ...]) (출발 순)
+    """
+    # IN 절 변수 개수 제한 대비 날짜를 나누어 조회 (날짜 순서 유지)
+    for chunk in iter_date_chunks(dates):
+        placeholders = ','.join(['?'] * len(chunk))
+        cursor.execute(f"""
+            SELECT t.service_date, t.trip_order, t.trip_key, t.zero_count, l.station_idx, l.passengers
+            FROM bus_info_trip t
+            LEFT JOIN bus_info_tripstationload l ON l.trip_id = t.id
+            WHERE t.route_id = ? AND t.service_date IN ({placeholders})
+            ORDER BY t.service_date, t.trip_order, l.station_idx
+        """, (route_id, *chunk))
+
+        current_date = None
+        trips = []
+        current = None
+        for service_date, trip_order, trip_key, zero_count, station_idx, passengers in cursor:
+            if service_date != current_date:
+                if current_date is not None:
+                    yield current_date, trips
+                current_date = service_date
+                trips = []
+                current = None
+            if current is None or current[0] != trip_order:
+                current = (trip_order, (trip_key, zero_count, {}))
+                trips.append(current[1])
+            if station_idx is not None:
+                current[1][2][station_idx] = passengers
+
+        if current_date is not None:
+            yield current_date, trips
+
+
+def iter_reconstructed_days(cursor, dates, route_id=DEFAULT_ROUTE_ID):
+    """
+    원본 수집 건에서 날짜별 배차를 하루씩 재구성하는 제너레이터 (메모리에는 하루치 행만 유지)
+
+    반환값: (날짜, [(배차 키, 출발 시간, {정류소 순번: 승객 수}), ...]) (날짜 순)
+    """
+    for chunk in iter_date_chunks(dates):
+        placeholders = ','.join(['?'] * len(chunk))
+        rows = iter_snapshot_rows(cursor, f"c.collection_date IN ({placeholders})", tuple(chunk), route_id)
+
+        current_date = None
+        day_rows = []
+        for collection_id, query_time, collection_date, plate_no, station_seq, remain_seat in rows:
+            if collection_date != current_date:
+                if current_date is not None:
+                    yield current_date, reconstruct_trips(day_rows, current_date)
+                current_date = collection_date
+                day_rows = []
+            day_rows.append((query_time, plate_no, station_seq, remain_seat))
+
+        if current_date is not None:
+            yield current_date, reconstruct_trips(day_rows, current_date)
+
+
+def reconstruct_days(cursor, dates, route_id=DEFAULT_ROUTE_ID):
+    """
+    원본 수집 건에서 날짜별 배차를 직접 재구성
+
+    반환값: {날짜: [(배차 키, 출발 시간, {정류소 순번: 승객 수}), ...]}
+    """
+    day_trips = dict(iter_reconstructed_days(cursor, dates, route_id))
+    return {date_str: day_trips.get(date_str, []) for date_str in dates}
+
+
+def iter_day_trips(cursor, date_condition, params, route_id=DEFAULT_ROUTE_ID):
+    """
+    조건에 맞는 날짜별 배차를 날짜 순으로 하루씩 반환하는 제너레이터
+    (저장된 결과 우선, 없거나 오래되었으면 원본에서 재구성)
+
+    반환값: (날짜, [(배차 키, 승객 0명 정류장 수, {정류소 순번: 승객 수}), ...])
+    """
+    fingerprints = get_day_fingerprints(cursor, date_condition, params, route_id)
+    fresh = get_fresh_days(cursor, fingerprints, route_id)
+    fresh_dates = set(fresh)
+    stale = [date_str for date_str in fingerprints if date_str not in fresh_dates]
+
+    # 저장된 결과와 재구성 결과를 각자의 커서로 읽으며 날짜 순으로 병합
+    connection = cursor.connection
+    stored = iter_stored_trips(connection.cursor(), fresh, route_id)
+    rebuilt = (
+        (date_str, [(trip_key, count_zero_stations(passengers), passengers) for trip_key, _, passengers in trips])
+        for date_str, trips in iter_reconstructed_days(connection.cursor(), stale, route_id)
+    )
+    yield from heapq.merge(stored, rebuilt, key=lambda item: item[0])
+
+
+def get_day_trips(cursor, date_condition, params, route_id=DEFAULT_ROUTE_ID):
+    """
+    조건에 맞는 날짜별 배차 (저장된 결과 우선, 없거나 오래되었으면 원본에서 재구성)
+
+    반환값: {날짜: [(배차 키, 승객 0명 정류장 수, {정류소 순번: 승객 수}), ...]} (날짜 순)
+    """
+    return dict(iter_day_trips(cursor, date_condition, params, route_id))
+
+
+def parse_start_time(query_time):
+    value = parse_datetime(str(query_time)) if query_time else None
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def build_trip_day(route_id, service_date):
+    """
+    운영 DB의 하루치 수집 건으로 배차를 재구성하여 Trip / TripStationLoad에 저장
+    """
+    from django.db import transaction
+    from .models import Trip, TripDay, TripStationLoad
+
+    date_str = service_date.strftime('%Y-%m-%d')
+    conn = connect_analysis_db(get_live_db_uri())
+    try:
+        cursor = conn.cursor()
+        # 기준값과 원본 행을 같은 읽기 트랜잭션에서 조회
+        cursor.execute("BEGIN")
+        fingerprint = get_day_fingerprints(cursor, "c.collection_date = ?", (date_str,), route_id).get(date_str)
+        trips = reconstruct_days(cursor, [date_str], route_id)[date_str] if fingerprint else []
+        cursor.execute("COMMIT")
+    finally:
+        conn.close()
+
+    with transaction.atomic():
+        Trip.objects.filter(route_id=route_id, service_date=service_date).delete()
+        trip_objects = [
+            Trip(
+                route_id=route_id,
+                service_date=service_date,
+                trip_order=order,
+                trip_key=trip_key,
+                start_time=parse_start_time(start_time),
+                zero_count=count_zero_stations(passengers)
+            )
+            for order, (trip_key, start_time, passengers) in enumerate(trips)
+        ]
+        Trip.objects.bulk_create(trip_objects)
+        TripStationLoad.objects.bulk_create([
+            TripStationLoad(trip=trip, station_idx=station_idx, passengers=value)
+            for trip, (_, _, passengers) in zip(trip_objects, trips)
+            for station_idx, value in passengers.items()
+        ], batch_size=500)
+        TripDay.objects.update_or_create(
+            route_id=route_id,
+            service_date=service_date,
+            defaults={
+                'trip_count': len(trips),
+                'collection_count': fingerprint[0] if fingerprint else 0,
+                'last_collection_id': fingerprint[1] if fingerprint else None
+            }
+        )
+    return len(trips)
+
+
+def refresh_trips(route_id=None, start_date=None, end_date=None, force=False):
+    """
+    원본 수집 건이 바뀐 날짜(또는 아직 만들지 않은 날짜)의 배차 결과를 다시 만듦
+
+    반환값: [(노선 ID, 날짜, 배차 수), ...]
+    """
+    from django.db.models import Count, Max, Q
+    from .models import BusCollection, TripDay
+
+    days = BusCollection.objects.filter(is_error=False, is_skipped=False)
+    if route_id:
+        days = days.filter(route_id=route_id)
+    if start_date:
+        days = days.filter(collection_date__gte=start_date)
+    if end_date:
+        days = days.filter(collection_date__lte=end_date)
+    days = days.values('route_id', 'collection_date').annotate(
+        collection_count=Count('id'),
+        last_collection_id=Max('id')
+    ).order_by('collection_date', 'route_id')
+
+    built = {
+        (day.route_id, day.service_date): (day.collection_count, day.last_collection_id)
+        for day in TripDay.objects.filter(
+            Q(service_date__gte=start_date) if start_date else Q(),
+            Q(service_date__lte=end_date) if end_date else Q(),
+            **({'route_id': route_id} if route_id else {})
+        )
+    }
+
+    results = []
+    for day in days:
+        key = (day['route_id'], day['collection_date'])
+        if not force and built.get(key) == (day['collection_count'], day['last_collection_id']):
+            continue
+        trip_count = build_trip_day(day['route_id'], day['collection_date'])
+        results.append((day['route_id'], day['collection_date'], trip_count))
+    return results
+
+
+def run_scheduled_trip_refresh():
+    """
+    수집 관리자 주기 작업용 - 최근 날짜 중 바뀐 날짜의 배차 결과 갱신
+    """
+    start_date = timezone.localdate() - timedelta(days=getattr(settings, 'TRIP_REFRESH_DAYS', 2))
+    return refresh_trips(start_date=start_date)
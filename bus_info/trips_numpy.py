@@ -0,0 +1,129 @@
+"""
+numpy 배열 기반 결측치 보정 / 변화량 계산 엔진 (ANALYSIS_ENGINE=numpy)
+
+배차들을 (배차 수 x 정류장 수) 배열로 만들어 정류장 순서대로 한 열씩 처리한다.
+(경유) 여부는 미리 계산한 마스크를 쓰고, 다음 관측값과 (경유) 구간 값은 역방향 채우기로,
+이전 값은 순방향으로 이어 가며 계산하므로 배차마다 정류장을 앞뒤로 다시 찾지 않는다.
+결과는 trips.fill_missing_stations / compute_changes와 같다.
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 python 엔진 사용
+    np = None
+
+from .trips import IS_BYPASS, MIDPOINT_STATION_1, STATION_COUNT
+
+
+def to_matrix(passenger_list):
+    """
+    [{정류소 순번: 승객 수}, ...]를 (배차 수 x 정류장 수) 배열로 변환 (없는 정류장은 NaN)
+    """
+    rows = []
+    columns = []
+    values = []
+    for row, passengers in enumerate(passenger_list):
+        rows.extend([row] * len(passengers))
+        columns.extend(passengers.keys())
+        values.extend(passengers.values())
+
+    matrix = np.full((len(passenger_list), STATION_COUNT), np.nan)
+    matrix[rows, columns] = values
+    return matrix
+
+
+def from_matrix(matrix, cast=int):
+    """
+    배열을 [{정류소 순번: 값}, ...]으로 변환 (NaN 정류장 제외, 정류장 순)
+    """
+    stations = range(STATION_COUNT)
+    return [
+        {idx: cast(value) for idx, value in zip(stations, row) if value == value}
+        for row in matrix.tolist()
+    ]
+
+
+def fill_missing_matrix(observed):
+    """
+    관측값 배열의 결측 정류장 보정 (trips.fill_missing_stations와 같은 규칙)
+    """
+    trip_count = observed.shape[0]
+    present = ~np.isnan(observed)
+    empty = np.full(trip_count, np.nan)
+
+    # 정류장 바로 다음부터 이어지는 (경유) 구간에서 처음 관측된 값 / 이후 첫 관측값 (역방향 채우기)
+    bypass_next = np.full_like(observed, np.nan)
+    next_observed = np.full_like(observed, np.nan)
+    run = empty
+    following = empty
+    for station_idx in range(STATION_COUNT - 1, -1, -1):
+        bypass_next[:, station_idx] = run
+        next_observed[:, station_idx] = following
+        following = np.where(present[:, station_idx], observed[:, station_idx], following)
+        if IS_BYPASS[station_idx]:
+            run = np.where(present[:, station_idx], observed[:, station_idx], run)
+        else:
+            run = empty
+
+    # 정류장 순서대로 채우면서 직전 값(보정된 값 포함)과 그 정류장의 (경유) 여부를 이어 감
+    result = observed.copy()
+    prev_value = empty
+    prev_bypass = np.zeros(trip_count, dtype=bool)
+    for station_idx in range(STATION_COUNT):
+        column = result[:, station_idx]
+        if station_idx != MIDPOINT_STATION_1:
+            has_bypass = ~np.isnan(bypass_next[:, station_idx])
+            missing = np.isnan(column) & ~has_bypass
+
+            if IS_BYPASS[station_idx]:
+                copy_prev = missing & prev_bypass & ~np.isnan(prev_value)
+            else:
+                copy_prev = np.zeros(trip_count, dtype=bool)
+            midpoint = np.rint((prev_value + next_observed[:, station_idx]) / 2)
+
+            column = np.where(
+                has_bypass, bypass_next[:, station_idx],
+                np.where(~missing, column, np.where(copy_prev, prev_value, midpoint))
+            )
+            result[:, station_idx] = column
+
+        filled = ~np.isnan(column)
+        prev_value = np.where(filled, column, prev_value)
+        prev_bypass = np.where(filled, IS_BYPASS[station_idx], prev_bypass)
+
+    return result
+
+
+def changes_matrix(matrix):
+    """
+    정류장별 변화량 배열 (26번까지는 현재 - 이전, 이후는 이전 - 현재 / 직전 관측 정류장 기준)
+    """
+    present = ~np.isnan(matrix)
+    positions = np.where(present, np.arange(STATION_COUNT), -1)
+    last_positions = np.maximum.accumulate(positions, axis=1)
+
+    prev_positions = np.full_like(last_positions, -1)
+    prev_positions[:, 1:] = last_positions[:, :-1]
+    prev_values = np.take_along_axis(matrix, np.maximum(prev_positions, 0), axis=1)
+
+    boarding = np.arange(STATION_COUNT) <= MIDPOINT_STATION_1
+    changes = np.where(boarding, matrix - prev_values, prev_values - matrix)
+    return np.where(present & (prev_positions >= 0), changes, np.nan)
+
+
+def impute_many(observations):
+    """
+    여러 배차의 관측값 {정류소 순번: 승객 수} 목록을 한 번에 보정
+    """
+    if not observations:
+        return []
+    return from_matrix(fill_missing_matrix(to_matrix(observations)))
+
+
+def compute_changes_many(passenger_list, digits=None):
+    """
+    여러 배차의 변화량 목록 (digits가 있으면 python round로 반올림하여 python 엔진과 같은 값 유지)
+    """
+    if not passenger_list:
+        return []
+    cast = int if digits is None else (lambda value: round(value, digits))
+    return from_matrix(changes_matrix(to_matrix(passenger_list)), cast)
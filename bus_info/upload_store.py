@@ -0,0 +1,237 @@
+"""
+업로드된 분석 DB의 내용 주소 저장소 (원본 SHA-256 → 분석 준비가 끝난 파일)
+
+같은 파일을 여러 사용자가 올려도 저장소에는 하나만 남기고, 인덱스/일자별 수집 건수 같은 준비 결과와
+평균 분석 결과 캐시(같은 해시 지문)를 함께 재사용한다. 세션마다 refs/ 아래에 참조 파일을 두어
+여러 프로세스에서도 참조 수를 셀 수 있고, 참조가 없는 항목은 마지막 사용 시각 기준 TTL과
+저장소 전체 크기(UPLOAD_STORE_MAX_BYTES)에 따라 오래 사용하지 않은 것부터 삭제한다.
+"""
+import glob
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+
+from .result_cache import remember_file_hash
+
+
+DB_FILE = 'uploaded_db.sqlite3'
+META_FILE = 'meta.json'
+LAST_USED_FILE = 'last_used'
+REFS_DIR = 'refs'
+TEMP_PREFIX = '.tmp-'
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+_REF_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def get_store_dir():
+    return str(getattr(settings, 'UPLOAD_STORE_DIR', '') or
+               os.path.join(tempfile.gettempdir(), 'bus_info_upload_store'))
+
+
+def get_entry_dir(file_hash):
+    if not file_hash or not _HASH_PATTERN.match(file_hash):
+        return None
+    return os.path.join(get_store_dir(), file_hash)
+
+
+def get_entry(file_hash):
+    """
+    저장된 항목 {'sha256', 'db_path', 'summary'} (없으면 None)
+    """
+    entry_dir = get_entry_dir(file_hash)
+    if entry_dir is None:
+        return None
+    try:
+        with open(os.path.join(entry_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    db_path = os.path.join(entry_dir, DB_FILE)
+    if not os.path.exists(db_path):
+        return None
+    return {'sha256': file_hash, 'db_path': db_path, 'summary': meta['summary']}
+
+
+def get_entry_hash(db_path):
+    """
+    저장소 안의 파일이면 원본 해시, 아니면 None
+    """
+    entry_dir = os.path.dirname(os.path.abspath(db_path))
+    if os.path.dirname(entry_dir) != os.path.abspath(get_store_dir()):
+        return None
+    file_hash = os.path.basename(entry_dir)
+    return file_hash if _HASH_PATTERN.match(file_hash) else None
+
+
+def create_temp_dir():
+    """
+    저장소에 넣기 전 파일을 준비할 임시 디렉터리 (같은 파일 시스템이라 이동이 이름 변경으로 끝남)
+    """
+    os.makedirs(get_store_dir(), exist_ok=True)
+    return tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=get_store_dir())
+
+
+def add_entry(file_hash, source_dir, summary):
+    """
+    source_dir(분석 준비가 끝난 DB_FILE과 부속 파일)를 해시 항목으로 등록 후 항목 반환
+
+    같은 해시가 이미 있으면(동시에 올린 같은 파일 포함) source_dir을 지우고 기존 항목을 반환한다.
+    """
+    existing = get_entry(file_hash)
+    if existing is None:
+        os.makedirs(os.path.join(source_dir, REFS_DIR), exist_ok=True)
+        with open(os.path.join(source_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'created_at': time.time()}, f, ensure_ascii=False)
+        _touch(os.path.join(source_dir, LAST_USED_FILE))
+        try:
+            # 완성된 디렉터리만 해시 이름으로 노출
+            os.rename(source_dir, get_entry_dir(file_hash))
+            return get_entry(file_hash)
+        except OSError:
+            existing = get_entry(file_hash)
+            if existing is None:
+                raise
+
+    shutil.rmtree(source_dir, ignore_errors=True)
+    return existing
+
+
+def new_reference_id():
+    return uuid.uuid4().hex
+
+
+def add_reference(db_path, ref_id):
+    """
+    세션(ref_id)의 참조 등록 겸 마지막 사용 시각 갱신 후 원본 해시 반환 (저장소 파일이 아니면 None)
+
+    평균 분석 결과 캐시 지문 계산 시 파일을 다시 읽지 않도록 원본 해시도 등록한다.
+    """
+    file_hash = get_entry_hash(db_path)
+    if file_hash is None or not _REF_PATTERN.match(ref_id or ''):
+        return None
+    entry_dir = get_entry_dir(file_hash)
+    try:
+        _touch(os.path.join(entry_dir, REFS_DIR, ref_id))
+        _touch(os.path.join(entry_dir, LAST_USED_FILE))
+        remember_file_hash(db_path, file_hash)
+    except OSError:
+        return None
+    return file_hash
+
+
+def release_reference(db_path, ref_id):
+    file_hash = get_entry_hash(db_path)
+    if file_hash is None or not _REF_PATTERN.match(ref_id or ''):
+        return
+    try:
+        os.remove(os.path.join(get_entry_dir(file_hash), REFS_DIR, ref_id))
+    except OSError:
+        pass
+
+
+def _touch(path):
+    with open(path, 'a'):
+        pass
+    os.utime(path)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def get_ref_ttl():
+    # 세션 참조는 세션 만료 시간(기본값)이 지나도록 사용하지 않으면 만료
+    return getattr(settings, 'UPLOAD_REF_TTL', 0) or getattr(settings, 'SESSION_COOKIE_AGE', 14 * 24 * 60 * 60)
+
+
+def get_entries():
+    """
+    저장소 항목 목록 [{'sha256', 'size', 'last_used', 'refs'}, ...] (참조는 만료되지 않은 것만)
+    """
+    ref_ttl = get_ref_ttl()
+    now = time.time()
+    entries = []
+    for entry_dir in glob.glob(os.path.join(get_store_dir(), '*')):
+        file_hash = os.path.basename(entry_dir)
+        if not _HASH_PATTERN.match(file_hash):
+            continue
+        refs = 0
+        for ref_path in glob.glob(os.path.join(entry_dir, REFS_DIR, '*')):
+            try:
+                if now - os.path.getmtime(ref_path) <= ref_ttl:
+                    refs += 1
+            except OSError:
+                pass
+        try:
+            last_used = os.path.getmtime(os.path.join(entry_dir, LAST_USED_FILE))
+        except OSError:
+            last_used = 0
+        entries.append({
+            'sha256': file_hash,
+            'size': _dir_size(entry_dir),
+            'last_used': last_used,
+            'refs': refs
+        })
+    return entries
+
+
+def cleanup_store(max_bytes=None, ttl=None, dry_run=False):
+    """
+    참조가 없는 항목 중 마지막 사용 후 ttl(UPLOAD_STORE_TTL)이 지난 것과, 전체 크기가
+    max_bytes(UPLOAD_STORE_MAX_BYTES)를 넘는 만큼 오래 사용하지 않은 것부터 삭제 후 삭제한 해시 목록 반환
+    만료된 세션 참조와 남은 임시 디렉터리도 정리한다.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'UPLOAD_STORE_MAX_BYTES', 0)
+    if ttl is None:
+        ttl = getattr(settings, 'UPLOAD_STORE_TTL', 7 * 24 * 60 * 60)
+    now = time.time()
+
+    entries = get_entries()
+    total = sum(entry['size'] for entry in entries)
+    removed = []
+    for entry in sorted(entries, key=lambda entry: entry['last_used']):
+        if entry['refs']:
+            continue
+        if not (now - entry['last_used'] > ttl or (max_bytes and total > max_bytes)):
+            continue
+        if not dry_run:
+            shutil.rmtree(get_entry_dir(entry['sha256']), ignore_errors=True)
+        total -= entry['size']
+        removed.append(entry['sha256'])
+
+    if not dry_run:
+        _cleanup_stale_files(now)
+    return removed
+
+
+def _cleanup_stale_files(now):
+    ref_ttl = get_ref_ttl()
+    for ref_path in glob.glob(os.path.join(get_store_dir(), '*', REFS_DIR, '*')):
+        try:
+            if now - os.path.getmtime(ref_path) > ref_ttl:
+                os.remove(ref_path)
+        except OSError:
+            pass
+
+    # 준비 중 프로세스가 종료되어 남은 임시 디렉터리 (하루 이상 지난 것만)
+    for temp_dir in glob.glob(os.path.join(get_store_dir(), f"{TEMP_PREFIX}*")):
+        try:
+            if now - os.path.getmtime(temp_dir) > 24 * 60 * 60:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        except OSError:
+            pass
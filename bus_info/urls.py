@@ -16,10 +16,17 @@ urlpatterns = [
     path('api/collection/date-data/', views.get_date_data, name='date_data'),
     path('api/collection/delete-date/', views.delete_date_data, name='delete_date_data'),
     path('api/collection/download-all/', views.download_all_files, name='download_all_files'),
+    path('api/collection/export/', views.export_collections, name='export_collections'),
     
     # 데이터 분석 관련 API
     path('api/analysis/upload/', views_analysis.upload_database, name='upload_database'),
+    path('api/analysis/upload/init/', views_analysis.init_upload, name='init_upload'),
+    path('api/analysis/upload/<str:upload_id>/', views_analysis.get_upload_status, name='upload_status'),
+    path('api/analysis/upload/<str:upload_id>/parts/<int:index>/', views_analysis.upload_part, name='upload_part'),
+    path('api/analysis/upload/<str:upload_id>/complete/', views_analysis.finish_upload, name='complete_upload'),
+    path('api/analysis/live/', views_analysis.use_live_database, name='use_live_database'),
     path('api/analysis/start/', views_analysis.start_analysis, name='start_analysis'),
     path('api/analysis/data/', views_analysis.get_analysis_data, name='get_analysis_data'),
     path('api/analysis/average/', views_analysis.get_average_analysis, name='get_average_analysis'),
+    path('api/analysis/average/all/', views_analysis.get_all_average_analysis, name='get_all_average_analysis'),
 ]
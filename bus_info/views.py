@@ -1,9 +1,14 @@
-from .data_collector import bus_collector
-from .models import BusCollection, BusData
+from .data_collector import CollectionInProgress, collector_manager
+from .config import DEFAULT_ROUTE_ID, DEFAULT_INTERVAL_SECONDS
+from .db_snapshot import create_snapshot, get_snapshot_path, parse_range, iter_file, iter_gzip
+from .models import BusCollection
+from .snapshots import load_buses, delete_collections
+from .archive import get_archived_days, get_archived_collections
+from .export import EXPORT_FORMATS, ExportQuery, iter_csv, iter_ndjson, write_sqlite
 from .busstop import get_bus_stop_name, BUS_STOPS_8201
 import os
 import json
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -13,8 +18,31 @@ from django.db import models
 from datetime import datetime, date
 
 
+def get_request_route_id(request):
+    """
+    요청에서 노선 ID 추출 (쿼리스트링, 폼, JSON 본문 순 / 없으면 기본 노선)
+    """
+    route_id = request.GET.get('route_id') or request.POST.get('route_id')
+    if not route_id and request.content_type == 'application/json' and request.body:
+        try:
+            route_id = json.loads(request.body).get('route_id')
+        except (ValueError, AttributeError):
+            route_id = None
+    return str(route_id) if route_id else DEFAULT_ROUTE_ID
 
 
+def get_request_interval(request):
+    """
+    요청에서 수집 간격(초) 추출 (없으면 기본 간격)
+    """
+    interval = request.GET.get('interval_seconds') or request.POST.get('interval_seconds')
+    if not interval and request.content_type == 'application/json' and request.body:
+        try:
+            interval = json.loads(request.body).get('interval_seconds')
+        except (ValueError, AttributeError):
+            interval = None
+    return int(interval) if interval else DEFAULT_INTERVAL_SECONDS
+
 
 def home(request):
     """
@@ -27,14 +55,18 @@ def home(request):
 @require_http_methods(["POST"])
 def start_data_collection(request):
     """
-    자동 데이터 수집 시작
+    자동 데이터 수집 시작 (route_id 미지정 시 기본 노선, 미등록 노선은 자동 등록)
     """
     try:
-        bus_collector.start_collection()
+        route_id = get_request_route_id(request)
+        if collector_manager.get_collector(route_id) is None:
+            collector_manager.register_route(route_id, get_request_interval(request))
+        
+        collector_manager.start(route_id)
         return JsonResponse({
             'success': True,
             'message': '자동 데이터 수집이 시작되었습니다.',
-            'status': bus_collector.get_status()
+            'status': collector_manager.get_status(route_id)
         })
     except Exception as e:
         return JsonResponse({
@@ -50,11 +82,18 @@ def stop_data_collection(request):
     자동 데이터 수집 중지
     """
     try:
-        bus_collector.stop_collection()
+        route_id = get_request_route_id(request)
+        if collector_manager.get_collector(route_id) is None:
+            return JsonResponse({
+                'success': False,
+                'error': f'등록되지 않은 노선입니다: {route_id}'
+            }, status=404)
+        
+        collector_manager.stop(route_id)
         return JsonResponse({
             'success': True,
             'message': '자동 데이터 수집이 중지되었습니다.',
-            'status': bus_collector.get_status()
+            'status': collector_manager.get_status(route_id)
         })
     except Exception as e:
         return JsonResponse({
@@ -67,28 +106,36 @@ def stop_data_collection(request):
 @require_http_methods(["GET"])
 def get_collection_status(request):
     """
-    데이터 수집 상태 조회
+    데이터 수집 상태 조회 (선택 노선 상태 + 전체 노선별 상태)
     """
     try:
-        status = bus_collector.get_status()
+        route_id = get_request_route_id(request)
+        status = collector_manager.get_status(route_id) or {
+            'is_running': False,
+            'route_id': route_id,
+            'interval_seconds': None
+        }
+        manager_status = collector_manager.get_status()
+        status['routes'] = manager_status['routes']
+        status['sqlite'] = manager_status['sqlite']
         
         # 오늘 날짜 수집 데이터 조회
         today = date.today()
         today_collections = BusCollection.objects.filter(
-            route_id=bus_collector.route_id,
+            route_id=route_id,
             collection_date=today
         )
         
         # 전체 수집 날짜 조회
         all_dates = BusCollection.objects.filter(
-            route_id=bus_collector.route_id
+            route_id=route_id
         ).values('collection_date').annotate(
             count=Count('id')
         ).order_by('-collection_date')
         
         # 최신 수집 데이터 조회
         latest_collection = BusCollection.objects.filter(
-            route_id=bus_collector.route_id
+            route_id=route_id
         ).first()
         
         status['collection_count'] = today_collections.count()
@@ -138,12 +185,21 @@ def collect_data_once(request):
     한 번만 데이터 수집 실행
     """
     try:
-        bus_collector.collect_and_save()
+        route_id = get_request_route_id(request)
+        if collector_manager.get_collector(route_id) is None:
+            collector_manager.register_route(route_id, get_request_interval(request))
+        
+        collector_manager.collect_once(route_id)
         return JsonResponse({
             'success': True,
             'message': '데이터 수집이 완료되었습니다.',
-            'status': bus_collector.get_status()
+            'status': collector_manager.get_status(route_id)
         })
+    except CollectionInProgress as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=409)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -158,10 +214,12 @@ def get_latest_data(request):
     최신 수집 데이터 조회
     """
     try:
+        route_id = get_request_route_id(request)
+        
         # 최신 수집 데이터 조회 (버스는 정류소 순번 순으로 정렬)
         latest_collection = BusCollection.objects.filter(
-            route_id=bus_collector.route_id
-        ).prefetch_related('buses').first()
+            route_id=route_id
+        ).first()
         
         if not latest_collection:
             return JsonResponse({
@@ -169,26 +227,16 @@ def get_latest_data(request):
                 'message': '수집된 데이터가 없습니다.'
             })
         
-        # 버스 데이터 구성 (정류소 순번 순으로 정렬)
+        # 버스 데이터 구성 (저장 방식과 무관하게 정류소 순번 숫자 순으로 정렬되어 반환됨)
         buses_data = []
-        sorted_buses = latest_collection.buses.all().order_by('station_seq')
-        for bus in sorted_buses:
+        for bus in load_buses([latest_collection])[latest_collection.id]:
             buses_data.append({
-                'plateNo': bus.plate_no,
-                'remainSeatCnt': bus.remain_seat_cnt,
-                'stationSeq': bus.station_seq,
-                'stationName': get_bus_stop_name(bus.station_seq)
+                'plateNo': bus['plate_no'],
+                'remainSeatCnt': bus['remain_seat_cnt'],
+                'stationSeq': bus['station_seq'] if bus['station_seq'] is not None else 'N/A',
+                'stationName': get_bus_stop_name(bus['station_seq'])
             })
         
-        # 추가 정렬 (숫자 순서로)
-        def sort_key(bus):
-            try:
-                return int(bus['stationSeq'])
-            except (ValueError, TypeError):
-                return float('inf')
-        
-        buses_data.sort(key=sort_key)
-        
         data = {
             'query_time': latest_collection.query_time.strftime('%Y-%m-%d %H:%M:%S'),
             'buses': buses_data,
@@ -198,7 +246,7 @@ def get_latest_data(request):
         
         # 해당 날짜의 총 수집 횟수
         total_collections = BusCollection.objects.filter(
-            route_id=bus_collector.route_id,
+            route_id=route_id,
             collection_date=latest_collection.collection_date
         ).count()
         
@@ -224,16 +272,18 @@ def get_latest_data(request):
 @require_http_methods(["GET"])
 def get_daily_list(request):
     """
-    일별 수집 데이터 목록 조회
+    일별 수집 데이터 목록 조회 (보관 파일로 옮겨진 날짜 포함)
     """
     try:
+        route_id = get_request_route_id(request)
+        
         # 페이지네이션 파라미터
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('per_page', 20))
         
         # 날짜별 수집 데이터 조회
         daily_data = BusCollection.objects.filter(
-            route_id=bus_collector.route_id
+            route_id=route_id
         ).values('collection_date').annotate(
             total_collections=Count('id'),
             successful_collections=Count('id', filter=Q(is_error=False, is_skipped=False)),
@@ -242,6 +292,14 @@ def get_daily_list(request):
             last_collection_time=models.Max('query_time')
         ).order_by('-collection_date')
         
+        # 본 DB에 없는 날짜는 보관 파일의 일별 요약으로 채움
+        archived_days = get_archived_days(route_id)
+        if archived_days:
+            daily_data = list(daily_data)
+            hot_dates = {item['collection_date'] for item in daily_data}
+            daily_data.extend(item for item in archived_days if item['collection_date'] not in hot_dates)
+            daily_data.sort(key=lambda item: item['collection_date'], reverse=True)
+        
         # 페이지네이션 적용
         paginator = Paginator(daily_data, per_page)
         page_obj = paginator.get_page(page)
@@ -299,43 +357,44 @@ def get_date_data(request):
                 'error': '올바른 날짜 형식이 아닙니다. (YYYY-MM-DD)'
             }, status=400)
         
+        route_id = get_request_route_id(request)
+        
         # 페이지네이션 파라미터
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('per_page', 50))
         
         # 해당 날짜의 수집 데이터 조회 (버스는 정류소 순번 순으로 정렬)
         collections = BusCollection.objects.filter(
-            route_id=bus_collector.route_id,
+            route_id=route_id,
             collection_date=target_date
-        ).prefetch_related('buses').order_by('-query_time')
+        ).order_by('-query_time')
+        
+        # 본 DB에 없으면 보관 파일에서 조회
+        archived = [] if collections.exists() else get_archived_collections(route_id, target_date)
         
         # 페이지네이션 적용
-        paginator = Paginator(collections, per_page)
+        paginator = Paginator(archived or collections, per_page)
         page_obj = paginator.get_page(page)
         
+        # 페이지의 버스 데이터를 한 번에 조회 (정류소 순번 숫자 순으로 정렬되어 반환됨)
+        page_collections = list(page_obj)
+        if archived:
+            page_buses = {collection.id: collection.buses for collection in page_collections}
+        else:
+            page_buses = load_buses(page_collections)
+        
         collections_data = []
-        for collection in page_obj:
-            # 각 수집 시점의 버스 데이터 (정류소 순번 순으로 정렬)
+        for collection in page_collections:
+            # 각 수집 시점의 버스 데이터
             buses_data = []
-            # 정류소 순번 순으로 정렬된 버스 데이터 가져오기
-            sorted_buses = collection.buses.all().order_by('station_seq')
-            for bus in sorted_buses:
+            for bus in page_buses[collection.id]:
                 buses_data.append({
-                    'plateNo': bus.plate_no,
-                    'remainSeatCnt': bus.remain_seat_cnt,
-                    'stationSeq': bus.station_seq,
-                    'stationName': get_bus_stop_name(bus.station_seq)
+                    'plateNo': bus['plate_no'],
+                    'remainSeatCnt': bus['remain_seat_cnt'],
+                    'stationSeq': bus['station_seq'] if bus['station_seq'] is not None else 'N/A',
+                    'stationName': get_bus_stop_name(bus['station_seq'])
                 })
             
-            # 추가 정렬 (숫자 순서로)
-            def sort_key(bus):
-                try:
-                    return int(bus['stationSeq'])
-                except (ValueError, TypeError):
-                    return float('inf')
-            
-            buses_data.sort(key=sort_key)
-            
             collections_data.append({
                 'id': collection.id,
                 'query_time': collection.query_time.strftime('%H:%M:%S'),
@@ -372,46 +431,53 @@ def get_date_data(request):
 @require_http_methods(["DELETE"])
 def delete_date_data(request):
     """
-    특정 날짜의 모든 수집 데이터 삭제
+    특정 날짜(또는 날짜 범위)의 모든 수집 데이터 삭제
+    date=YYYY-MM-DD 또는 start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
     """
     try:
         date_str = request.GET.get('date')
-        if not date_str:
+        start_str = request.GET.get('start_date') or date_str
+        end_str = request.GET.get('end_date') or date_str
+        if not start_str or not end_str:
             return JsonResponse({
                 'success': False,
-                'error': '날짜 파라미터가 필요합니다.'
+                'error': '날짜 파라미터(date 또는 start_date, end_date)가 필요합니다.'
             }, status=400)
         
         try:
-            target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
         except ValueError:
             return JsonResponse({
                 'success': False,
                 'error': '올바른 날짜 형식이 아닙니다. (YYYY-MM-DD)'
             }, status=400)
         
-        # 해당 날짜의 수집 데이터 조회
-        collections = BusCollection.objects.filter(
-            route_id=bus_collector.route_id,
-            collection_date=target_date
+        if start_date > end_date:
+            return JsonResponse({
+                'success': False,
+                'error': '시작 날짜가 종료 날짜보다 늦습니다.'
+            }, status=400)
+        
+        route_id = get_request_route_id(request)
+        
+        # 집합 기반 DELETE로 한 트랜잭션에서 삭제 (개수는 DELETE 결과로 확인)
+        total_collections, total_buses = delete_collections(
+            route_id=route_id,
+            start_date=start_date,
+            end_date=end_date
         )
         
-        if not collections.exists():
+        if not total_collections:
             return JsonResponse({
                 'success': False,
                 'error': '해당 날짜에 삭제할 데이터가 없습니다.'
             }, status=404)
         
-        # 삭제 전 개수 확인
-        total_collections = collections.count()
-        total_buses = BusData.objects.filter(collection__in=collections).count()
-        
-        # 데이터 삭제 (CASCADE로 관련 BusData도 자동 삭제됨)
-        collections.delete()
-        
+        period = start_str if start_date == end_date else f'{start_str} ~ {end_str}'
         return JsonResponse({
             'success': True,
-            'message': f'{date_str} 날짜의 데이터가 성공적으로 삭제되었습니다.',
+            'message': f'{period} 날짜의 데이터가 성공적으로 삭제되었습니다.',
             'deleted_collections': total_collections,
             'deleted_buses': total_buses
         })
@@ -423,18 +489,96 @@ def delete_date_data(request):
         }, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def export_collections(request):
+    """
+    노선/기간 단위 수집 데이터 내보내기
+    
+    - format: ndjson(기본) / csv / sqlite (sqlite는 분석 페이지에 바로 업로드 가능,
+      스트리밍하지 않고 요청 안에서 파일을 다 만든 뒤 보내므로 기간을 나누어 받는 것을 권장)
+    - start_date, end_date: 기간 (YYYY-MM-DD, 생략 시 제한 없음)
+    - since: 이전 내보내기의 X-Export-Cursor 값 (이후 수집 건만 내보냄)
+    """
+    try:
+        route_id = get_request_route_id(request)
+        
+        export_format = request.GET.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({
+                'success': False,
+                'error': f'지원하지 않는 형식입니다. ({", ".join(EXPORT_FORMATS)})'
+            }, status=400)
+        
+        try:
+            start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date() if request.GET.get('start_date') else None
+            end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date() if request.GET.get('end_date') else None
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': '올바른 날짜 형식이 아닙니다. (YYYY-MM-DD)'
+            }, status=400)
+        
+        try:
+            since = int(request.GET['since']) if request.GET.get('since') else None
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': 'since 파라미터는 수집 건 ID(정수)여야 합니다.'
+            }, status=400)
+        
+        export = ExportQuery(route_id, start_date=start_date, end_date=end_date, since=since)
+        cursor = export.get_next_cursor()
+        
+        period = f"{start_date or 'all'}_{end_date or 'all'}"
+        filename = f'bus_export_{route_id}_{period}'
+        
+        if export_format == 'sqlite':
+            import tempfile
+            
+            fd, temp_path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+            try:
+                write_sqlite(export, temp_path)
+                # 열어 둔 파일은 삭제 후에도 스트리밍 가능 (응답 종료 시 공간 반환)
+                export_file = open(temp_path, 'rb')
+            finally:
+                os.remove(temp_path)
+            response = FileResponse(export_file, content_type='application/octet-stream')
+            filename += '.sqlite3'
+        elif export_format == 'csv':
+            response = StreamingHttpResponse(iter_csv(export), content_type='text/csv; charset=utf-8')
+            filename += '.csv'
+        else:
+            response = StreamingHttpResponse(iter_ndjson(export), content_type='application/x-ndjson; charset=utf-8')
+            filename += '.ndjson'
+        
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Export-Cursor'] = '' if cursor is None else str(cursor)
+        return response
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'데이터 내보내기 실패: {str(e)}'
+        }, status=500)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def download_all_files(request):
     """
     데이터베이스 파일 다운로드
+    
+    온라인 백업 API로 만든 일관된 스냅샷을 스트리밍한다.
+    - compress=gzip: 전송 중 gzip 압축 (Range 이어받기 미지원)
+    - Range 헤더: 같은 스냅샷(If-Range의 ETag 또는 snapshot 파라미터)에서 이어받기
     """
     try:
-        import shutil
         from django.conf import settings
         
         # 데이터베이스 파일 경로 확인
-        db_path = settings.DATABASES['default']['NAME']
+        db_path = str(settings.DATABASES['default']['NAME'])
         
         if not os.path.exists(db_path):
             return JsonResponse({
@@ -442,37 +586,59 @@ def download_all_files(request):
                 'error': '데이터베이스 파일을 찾을 수 없습니다.'
             }, status=404)
         
-        # 임시 복사본 생성 (다운로드 중 데이터베이스 잠금 방지)
-        current_date = datetime.now().strftime('%Y-%m-%d_%H%M%S')
-        temp_filename = f'bus_data_db_{current_date}.sqlite3'
-        temp_path = os.path.join(settings.BASE_DIR, temp_filename)
+        compress = request.GET.get('compress', '').lower()
+        if compress not in ('', 'gzip'):
+            return JsonResponse({
+                'success': False,
+                'error': '지원하지 않는 압축 형식입니다. (gzip)'
+            }, status=400)
+        
+        range_header = request.headers.get('Range')
+        if compress:
+            range_header = None
+        
+        # 이어받기 요청은 처음 받던 스냅샷을 그대로 사용 (없거나 만료되면 새 스냅샷 전체 전송)
+        snapshot_path = None
+        if range_header:
+            snapshot_id = request.GET.get('snapshot') or request.headers.get('If-Range', '').strip('"')
+            snapshot_path = get_snapshot_path(snapshot_id)
+            if snapshot_path is None:
+                range_header = None
+        
+        if snapshot_path is None:
+            snapshot_id, snapshot_path = create_snapshot(db_path)
+        
+        filename = f'bus_data_db_{snapshot_id}.sqlite3'
+        size = os.path.getsize(snapshot_path)
+        
+        if compress == 'gzip':
+            response = StreamingHttpResponse(iter_gzip(iter_file(snapshot_path)), content_type='application/gzip')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.gz"'
+            response['X-Snapshot-Id'] = snapshot_id
+            return response
         
         try:
-            # 데이터베이스 파일 복사
-            shutil.copy2(db_path, temp_path)
-            
-            # 파일 읽기
-            with open(temp_path, 'rb') as f:
-                file_content = f.read()
-            
-            # 임시 파일 삭제
-            os.remove(temp_path)
-            
-            # 응답 생성
-            response = HttpResponse(file_content, content_type='application/octet-stream')
-            response['Content-Disposition'] = f'attachment; filename="{temp_filename}"'
-            response['Content-Length'] = len(file_content)
-            
+            byte_range = parse_range(range_header, size) if range_header else None
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
             return response
-            
-        except Exception as copy_error:
-            # 임시 파일이 생성되었다면 삭제
-            if os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
-            raise copy_error
+        
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(iter_file(snapshot_path, start, end),
+                                             status=206, content_type='application/octet-stream')
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(open(snapshot_path, 'rb'), content_type='application/octet-stream')
+            response['Content-Length'] = size
+        
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = f'"{snapshot_id}"'
+        response['X-Snapshot-Id'] = snapshot_id
+        return response
         
     except Exception as e:
         return JsonResponse({
@@ -5,10 +5,185 @@ from django.http import JsonResponse
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from .analysis_pool import analysis_pool
+from .archive import get_archived_days
+from .averages import AVERAGE_VARIANTS, calculate_average_buckets, calculate_trip_average
 from .busstop import BUS_STOPS_8201
+from .config import DEFAULT_ROUTE_ID
+from .db_upload import (
+    STATUS_READY,
+    UploadError,
+    complete_upload,
+    create_upload,
+    get_daily_summary,
+    get_db_path,
+    get_upload_dir,
+    get_upload_info,
+    store_database,
+    write_part
+)
+from .result_cache import average_cache, get_db_fingerprint, make_key
+from .upload_store import (
+    DB_FILE as UPLOAD_DB_FILE,
+    add_reference,
+    create_temp_dir,
+    get_entry,
+    new_reference_id,
+    release_reference
+)
+from .trips import (
+    compute_changes,
+    connect_analysis_db,
+    get_day_trips,
+    get_live_db_uri,
+    get_max_trips,
+    get_weekday_condition
+)
 import os
 
 
+def get_analysis_db_path(request, source=None):
+    """
+    분석 대상 DB 경로 반환
+    source(또는 세션의 analysis_source)가 'live'면 운영 DB URI, 아니면 업로드된 파일 (없으면 None)
+    """
+    source = source or request.GET.get('source') or request.session.get('analysis_source')
+    if source == 'live':
+        return get_live_db_uri()
+    
+    temp_db_path = request.session.get('temp_db_path')
+    if not temp_db_path or not os.path.exists(temp_db_path):
+        return None
+    # 저장소 파일이면 세션 참조와 마지막 사용 시각 갱신 (사용 중인 파일은 정리 작업에서 삭제하지 않음)
+    add_reference(temp_db_path, request.session.get('upload_ref'))
+    return temp_db_path
+
+
+def get_archived_dates(temp_db_path, start_date, end_date, route_id=DEFAULT_ROUTE_ID):
+    """
+    운영 DB로 분석할 때 기간 내에서 보관 파일로 옮겨져 본 DB에 없는 날짜 목록 (YYYY-MM-DD)
+    업로드 파일은 보관 대상이 아니므로 항상 빈 목록
+    """
+    if not temp_db_path.startswith('file:'):
+        return []
+    
+    archived = sorted(
+        item['collection_date'].isoformat() for item in get_archived_days(route_id)
+        if start_date <= item['collection_date'].isoformat() <= end_date
+    )
+    if not archived:
+        return []
+    
+    with analysis_pool.connection(temp_db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT collection_date FROM bus_info_buscollection
+            WHERE route_id = ? AND collection_date BETWEEN ? AND ?
+        """, (route_id, start_date, end_date))
+        hot_dates = {row[0] for row in cursor.fetchall()}
+    return [archived_date for archived_date in archived if archived_date not in hot_dates]
+
+
+def archived_dates_response(archived_dates):
+    """
+    보관된 날짜가 포함된 운영 DB 분석 요청 응답 (빈 결과를 운행 없음으로 오해하지 않도록 오류로 반환)
+    """
+    return JsonResponse({
+        'success': False,
+        'archived': True,
+        'archived_dates': archived_dates,
+        'error': f'보관 파일로 옮겨진 날짜가 포함되어 있습니다 ({", ".join(archived_dates)}). '
+                 '내보내기 파일을 업로드하여 분석해주세요.'
+    }, status=409)
+
+
+def set_upload_database(request, db_path):
+    """
+    세션의 분석 대상을 저장소의 업로드 파일로 설정 (이전 업로드 파일의 참조는 해제)
+    """
+    ref_id = request.session.get('upload_ref') or new_reference_id()
+    previous = request.session.get('temp_db_path')
+    if previous and previous != db_path:
+        release_reference(previous, ref_id)
+    add_reference(db_path, ref_id)
+    
+    request.session['upload_ref'] = ref_id
+    request.session['temp_db_path'] = db_path
+    request.session['analysis_source'] = 'upload'
+
+
+def get_db_summary(cursor):
+    """
+    분석 대상 DB의 수집 날짜 범위 및 수집 건수
+    """
+    # COUNT(DISTINCT) 대신 (노선, 날짜) 인덱스 순서로 날짜별 집계 후 합산 (임시 B-tree 없음)
+    cursor.execute("""
+        SELECT 
+            MIN(collection_date) as min_date,
+            MAX(collection_date) as max_date,
+            COUNT(*) as total_dates,
+            COALESCE(SUM(date_collections), 0) as total_collections
+        FROM (
+            SELECT collection_date, COUNT(*) as date_collections
+            FROM bus_info_buscollection
+            WHERE route_id = ?
+            GROUP BY collection_date
+        )
+    """, (DEFAULT_ROUTE_ID,))
+    
+    result = cursor.fetchone()
+    return {
+        'min_date': result[0],
+        'max_date': result[1],
+        'total_dates': result[2],
+        'total_collections': result[3]
+    }
+
+
+def get_daily_collections(cursor, start_date, end_date):
+    """
+    기간 내 일자별 수집 건수 / 성공 건수 (최근 날짜 순)
+    """
+    cursor.execute("""
+        SELECT 
+            collection_date,
+            COUNT(*) as total_collections,
+            COUNT(CASE WHEN is_error = 0 AND is_skipped = 0 THEN 1 END) as successful_collections
+        FROM bus_info_buscollection
+        WHERE collection_date BETWEEN ? AND ?
+        AND route_id = ?
+        GROUP BY collection_date
+        ORDER BY collection_date DESC
+    """, (start_date, end_date, DEFAULT_ROUTE_ID))
+    
+    return [
+        {
+            'date': row[0],
+            'total_collections': row[1],
+            'successful_collections': row[2]
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def get_collection_weekdays(cursor, start_date, end_date, route_id=DEFAULT_ROUTE_ID):
+    """
+    기간 내 노선의 성공 수집 날짜의 요일 집합 (0=월요일 ... 6=일요일)
+    """
+    # 평균 집계(get_day_fingerprints)와 같은 조건 / DISTINCT 대신 날짜 인덱스 순서로 묶음 (임시 B-tree 없음)
+    # strftime('%w')는 0=일요일이므로 0=월요일 기준으로 변환
+    cursor.execute("""
+        SELECT strftime('%w', c.collection_date)
+        FROM bus_info_buscollection c
+        WHERE c.collection_date BETWEEN ? AND ?
+        AND c.route_id = ?
+        AND NOT c.is_error
+        AND NOT c.is_skipped
+        GROUP BY c.collection_date
+    """, (start_date, end_date, route_id))
+    return {(int(row[0]) + 6) % 7 for row in cursor.fetchall() if row[0] is not None}
+
+
 def analysis_page(request):
     """
     데이터 분석 페이지
@@ -38,64 +213,228 @@ def upload_database(request):
                 'error': 'SQLite 데이터베이스 파일(.sqlite3)만 업로드 가능합니다.'
             }, status=400)
         
-        # 임시 파일로 저장
-        import tempfile
+        # 저장소의 임시 디렉터리에 저장
+        import hashlib
         import shutil
         
-        temp_dir = tempfile.mkdtemp()
-        temp_db_path = os.path.join(temp_dir, 'uploaded_db.sqlite3')
+        temp_dir = create_temp_dir()
+        temp_db_path = os.path.join(temp_dir, UPLOAD_DB_FILE)
         
+        # 저장하면서 내용 해시 계산 (저장소 키 겸 평균 분석 결과 캐시 키)
+        digest = hashlib.sha256()
         with open(temp_db_path, 'wb+') as destination:
             for chunk in db_file.chunks():
                 destination.write(chunk)
+                digest.update(chunk)
         
-        # 데이터베이스 연결 테스트 및 날짜 범위 조회
-        import sqlite3
-        conn = sqlite3.connect(temp_db_path)
-        cursor = conn.cursor()
+        # 같은 파일이 저장소에 있으면 그대로 사용, 없으면 확인/분석 준비 후 등록
+        entry = get_entry(digest.hexdigest())
+        if entry is None:
+            try:
+                entry = store_database(digest.hexdigest(), temp_dir)
+            except UploadError as e:
+                return JsonResponse({
+                    'success': False,
+                    'error': str(e)
+                }, status=e.status)
+        else:
+            shutil.rmtree(temp_dir, ignore_errors=True)
         
-        # 테이블 존재 확인
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bus_info_buscollection'")
-        if not cursor.fetchone():
-            conn.close()
-            shutil.rmtree(temp_dir)
+        # 세션의 분석 대상으로 설정
+        set_upload_database(request, entry['db_path'])
+        
+        return JsonResponse({
+            'success': True,
+            'message': '데이터베이스 파일이 업로드되었습니다.',
+            'data': entry['summary']
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'업로드 중 오류 발생: {str(e)}'
+        }, status=500)
+
+
+def get_session_upload_dir(request, upload_id):
+    """
+    현재 세션에서 시작한 업로드의 디렉터리 (없으면 None)
+    """
+    if upload_id not in request.session.get('upload_ids', []):
+        return None
+    return get_upload_dir(upload_id)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def init_upload(request):
+    """
+    분할 업로드 시작 - 업로드 ID와 조각 크기 반환
+    본문: {"filename": ..., "size": 바이트 수, "sha256": 전체 파일 해시(선택)}
+    """
+    try:
+        import json
+        data = json.loads(request.body)
+        
+        manifest = create_upload(data.get('filename'), data.get('size'), data.get('sha256'))
+        
+        # 같은 세션에서만 이어서 올리거나 상태를 조회할 수 있도록 업로드 ID 기록
+        request.session['upload_ids'] = request.session.get('upload_ids', [])[-9:] + [manifest['upload_id']]
+        
+        # sha256이 저장소의 파일과 같으면 조각 없이 바로 ready
+        return JsonResponse({
+            'success': True,
+            'data': get_upload_info(get_upload_dir(manifest['upload_id']))
+        })
+        
+    except UploadError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'업로드 시작 중 오류 발생: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def upload_part(request, upload_id, index):
+    """
+    조각 업로드 - 본문은 조각 바이트, X-Chunk-SHA256 헤더가 있으면 내용과 비교
+    """
+    try:
+        upload_dir = get_session_upload_dir(request, upload_id)
+        if upload_dir is None:
             return JsonResponse({
                 'success': False,
-                'error': '올바른 버스 데이터베이스 파일이 아닙니다.'
-            }, status=400)
+                'error': '업로드를 찾을 수 없습니다. 처음부터 다시 업로드해주세요.'
+            }, status=404)
         
-        # 날짜 범위 조회
-        cursor.execute("""
-            SELECT 
-                MIN(collection_date) as min_date,
-                MAX(collection_date) as max_date,
-                COUNT(DISTINCT collection_date) as total_dates,
-                COUNT(*) as total_collections
-            FROM bus_info_buscollection
-        """)
+        try:
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
         
-        result = cursor.fetchone()
-        conn.close()
+        # request.body 대신 스트림에서 바로 읽어 파일에 기록 (조각 크기가 요청 본문 메모리 제한보다 커도 됨)
+        part_hash = write_part(upload_dir, index, request, length, request.headers.get('X-Chunk-SHA256'))
         
-        # 세션에 임시 파일 경로 저장
-        request.session['temp_db_path'] = temp_db_path
-        request.session['temp_dir'] = temp_dir
+        return JsonResponse({
+            'success': True,
+            'data': {
+                'index': index,
+                'sha256': part_hash
+            }
+        })
+        
+    except UploadError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'조각 업로드 중 오류 발생: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def finish_upload(request, upload_id):
+    """
+    분할 업로드 완료 - 검증을 백그라운드에 맡기고 바로 응답 (결과는 상태 조회 API로 확인)
+    """
+    try:
+        upload_dir = get_session_upload_dir(request, upload_id)
+        if upload_dir is None:
+            return JsonResponse({
+                'success': False,
+                'error': '업로드를 찾을 수 없습니다. 처음부터 다시 업로드해주세요.'
+            }, status=404)
+        
+        status = complete_upload(upload_dir)
         
         return JsonResponse({
             'success': True,
-            'message': '데이터베이스 파일이 업로드되었습니다.',
             'data': {
-                'min_date': result[0],
-                'max_date': result[1],
-                'total_dates': result[2],
-                'total_collections': result[3]
+                'upload_id': upload_id,
+                'status': status
             }
+        }, status=202)
+        
+    except UploadError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'업로드 완료 처리 중 오류 발생: {str(e)}'
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def get_upload_status(request, upload_id):
+    """
+    분할 업로드 상태 조회 (uploading: 받은 조각 목록 / ready: 날짜 범위, 분석 대상으로 설정 / error: 오류)
+    """
+    try:
+        upload_dir = get_session_upload_dir(request, upload_id)
+        if upload_dir is None:
+            return JsonResponse({
+                'success': False,
+                'error': '업로드를 찾을 수 없습니다. 처음부터 다시 업로드해주세요.'
+            }, status=404)
+        
+        info = get_upload_info(upload_dir)
+        
+        # 검증이 끝났으면 세션의 분석 대상 DB로 설정
+        if info['status'] == STATUS_READY:
+            temp_db_path = get_db_path(upload_dir)
+            if temp_db_path and request.session.get('temp_db_path') != temp_db_path:
+                set_upload_database(request, temp_db_path)
+        
+        return JsonResponse({
+            'success': True,
+            'data': info
         })
         
     except Exception as e:
         return JsonResponse({
             'success': False,
-            'error': f'업로드 중 오류 발생: {str(e)}'
+            'error': f'업로드 상태 조회 중 오류 발생: {str(e)}'
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def use_live_database(request):
+    """
+    업로드 없이 운영 DB로 분석 (읽기 전용 연결)
+    """
+    try:
+        conn = connect_analysis_db(get_live_db_uri())
+        try:
+            summary = get_db_summary(conn.cursor())
+        finally:
+            conn.close()
+        
+        request.session['analysis_source'] = 'live'
+        
+        return JsonResponse({
+            'success': True,
+            'message': '운영 데이터베이스로 분석합니다.',
+            'data': summary
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'운영 데이터베이스 연결 중 오류 발생: {str(e)}'
         }, status=500)
 
 
@@ -118,44 +457,29 @@ def start_analysis(request):
                 'error': '시작 날짜와 종료 날짜를 모두 입력해주세요.'
             }, status=400)
         
-        # 세션에서 임시 DB 경로 가져오기
-        temp_db_path = request.session.get('temp_db_path')
+        # 분석 대상 DB (source='live'면 운영 DB, 아니면 세션의 업로드 파일)
+        source = data.get('source')
+        temp_db_path = get_analysis_db_path(request, source)
         
-        if not temp_db_path or not os.path.exists(temp_db_path):
+        if not temp_db_path:
             return JsonResponse({
                 'success': False,
                 'error': '업로드된 데이터베이스 파일을 찾을 수 없습니다. 다시 업로드해주세요.'
             }, status=400)
         
-        # 기간 내 일자별 데이터 조회
-        import sqlite3
-        conn = sqlite3.connect(temp_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                collection_date,
-                COUNT(*) as total_collections,
-                COUNT(CASE WHEN is_error = 0 AND is_skipped = 0 THEN 1 END) as successful_collections
-            FROM bus_info_buscollection
-            WHERE collection_date BETWEEN ? AND ?
-            GROUP BY collection_date
-            ORDER BY collection_date DESC
-        """, (start_date, end_date))
-        
-        daily_list = []
-        for row in cursor.fetchall():
-            daily_list.append({
-                'date': row[0],
-                'total_collections': row[1],
-                'successful_collections': row[2]
-            })
-        
-        conn.close()
+        # 기간 내 일자별 데이터 조회 (업로드 파일은 업로드 시 미리 계산한 결과 사용)
+        daily_list = None
+        if not temp_db_path.startswith('file:'):
+            daily_list = get_daily_summary(temp_db_path, start_date, end_date)
+        if daily_list is None:
+            with analysis_pool.connection(temp_db_path) as conn:
+                daily_list = get_daily_collections(conn.cursor(), start_date, end_date)
         
         # 세션에 분석 기간 저장
         request.session['analysis_start_date'] = start_date
         request.session['analysis_end_date'] = end_date
+        if source:
+            request.session['analysis_source'] = source
         
         return JsonResponse({
             'success': True,
@@ -189,221 +513,33 @@ def get_analysis_data(request):
                 'error': '날짜를 입력해주세요.'
             }, status=400)
         
-        # 세션에서 임시 DB 경로 가져오기
-        temp_db_path = request.session.get('temp_db_path')
+        # 분석 대상 DB (운영 DB 또는 업로드 파일)
+        temp_db_path = get_analysis_db_path(request)
         
-        if not temp_db_path or not os.path.exists(temp_db_path):
+        if not temp_db_path:
             return JsonResponse({
                 'success': False,
                 'error': '업로드된 데이터베이스 파일을 찾을 수 없습니다.'
             }, status=400)
         
-        import sqlite3
-        from datetime import datetime as dt
-        
-        conn = sqlite3.connect(temp_db_path)
-        cursor = conn.cursor()
-        
-        # 해당 날짜의 성공한 수집 데이터 조회
-        cursor.execute("""
-            SELECT 
-                c.id,
-                c.query_time,
-                b.plate_no,
-                b.station_seq,
-                b.remain_seat_cnt
-            FROM bus_info_buscollection c
-            LEFT JOIN bus_info_busdata b ON c.id = b.collection_id
-            WHERE c.collection_date = ?
-            AND c.is_error = 0
-            AND c.is_skipped = 0
-            ORDER BY c.query_time, b.plate_no, CAST(b.station_seq AS INTEGER)
-        """, (date,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # 평일/주말 판단
-        date_obj = dt.strptime(date, '%Y-%m-%d')
-        is_weekend = date_obj.weekday() >= 5  # 5=토요일, 6=일요일
-        
-        # 데이터 구조화 및 배차 구분
-        bus_trips = {}
-        bus_last_station = {}
-        bus_trip_counter = {}
-        
-        for row in rows:
-            collection_id, query_time, plate_no, station_seq, remain_seat = row
-            
-            if not plate_no or not station_seq:
-                continue
-            
-            try:
-                station_idx = int(station_seq)
-                if not (0 <= station_idx < len(BUS_STOPS_8201)):
-                    continue
-            except:
-                continue
-            
-            # 배차 구분 로직
-            if plate_no not in bus_trip_counter:
-                bus_trip_counter[plate_no] = 1
-                bus_last_station[plate_no] = station_idx
-            else:
-                if station_idx < bus_last_station[plate_no] - 20:
-                    bus_trip_counter[plate_no] += 1
-                bus_last_station[plate_no] = station_idx
-            
-            trip_key = f"{plate_no}_{bus_trip_counter[plate_no]}"
-            
-            if trip_key not in bus_trips:
-                bus_trips[trip_key] = {}
-            
-            if query_time not in bus_trips[trip_key]:
-                bus_trips[trip_key][query_time] = {}
-            
-            bus_trips[trip_key][query_time][station_idx] = remain_seat
+        archived_dates = get_archived_dates(temp_db_path, date, date)
+        if archived_dates:
+            return archived_dates_response(archived_dates)
         
-        # 배차 수 제한
-        max_trips = 16 if is_weekend else 20
+        # 해당 날짜의 배차별 승객 수 (미리 계산된 배차 결과가 최신이면 그대로 읽고,
+        # 없으면 성공한 수집 데이터에서 배차를 재구성하고 결측치를 보정)
+        # 업로드 파일은 연결 풀에서 빌려 날짜를 넘겨 가며 조회해도 페이지 캐시를 재사용
+        with analysis_pool.connection(temp_db_path) as conn:
+            day_trips = get_day_trips(conn.cursor(), "c.collection_date = ?", (date,)).get(date, [])
         
-        # 출발 시간 순서대로 정렬
-        trip_start_times = {}
-        for trip_key, time_data in bus_trips.items():
-            times = sorted(time_data.keys())
-            if times:
-                trip_start_times[trip_key] = times[0]
+        # 평일/주말 판단 및 배차 수 제한
+        is_weekend, max_trips = get_max_trips(date)
         
-        sorted_trip_keys = sorted(trip_start_times.keys(), key=lambda x: trip_start_times[x])
-        limited_trip_keys = sorted_trip_keys[:max_trips]
-        
-        # 현재 승객 수 계산
-        BUS_CAPACITY = 45
-        MIDPOINT_STATION_1 = 26
-        MIDPOINT_STATION_2 = 51
-        
-        result_data = {}
-        
-        for trip_key in limited_trip_keys:
-            time_data = bus_trips[trip_key]
-            result_data[trip_key] = {}
-            
-            times = sorted(time_data.keys())
-            
-            for current_time in times:
-                stations_in_time = time_data[current_time]
-                sorted_stations = sorted(stations_in_time.keys())
-                
-                for station_idx in sorted_stations:
-                    remain_seat = stations_in_time[station_idx]
-                    
-                    if remain_seat == -1:
-                        continue
-                    
-                    if station_idx == MIDPOINT_STATION_1:
-                        current_passengers = 0
-                    else:
-                        current_passengers = BUS_CAPACITY - remain_seat
-                        if current_passengers < 0:
-                            current_passengers = 0
-                    
-                    result_data[trip_key][station_idx] = current_passengers
-        
-
-            if MIDPOINT_STATION_1 not in result_data[trip_key]:
-                result_data[trip_key][MIDPOINT_STATION_1] = 0
-            if MIDPOINT_STATION_2 not in result_data[trip_key]:
-                result_data[trip_key][MIDPOINT_STATION_2] = 0
-            
-            
-            for station_idx in range(len(BUS_STOPS_8201)):
-                if station_idx == MIDPOINT_STATION_1:
-                    continue
-                
-                # 다음 정류장이 (경유)인지 확인하고 대체 (결측치 여부와 관계없이)
-                next_is_bypass = False
-                next_value = None
-                
-                for next_idx in range(station_idx + 1, len(BUS_STOPS_8201)):
-                    if next_idx < len(BUS_STOPS_8201):
-                        if "(경유)" in BUS_STOPS_8201[next_idx]:
-                            if next_idx in result_data[trip_key]:
-                                next_is_bypass = True
-                                next_value = result_data[trip_key][next_idx]
-                                break
-                        else:
-                            break
-
-                
-
-                if next_is_bypass and next_value is not None:
-                    result_data[trip_key][station_idx] = next_value
-                    continue
-
-                # 결측 데이터
-                
-                if station_idx not in result_data[trip_key]:
-                    filled = False
-                    
-                    # 1. 현재와 이전이 모두 (경유)
-                    if station_idx > 0 and station_idx < len(BUS_STOPS_8201):
-                        current_is_bypass = "(경유)" in BUS_STOPS_8201[station_idx]
-                        
-                        for prev_idx in range(station_idx - 1, -1, -1):
-                            if prev_idx in result_data[trip_key]:
-                                prev_is_bypass = "(경유)" in BUS_STOPS_8201[prev_idx]
-                                
-                                if current_is_bypass and prev_is_bypass:
-                                    result_data[trip_key][station_idx] = result_data[trip_key][prev_idx]
-                                    filled = True
-                                break
-                
-                    # 2. 평균 보간
-                    if not filled:
-                        prev_value = None
-                        next_value = None
-                        
-                        for prev_idx in range(station_idx - 1, -1, -1):
-                            if prev_idx in result_data[trip_key]:
-                                prev_value = result_data[trip_key][prev_idx]
-                                break
-                        
-                        for next_idx in range(station_idx + 1, len(BUS_STOPS_8201)):
-                            if next_idx in result_data[trip_key]:
-                                next_value = result_data[trip_key][next_idx]
-                                break
-                        
-                        if prev_value is not None and next_value is not None:
-                            result_data[trip_key][station_idx] = round((prev_value + next_value) / 2)
-
+        limited_trip_keys = [trip_key for trip_key, _, _ in day_trips]
+        result_data = {trip_key: passengers for trip_key, _, passengers in day_trips}
         
         # 변화량 계산
-        change_data = {}
-        for trip_key in limited_trip_keys:
-            change_data[trip_key] = {}
-            
-            for station_idx in range(len(BUS_STOPS_8201)):
-                if station_idx not in result_data[trip_key]:
-                    continue
-                
-                current_passengers = result_data[trip_key][station_idx]
-                
-                # 이전 정류장 찾기
-                prev_passengers = None
-                for prev_idx in range(station_idx - 1, -1, -1):
-                    if prev_idx in result_data[trip_key]:
-                        prev_passengers = result_data[trip_key][prev_idx]
-                        break
-                
-                if prev_passengers is not None:
-                    # 8-26: 승차 인원 (현재 - 이전)
-                    # 27-51: 하차 인원 (이전 - 현재)
-                    if station_idx <= 26:
-                        change = current_passengers - prev_passengers
-                    else:
-                        change = prev_passengers - current_passengers
-                    
-                    change_data[trip_key][station_idx] = change
+        change_data = {trip_key: compute_changes(passengers) for trip_key, passengers in result_data.items()}
         
         return JsonResponse({
             'success': True,
@@ -427,310 +563,54 @@ def get_analysis_data(request):
         }, status=500)
 
 
-def calculate_average_data(temp_db_path, start_date, end_date, weekday_filter=None, is_weekend_only=None):
+def calculate_average_data(temp_db_path, start_date, end_date, weekday_filter=None, is_weekend_only=None,
+                           route_id=DEFAULT_ROUTE_ID):
     """
     평균 데이터 계산 헬퍼 함수
     weekday_filter: None(전체), 0(월), 1(화), ..., 6(일)
     is_weekend_only: None(전체), True(주말만), False(평일만)
     """
-    import sqlite3
-    from datetime import datetime as dt
-    from collections import defaultdict
-    
-    conn = sqlite3.connect(temp_db_path)
-    cursor = conn.cursor()
+    date_condition = "c.collection_date BETWEEN ? AND ?"
+    query_params = (start_date, end_date)
     
-    # 날짜 필터링
-    if weekday_filter is not None:
-        # 요일별 필터링을 위해 모든 날짜를 가져와서 필터링
-        cursor.execute("""
-            SELECT DISTINCT collection_date
-            FROM bus_info_buscollection
-            WHERE collection_date BETWEEN ? AND ?
-        """, (start_date, end_date))
-        
-        all_dates = [row[0] for row in cursor.fetchall()]
-        filtered_dates = []
-        for date_str in all_dates:
-            date_obj = dt.strptime(date_str, '%Y-%m-%d')
-            if date_obj.weekday() == weekday_filter:
-                filtered_dates.append(date_str)
-        
-        if not filtered_dates:
-            conn.close()
+    # 요일 / 평일·주말 필터링은 SQL 조건으로 처리 (날짜 인덱스 범위 조회 + strftime('%w'))
+    weekday_condition, weekday_params = get_weekday_condition(weekday_filter, is_weekend_only)
+    if weekday_condition:
+        date_condition = f"{date_condition} AND {weekday_condition}"
+        query_params += weekday_params
+        
+        # 조건에 맞는 노선의 성공 수집 날짜가 없으면 None (평균 집계와 같은 조건)
+        with analysis_pool.connection(temp_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT 1 FROM bus_info_buscollection c
+                WHERE {date_condition}
+                AND c.route_id = ?
+                AND NOT c.is_error
+                AND NOT c.is_skipped
+                LIMIT 1
+            """, query_params + (route_id,))
+            has_dates = cursor.fetchone() is not None
+        if not has_dates:
             return None
-        
-        # 파라미터화된 쿼리를 위한 플레이스홀더 생성
-        placeholders = ','.join(['?'] * len(filtered_dates))
-        date_condition = f"collection_date IN ({placeholders})"
-        query_params = tuple(filtered_dates)
-    elif is_weekend_only is not None:
-        # 평일/주말 필터링
-        cursor.execute("""
-            SELECT DISTINCT collection_date
-            FROM bus_info_buscollection
-            WHERE collection_date BETWEEN ? AND ?
-        """, (start_date, end_date))
-        
-        all_dates = [row[0] for row in cursor.fetchall()]
-        filtered_dates = []
-        for date_str in all_dates:
-            date_obj = dt.strptime(date_str, '%Y-%m-%d')
-            is_weekend = date_obj.weekday() >= 5
-            if (is_weekend_only and is_weekend) or (not is_weekend_only and not is_weekend):
-                filtered_dates.append(date_str)
-        
-        if not filtered_dates:
-            conn.close()
-            return None
-        
-        placeholders = ','.join(['?'] * len(filtered_dates))
-        date_condition = f"collection_date IN ({placeholders})"
-        query_params = tuple(filtered_dates)
-    else:
-        date_condition = "collection_date BETWEEN ? AND ?"
-        query_params = (start_date, end_date)
-    
-    # 해당 기간의 성공한 수집 데이터 조회
-    cursor.execute(f"""
-        SELECT 
-            c.id,
-            c.query_time,
-            c.collection_date,
-            b.plate_no,
-            b.station_seq,
-            b.remain_seat_cnt
-        FROM bus_info_buscollection c
-        LEFT JOIN bus_info_busdata b ON c.id = b.collection_id
-        WHERE {date_condition}
-        AND c.is_error = 0
-        AND c.is_skipped = 0
-        ORDER BY c.collection_date, c.query_time, b.plate_no, CAST(b.station_seq AS INTEGER)
-    """, query_params)
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    # 날짜별로 데이터 그룹화
-    date_data = defaultdict(list)
-    for row in rows:
-        collection_id, query_time, collection_date, plate_no, station_seq, remain_seat = row
-        date_data[collection_date].append((collection_id, query_time, plate_no, station_seq, remain_seat))
-    
-    # 각 날짜별로 승객 수 계산
-    # 배차 순서를 유지하기 위해 각 날짜별 배차 순서를 저장
-    # [배차_순서][station_idx] = [승객 수 리스트]
-    all_passenger_data_by_order = defaultdict(lambda: defaultdict(list))
-    # 각 날짜별 배차 순서 정보 저장: [날짜] = [(trip_key, start_time), ...]
-    date_trip_orders = {}
-    
-    for date_str, date_rows in date_data.items():
-        # 해당 날짜의 데이터 처리 (기존 로직과 동일)
-        bus_trips = {}
-        bus_last_station = {}
-        bus_trip_counter = {}
-        
-        for row in date_rows:
-            collection_id, query_time, plate_no, station_seq, remain_seat = row
-            
-            if not plate_no or not station_seq:
-                continue
-            
-            try:
-                station_idx = int(station_seq)
-                if not (0 <= station_idx < len(BUS_STOPS_8201)):
-                    continue
-            except:
-                continue
-            
-            # 배차 구분 로직
-            if plate_no not in bus_trip_counter:
-                bus_trip_counter[plate_no] = 1
-                bus_last_station[plate_no] = station_idx
-            else:
-                if station_idx < bus_last_station[plate_no] - 20:
-                    bus_trip_counter[plate_no] += 1
-                bus_last_station[plate_no] = station_idx
-            
-            trip_key = f"{plate_no}_{bus_trip_counter[plate_no]}"
-            
-            if trip_key not in bus_trips:
-                bus_trips[trip_key] = {}
-            
-            if query_time not in bus_trips[trip_key]:
-                bus_trips[trip_key][query_time] = {}
-            
-            bus_trips[trip_key][query_time][station_idx] = remain_seat
-        
-        # 평일/주말 판단
-        date_obj = dt.strptime(date_str, '%Y-%m-%d')
-        is_weekend = date_obj.weekday() >= 5
-        max_trips = 16 if is_weekend else 20
-        
-        # 출발 시간 순서대로 정렬
-        trip_start_times = {}
-        for trip_key, time_data in bus_trips.items():
-            times = sorted(time_data.keys())
-            if times:
-                trip_start_times[trip_key] = times[0]
-        
-        sorted_trip_keys = sorted(trip_start_times.keys(), key=lambda x: trip_start_times[x])
-        limited_trip_keys = sorted_trip_keys[:max_trips]
-        
-        # 배차 순서 저장 (출발 시간과 함께)
-        date_trip_orders[date_str] = [(trip_key, trip_start_times[trip_key]) for trip_key in limited_trip_keys]
-        
-        # 현재 승객 수 계산
-        BUS_CAPACITY = 45
-        MIDPOINT_STATION_1 = 26
-        MIDPOINT_STATION_2 = 51
-        
-        result_data = {}
-        
-        for trip_key in limited_trip_keys:
-            time_data = bus_trips[trip_key]
-            result_data[trip_key] = {}
-            
-            times = sorted(time_data.keys())
-            
-            for current_time in times:
-                stations_in_time = time_data[current_time]
-                sorted_stations = sorted(stations_in_time.keys())
-                
-                for station_idx in sorted_stations:
-                    remain_seat = stations_in_time[station_idx]
-                    
-                    if remain_seat == -1:
-                        continue
-                    
-                    if station_idx == MIDPOINT_STATION_1:
-                        current_passengers = 0
-                    else:
-                        current_passengers = BUS_CAPACITY - remain_seat
-                        if current_passengers < 0:
-                            current_passengers = 0
-                    
-                    result_data[trip_key][station_idx] = current_passengers
-            
-            if MIDPOINT_STATION_1 not in result_data[trip_key]:
-                result_data[trip_key][MIDPOINT_STATION_1] = 0
-            if MIDPOINT_STATION_2 not in result_data[trip_key]:
-                result_data[trip_key][MIDPOINT_STATION_2] = 0
-            
-            # 결측치 처리 (기존 로직과 동일)
-            for station_idx in range(len(BUS_STOPS_8201)):
-                if station_idx == MIDPOINT_STATION_1:
-                    continue
-                
-                next_is_bypass = False
-                next_value = None
-                
-                for next_idx in range(station_idx + 1, len(BUS_STOPS_8201)):
-                    if next_idx < len(BUS_STOPS_8201):
-                        if "(경유)" in BUS_STOPS_8201[next_idx]:
-                            if next_idx in result_data[trip_key]:
-                                next_is_bypass = True
-                                next_value = result_data[trip_key][next_idx]
-                                break
-                        else:
-                            break
-                
-                if next_is_bypass and next_value is not None:
-                    result_data[trip_key][station_idx] = next_value
-                    continue
-                
-                if station_idx not in result_data[trip_key]:
-                    filled = False
-                    
-                    if station_idx > 0 and station_idx < len(BUS_STOPS_8201):
-                        current_is_bypass = "(경유)" in BUS_STOPS_8201[station_idx]
-                        
-                        for prev_idx in range(station_idx - 1, -1, -1):
-                            if prev_idx in result_data[trip_key]:
-                                prev_is_bypass = "(경유)" in BUS_STOPS_8201[prev_idx]
-                                
-                                if current_is_bypass and prev_is_bypass:
-                                    result_data[trip_key][station_idx] = result_data[trip_key][prev_idx]
-                                    filled = True
-                                break
-                    
-                    if not filled:
-                        prev_value = None
-                        next_value = None
-                        
-                        for prev_idx in range(station_idx - 1, -1, -1):
-                            if prev_idx in result_data[trip_key]:
-                                prev_value = result_data[trip_key][prev_idx]
-                                break
-                        
-                        for next_idx in range(station_idx + 1, len(BUS_STOPS_8201)):
-                            if next_idx in result_data[trip_key]:
-                                next_value = result_data[trip_key][next_idx]
-                                break
-                        
-                        if prev_value is not None and next_value is not None:
-                            result_data[trip_key][station_idx] = round((prev_value + next_value) / 2)
-        
-        # 각 배차에서 0의 개수 확인 (10개 이상이면 제외)
-        for trip_key in limited_trip_keys:
-            zero_count = 0
-            for station_idx in range(len(BUS_STOPS_8201)):
-                if station_idx in result_data[trip_key] and result_data[trip_key][station_idx] == 0:
-                    zero_count += 1
-            
-            # 0이 10개 미만인 배차만 포함
-            if zero_count < 10:
-                # 배차 순서에 따라 데이터 누적
-                trip_order = limited_trip_keys.index(trip_key)
-                for station_idx in range(len(BUS_STOPS_8201)):
-                    if station_idx in result_data[trip_key]:
-                        all_passenger_data_by_order[trip_order][station_idx].append(result_data[trip_key][station_idx])
-    
-    # 평균 계산 (배차 순서대로)
-    avg_passenger_data = {}
-    sorted_trip_keys = []
     
-    # 배차 순서대로 정렬 (가장 많은 날짜에서 나타나는 순서 사용)
-    if date_trip_orders:
-        # 가장 많은 배차를 가진 날짜의 순서를 기준으로 사용
-        max_trips_date = max(date_trip_orders.keys(), key=lambda d: len(date_trip_orders[d]))
-        base_order = date_trip_orders[max_trips_date]
-        
-        for order_idx, (trip_key, start_time) in enumerate(base_order):
-            if order_idx in all_passenger_data_by_order:
-                # 배차 이름 생성 (순서 기반)
-                trip_name = f"배차_{order_idx + 1}"
-                sorted_trip_keys.append(trip_name)
-                avg_passenger_data[trip_name] = {}
-                
-                for station_idx, values in all_passenger_data_by_order[order_idx].items():
-                    if values:
-                        avg_passenger_data[trip_name][station_idx] = round(sum(values) / len(values), 1)
+    # 날짜별 배차 승객 수를 배차 순서/정류장별로 누적 (미리 계산된 배차 결과가 최신이면 그대로 읽고,
+    # 없으면 원본에서 재구성 / ANALYSIS_WORKERS > 1이면 날짜를 프로세스 풀에 나누어 계산)
+    return build_average_result(calculate_trip_average(temp_db_path, date_condition, query_params, route_id))
+
+
+def build_average_result(average):
+    """
+    누적 결과(TripAverage)로 평균 승객 수와 변화량 계산
+    배차 이름은 가장 많은 배차를 가진 날짜의 순서를 기준으로 사용
+    """
+    sorted_trip_keys, avg_passenger_data = average.get_averages()
     
     # 변화량 계산
-    change_data = {}
-    for trip_name in sorted_trip_keys:
-        change_data[trip_name] = {}
-        
-        for station_idx in range(len(BUS_STOPS_8201)):
-            if station_idx not in avg_passenger_data[trip_name]:
-                continue
-            
-            current_passengers = avg_passenger_data[trip_name][station_idx]
-            
-            prev_passengers = None
-            for prev_idx in range(station_idx - 1, -1, -1):
-                if prev_idx in avg_passenger_data[trip_name]:
-                    prev_passengers = avg_passenger_data[trip_name][prev_idx]
-                    break
-            
-            if prev_passengers is not None:
-                if station_idx <= 26:
-                    change = current_passengers - prev_passengers
-                else:
-                    change = prev_passengers - current_passengers
-                
-                change_data[trip_name][station_idx] = round(change, 1)
+    change_data = {
+        trip_name: compute_changes(avg_passenger_data[trip_name], digits=1)
+        for trip_name in sorted_trip_keys
+    }
     
     return {
         'buses': sorted_trip_keys,
@@ -739,6 +619,20 @@ def calculate_average_data(temp_db_path, start_date, end_date, weekday_filter=No
     }
 
 
+def get_average_title(weekday_filter=None, is_weekend_only=None):
+    """
+    평균 분석 제목 (요일 / 주말 평균 / 평일 평균 / 전체 평균)
+    """
+    weekday_names = ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']
+    if weekday_filter is not None:
+        return weekday_names[weekday_filter]
+    elif is_weekend_only is True:
+        return '주말 평균'
+    elif is_weekend_only is False:
+        return '평일 평균'
+    return '전체 평균'
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_average_analysis(request):
@@ -756,14 +650,18 @@ def get_average_analysis(request):
                 'error': '시작 날짜와 종료 날짜를 모두 입력해주세요.'
             }, status=400)
         
-        temp_db_path = request.session.get('temp_db_path')
+        temp_db_path = get_analysis_db_path(request)
         
-        if not temp_db_path or not os.path.exists(temp_db_path):
+        if not temp_db_path:
             return JsonResponse({
                 'success': False,
                 'error': '업로드된 데이터베이스 파일을 찾을 수 없습니다.'
             }, status=400)
         
+        archived_dates = get_archived_dates(temp_db_path, start_date, end_date)
+        if archived_dates:
+            return archived_dates_response(archived_dates)
+        
         weekday_filter = int(weekday) if weekday is not None and weekday != '' else None
         is_weekend_only = request.GET.get('is_weekend_only')  # 'true' 또는 'false' 또는 None
         
@@ -772,7 +670,14 @@ def get_average_analysis(request):
         if is_weekend_only is not None:
             weekend_filter = is_weekend_only.lower() == 'true'
         
-        result = calculate_average_data(temp_db_path, start_date, end_date, weekday_filter, weekend_filter)
+        # 같은 DB(내용 해시/운영 DB 지문)와 조건의 결과는 캐시에서 반환
+        cache_key = make_key(
+            get_db_fingerprint(temp_db_path), DEFAULT_ROUTE_ID, start_date, end_date, weekday_filter, weekend_filter
+        )
+        result, cached = average_cache.get_or_compute(
+            cache_key,
+            lambda: calculate_average_data(temp_db_path, start_date, end_date, weekday_filter, weekend_filter)
+        )
         
         if result is None:
             return JsonResponse({
@@ -780,20 +685,10 @@ def get_average_analysis(request):
                 'error': '해당 조건에 맞는 데이터가 없습니다.'
             }, status=400)
         
-        weekday_names = ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']
-        if weekday_filter is not None:
-            title = weekday_names[weekday_filter]
-        elif weekend_filter is True:
-            title = '주말 평균'
-        elif weekend_filter is False:
-            title = '평일 평균'
-        else:
-            title = '전체 평균'
-        
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
             'data': {
-                'title': title,
+                'title': get_average_title(weekday_filter, weekend_filter),
                 'start_date': start_date,
                 'end_date': end_date,
                 'buses': result['buses'],
@@ -802,6 +697,98 @@ def get_average_analysis(request):
                 'changes': result['changes']
             }
         })
+        response['X-Analysis-Cache'] = 'hit' if cached else 'miss'
+        return response
+        
+    except Exception as e:
+        import traceback
+        return JsonResponse({
+            'success': False,
+            'error': f'평균 분석 데이터 조회 중 오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_all_average_analysis(request):
+    """
+    전체/평일/주말/요일별 평균 분석 10종을 한 번에 조회
+    (기간 내 날짜를 한 번씩만 재구성하여 모든 종류에 함께 누적)
+    """
+    try:
+        start_date = request.GET.get('start_date')
+        end_date = request.GET.get('end_date')
+        
+        if not start_date or not end_date:
+            return JsonResponse({
+                'success': False,
+                'error': '시작 날짜와 종료 날짜를 모두 입력해주세요.'
+            }, status=400)
+        
+        temp_db_path = get_analysis_db_path(request)
+        
+        if not temp_db_path:
+            return JsonResponse({
+                'success': False,
+                'error': '업로드된 데이터베이스 파일을 찾을 수 없습니다.'
+            }, status=400)
+        
+        archived_dates = get_archived_dates(temp_db_path, start_date, end_date)
+        if archived_dates:
+            return archived_dates_response(archived_dates)
+        
+        fingerprint = get_db_fingerprint(temp_db_path)
+        
+        def calculate_all():
+            # 수집 날짜가 하나도 없는 종류는 개별 조회와 같이 None (해당 조건에 맞는 데이터 없음)
+            with analysis_pool.connection(temp_db_path) as conn:
+                weekdays = get_collection_weekdays(conn.cursor(), start_date, end_date)
+            
+            buckets = calculate_average_buckets(temp_db_path, start_date, end_date).buckets
+            results = {}
+            for variant, (weekday_filter, weekend_filter) in AVERAGE_VARIANTS.items():
+                if weekday_filter is not None:
+                    has_dates = weekday_filter in weekdays
+                elif weekend_filter is not None:
+                    has_dates = any((weekday >= 5) == weekend_filter for weekday in weekdays)
+                else:
+                    has_dates = True
+                results[variant] = build_average_result(buckets[variant]) if has_dates else None
+                
+                # 개별 평균 조회(get_average_analysis)도 바로 캐시에서 응답하도록 함께 저장
+                average_cache.set(
+                    make_key(fingerprint, DEFAULT_ROUTE_ID, start_date, end_date, weekday_filter, weekend_filter),
+                    results[variant]
+                )
+            return results
+        
+        results, cached = average_cache.get_or_compute(
+            make_key(fingerprint, DEFAULT_ROUTE_ID, start_date, end_date, 'all-variants'),
+            calculate_all
+        )
+        
+        variants = {}
+        for variant, (weekday_filter, weekend_filter) in AVERAGE_VARIANTS.items():
+            result = results[variant]
+            variants[variant] = {
+                'title': get_average_title(weekday_filter, weekend_filter),
+                'buses': result['buses'],
+                'passengers': result['passengers'],
+                'changes': result['changes']
+            } if result is not None else None
+        
+        response = JsonResponse({
+            'success': True,
+            'data': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'stations': BUS_STOPS_8201,
+                'variants': variants
+            }
+        })
+        response['X-Analysis-Cache'] = 'hit' if cached else 'miss'
+        return response
         
     except Exception as e:
         import traceback
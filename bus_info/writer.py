@@ -0,0 +1,334 @@
+"""
+수집 스냅샷 write-behind 저장
+"""
+import atexit
+import queue
+import threading
+import time
+
+from django.db import connection, transaction
+
+from .config import (
+    STORAGE_MODE,
+    WRITE_BEHIND_ENABLED,
+    WRITER_BATCH_SIZE,
+    WRITER_FLUSH_INTERVAL,
+    WRITER_MAX_ATTEMPTS,
+    WRITER_RETRY_DELAY
+)
+
+
+class PendingSnapshot:
+    """
+    저장 대기 중인 수집 스냅샷
+    (BusCollection 1건 + 버스 목록 [(차량 번호, 잔여 좌석, 정류소 순번), ...])
+    """
+
+    def __init__(self, collection, buses, base=None):
+        self.collection = collection
+        self.buses = buses
+        # 변경분 저장 모드: 버스 목록이 같은 기준 스냅샷 (있으면 버스 데이터 대신 참조만 저장)
+        self.base = base
+        self.attempts = 0
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def collection_id(self):
+        return self.collection.pk
+
+    @property
+    def is_done(self):
+        return self._done.is_set()
+
+    @property
+    def failed(self):
+        return self.is_done and self.error is not None
+
+    def wait(self, timeout=None):
+        """
+        저장 완료까지 대기 후 Collection ID 반환 (실패/시간 초과 시 None)
+        """
+        self._done.wait(timeout)
+        return self.collection.pk
+
+    def resolve(self, error=None):
+        self.error = error
+        self._done.set()
+
+
+def write_snapshots(snapshots):
+    """
+    여러 스냅샷을 한 트랜잭션에서 벌크 저장
+    """
+    from .models import BusCollection, BusData
+    from .snapshots import get_vehicle_ids, pack_snapshots
+
+    # 차량 ID 조회/생성은 저장 트랜잭션 밖에서 처리 (실패해도 차량 행은 남아도 무방)
+    vehicle_ids = get_vehicle_ids(
+        plate_no for snapshot in snapshots for plate_no, _, _ in snapshot.buses
+    )
+
+    if STORAGE_MODE == 'packed':
+        pack_snapshots([snapshot for snapshot in snapshots if snapshot.base is None], vehicle_ids)
+
+    def insert_collections(collections):
+        if connection.features.can_return_rows_from_bulk_insert:
+            BusCollection.objects.bulk_create(collections)
+        else:
+            for collection in collections:
+                collection.save()
+
+    try:
+        with transaction.atomic():
+            # 1단계: 전체 스냅샷 저장 (같은 배치의 동일 스냅샷이 참조할 ID 확보)
+            full = [snapshot for snapshot in snapshots if snapshot.base is None]
+            insert_collections([snapshot.collection for snapshot in full])
+
+            # 2단계: 동일 스냅샷은 기준 수집 건 참조만 저장
+            # (기준 스냅샷 저장이 최종 실패했다면 버스 데이터를 그대로 저장)
+            repeats = []
+            for snapshot in snapshots:
+                if snapshot.base is None:
+                    continue
+                base_id = snapshot.base.collection.pk
+                if base_id is None:
+                    snapshot.base = None
+                    full.append(snapshot)
+                    if STORAGE_MODE == 'packed':
+                        pack_snapshots([snapshot], vehicle_ids)
+                else:
+                    snapshot.collection.same_as_id = base_id
+                    snapshot.collection.packed_buses = None
+                repeats.append(snapshot.collection)
+            insert_collections(repeats)
+
+            bus_rows = []
+            for snapshot in full:
+                for plate_no, remain_seat_cnt, station_seq in snapshot.buses:
+                    bus_rows.append(BusData(
+                        collection=snapshot.collection,
+                        vehicle_id=vehicle_ids[plate_no],
+                        remain_seat_cnt=remain_seat_cnt,
+                        station_seq=station_seq
+                    ))
+
+            if bus_rows:
+                BusData.objects.bulk_create(bus_rows, batch_size=500)
+    except Exception:
+        # 롤백되어도 bulk_create가 채운 ID는 남으므로 지움 (남은 ID를 기준으로 다음 동일 스냅샷이
+        # 참조를 저장하면, 같은 ID를 다시 받은 행이 자기 자신을 가리키게 됨)
+        for snapshot in snapshots:
+            snapshot.collection.pk = None
+            snapshot.collection.same_as_id = None
+            snapshot.collection._state.adding = True
+        raise
+
+
+class SnapshotWriter:
+    """
+    수집 스냅샷 write-behind 큐
+
+    수집 스레드는 스냅샷을 대기열에 넣고 바로 다음 수집으로 넘어가며,
+    저장 스레드가 크기(WRITER_BATCH_SIZE) 또는 시간(WRITER_FLUSH_INTERVAL) 기준으로
+    여러 노선의 스냅샷을 모아 한 트랜잭션으로 저장한다. 종료 시 남은 스냅샷을 저장한다.
+    배치 저장이 max_attempts번 실패하면 한 건씩 저장하여 문제가 있는 스냅샷만 버린다.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=WRITER_BATCH_SIZE, flush_interval=WRITER_FLUSH_INTERVAL,
+                 max_attempts=WRITER_MAX_ATTEMPTS, retry_delay=WRITER_RETRY_DELAY):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # 저장 통계
+        self._max_queue_depth = 0
+        self._flushes = 0
+        self._flushed_snapshots = 0
+        self._failed_flushes = 0
+        self._dropped_snapshots = 0
+        self._last_flush_size = 0
+        self._last_flush_latency = None
+        self._total_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+
+    def submit(self, snapshot):
+        """
+        스냅샷을 저장 대기열에 등록
+        """
+        self.start()
+        self._queue.put(snapshot)
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+        return snapshot
+
+    def flush(self, timeout=None):
+        """
+        대기열의 스냅샷을 즉시 저장하고 완료까지 대기
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def start(self):
+        """
+        저장 스레드 시작
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='bus-snapshot-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """
+        남은 스냅샷을 저장한 뒤 저장 스레드 종료
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        thread.join(timeout=timeout)
+        self._thread = None
+
+    def get_stats(self):
+        """
+        대기열 깊이 및 저장 지연 통계 반환
+        """
+        return {
+            'enabled': WRITE_BEHIND_ENABLED,
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self._max_queue_depth,
+            'flushes': self._flushes,
+            'flushed_snapshots': self._flushed_snapshots,
+            'failed_flushes': self._failed_flushes,
+            'dropped_snapshots': self._dropped_snapshots,
+            'last_flush_size': self._last_flush_size,
+            'last_flush_latency': round(self._last_flush_latency, 4) if self._last_flush_latency is not None else None,
+            'avg_flush_latency': round(self._total_flush_latency / self._flushes, 4) if self._flushes else None,
+            'max_flush_latency': round(self._max_flush_latency, 4)
+        }
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = max(0.0, deadline - time.time()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._STOP:
+                self._drain(batch)
+                return
+
+            if isinstance(item, threading.Event):
+                self._drain(batch)
+                batch = []
+                item.set()
+                continue
+
+            if item is not None:
+                batch.append(item)
+                if len(batch) == 1:
+                    deadline = time.time() + self.flush_interval
+
+            if batch and (len(batch) >= self.batch_size or time.time() >= deadline):
+                batch = self._flush_batch(batch)
+                if batch:
+                    deadline = time.time() + self.flush_interval
+
+    def _drain(self, batch):
+        # 대기열에 남은 스냅샷까지 모두 저장 (재시도 한도 내에서)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not self._STOP:
+                batch.append(item)
+
+        # 잠금이 잠시 이어지는 동안 재시도를 모두 써 버리지 않도록 재시도마다 대기 시간을 2배로
+        delay = self.retry_delay
+        batch = self._flush_batch(batch) if batch else []
+        while batch:
+            time.sleep(delay)
+            delay *= 2
+            batch = self._flush_batch(batch)
+
+    def _flush_batch(self, batch):
+        """
+        배치 저장 후 재시도가 필요한 스냅샷 목록 반환
+        """
+        start_time = time.time()
+        try:
+            write_snapshots(batch)
+        except Exception as e:
+            self._failed_flushes += 1
+            print(f"배치 저장 오류 ({len(batch)}건): {e}")
+
+            retry = []
+            final = []
+            for snapshot in batch:
+                snapshot.attempts += 1
+                if snapshot.attempts < self.max_attempts:
+                    retry.append(snapshot)
+                else:
+                    final.append(snapshot)
+
+            # 재시도 한도에 도달한 스냅샷은 한 건씩 저장하여 실패한 것만 버림
+            if len(batch) > 1:
+                self._write_each(final)
+            else:
+                for snapshot in final:
+                    self._drop(snapshot, e)
+            return retry
+
+        latency = time.time() - start_time
+        self._flushes += 1
+        self._flushed_snapshots += len(batch)
+        self._last_flush_size = len(batch)
+        self._last_flush_latency = latency
+        self._total_flush_latency += latency
+        self._max_flush_latency = max(self._max_flush_latency, latency)
+
+        for snapshot in batch:
+            snapshot.resolve()
+
+        print(f"  - 배치 저장 완료: {len(batch)}건, 저장 시간: {latency:.3f}초")
+        return []
+
+    def _write_each(self, snapshots):
+        for snapshot in snapshots:
+            try:
+                write_snapshots([snapshot])
+            except Exception as e:
+                self._drop(snapshot, e)
+            else:
+                self._flushed_snapshots += 1
+                snapshot.resolve()
+
+    def _drop(self, snapshot, error):
+        self._dropped_snapshots += 1
+        print(f"스냅샷 저장 실패 - 노선: {snapshot.collection.route_id}, "
+              f"쿼리 시간: {snapshot.collection.query_time}: {error}")
+        snapshot.resolve(error=str(error))
+
+
+# 전역 write-behind 저장기 (프로세스 종료 시 남은 스냅샷 저장)
+snapshot_writer = SnapshotWriter()
+atexit.register(snapshot_writer.stop)
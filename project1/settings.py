@@ -90,9 +90,83 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 요청마다 연결을 새로 열지 않도록 연결 재사용 (초)
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # 잠금 대기 시간 (초) - "database is locked" 오류 방지
+            'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20)),
+        },
     }
 }
 
+# SQLite 튜닝 설정 (bus_info.db_tuning에서 모든 연결 생성 시 PRAGMA로 적용)
+# WAL 모드에서는 수집 스레드의 쓰기와 gunicorn 워커의 읽기가 서로 막지 않음
+SQLITE_TUNING = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # 바이트
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -32000)),  # 음수: KiB 단위
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20000)),  # 밀리초
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+# WAL 체크포인트 주기 (초, 0이면 비활성화) 및 모드 (PASSIVE / FULL / RESTART / TRUNCATE)
+SQLITE_CHECKPOINT_INTERVAL = int(os.environ.get('SQLITE_CHECKPOINT_INTERVAL', 300))
+SQLITE_CHECKPOINT_MODE = os.environ.get('SQLITE_CHECKPOINT_MODE', 'TRUNCATE')
+
+# 오래된 수집 데이터 보관 (bus_info.archive)
+# 보존 기간이 지난 날짜는 월별 보관 파일(ARCHIVE_DIR/bus_archive_YYYY-MM.sqlite3)로 옮기고 본 DB에서 삭제
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', 0))  # 0이면 자동 보관 비활성화
+ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 6 * 60 * 60))  # 자동 보관 작업 주기 (초)
+
+# DB 다운로드 스냅샷 (bus_info.db_snapshot)
+# 온라인 백업으로 만든 복사본을 TTL 동안 보관하여 끊긴 다운로드를 Range 요청으로 이어받을 수 있게 함
+DOWNLOAD_SNAPSHOT_DIR = os.environ.get('DOWNLOAD_SNAPSHOT_DIR', '')  # 비어 있으면 시스템 임시 디렉터리
+DOWNLOAD_SNAPSHOT_TTL = int(os.environ.get('DOWNLOAD_SNAPSHOT_TTL', 60 * 60))  # 초
+DOWNLOAD_SNAPSHOT_REUSE = int(os.environ.get('DOWNLOAD_SNAPSHOT_REUSE', 30))  # 이 시간 안의 요청은 같은 스냅샷 사용 (초)
+
+# 배차 재구성 결과(Trip / TripStationLoad) 갱신 주기 (초, 0이면 비활성화)
+# 최근 TRIP_REFRESH_DAYS일 중 수집 건이 바뀐 날짜만 다시 계산
+TRIP_REFRESH_INTERVAL = int(os.environ.get('TRIP_REFRESH_INTERVAL', 15 * 60))
+TRIP_REFRESH_DAYS = int(os.environ.get('TRIP_REFRESH_DAYS', 2))
+
+# 평균 분석 결과 캐시 (bus_info.result_cache)
+# 분석 DB 지문 + 조회 조건별로 결과를 메모리(LRU)에 보관하고, ANALYSIS_CACHE_DIR이 있으면 파일로도 저장
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', 256))
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', 24 * 60 * 60))  # 초
+ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', '')  # 비어 있으면 디스크 저장 안 함
+ANALYSIS_CACHE_DISK_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+
+# 분석용 DB 분할 업로드 (bus_info.db_upload)
+# 조각 단위로 받아 끊기면 빠진 조각만 다시 받고, 검증은 백그라운드 스레드에서 처리
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', '')  # 비어 있으면 시스템 임시 디렉터리
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 0))  # 0이면 제한 없음
+UPLOAD_TTL = int(os.environ.get('UPLOAD_TTL', 24 * 60 * 60))  # 마지막 상태 변경 후 보존 시간 (초)
+UPLOAD_VALIDATION_WORKERS = int(os.environ.get('UPLOAD_VALIDATION_WORKERS', 1))
+# 검증 후 분석 준비 (인덱스 추가, ANALYZE) 시 저널 모드 - delete: 파일 하나로 정리 / wal
+UPLOAD_JOURNAL_MODE = os.environ.get('UPLOAD_JOURNAL_MODE', 'delete')
+# 업로드 파일을 immutable=1로 열어 분석 시 잠금/변경 확인 생략
+ANALYSIS_UPLOAD_IMMUTABLE = os.environ.get('ANALYSIS_UPLOAD_IMMUTABLE', 'True').lower() == 'true'
+
+# 업로드 DB 저장소 (bus_info.upload_store) - 원본 해시별로 한 번만 저장하고 세션 참조 수를 셈
+# 참조가 없는 항목은 UPLOAD_STORE_TTL 동안 사용하지 않았거나 전체 크기가 넘치면 오래된 것부터 삭제
+UPLOAD_STORE_DIR = os.environ.get('UPLOAD_STORE_DIR', '')  # 비어 있으면 시스템 임시 디렉터리
+UPLOAD_STORE_MAX_BYTES = int(os.environ.get('UPLOAD_STORE_MAX_BYTES', 10 * 1024 * 1024 * 1024))  # 0이면 크기 제한 없음
+UPLOAD_STORE_TTL = int(os.environ.get('UPLOAD_STORE_TTL', 7 * 24 * 60 * 60))  # 초
+UPLOAD_REF_TTL = int(os.environ.get('UPLOAD_REF_TTL', 0))  # 세션 참조 만료 (초, 0이면 SESSION_COOKIE_AGE)
+UPLOAD_CLEANUP_INTERVAL = int(os.environ.get('UPLOAD_CLEANUP_INTERVAL', 60 * 60))  # 정리 작업 주기 (초, 0이면 비활성화)
+
+# 업로드 DB 읽기 전용 연결 풀 (bus_info.analysis_pool) - 프로세스마다 파일별 연결을 보관하여 페이지 캐시 재사용
+ANALYSIS_POOL_MAX_CONNECTIONS = int(os.environ.get('ANALYSIS_POOL_MAX_CONNECTIONS', 4))  # DB당 유휴 연결 수 (0이면 풀 사용 안 함)
+ANALYSIS_POOL_MAX_DATABASES = int(os.environ.get('ANALYSIS_POOL_MAX_DATABASES', 8))
+ANALYSIS_POOL_IDLE_TIMEOUT = int(os.environ.get('ANALYSIS_POOL_IDLE_TIMEOUT', 5 * 60))  # 초
+ANALYSIS_POOL_CACHE_SIZE_KB = int(os.environ.get('ANALYSIS_POOL_CACHE_SIZE_KB', 64 * 1024))  # 연결당 페이지 캐시
+ANALYSIS_POOL_MMAP_SIZE = int(os.environ.get('ANALYSIS_POOL_MMAP_SIZE', 256 * 1024 * 1024))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators